@@ -1,8 +1,45 @@
-from fastapi import Depends, HTTPException, status
+import asyncio
+from typing import Optional
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from app.core.config import settings
+from app.core.metrics import span
+from app.core.security import AuthError, verify_access_token
 from app.db.supabase import get_supabase_client
 
 security = HTTPBearer()
+stream_security = HTTPBearer(auto_error=False)
+
+async def _verify_remote(token: str) -> str:
+    """Validate the token with Supabase Auth (one network round trip)"""
+    supabase = get_supabase_client()
+    user = await asyncio.to_thread(supabase.auth.get_user, token)
+
+    if not user or not user.user:
+        raise AuthError("Invalid or expired token")
+
+    return user.user.id
+
+async def authenticate_token(token: str) -> str:
+    """
+    Validates a Supabase JWT and returns user_id (UUID), or raises 401
+    """
+    try:
+        with span('auth'):
+            if settings.AUTH_MODE == "remote":
+                return await _verify_remote(token)
+            return await verify_access_token(token)
+
+    except AuthError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        )
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
@@ -10,20 +47,20 @@ async def get_current_user(
     """
     Validates Supabase JWT and returns user_id (UUID)
     """
-    try:
-        supabase = get_supabase_client()
-        user = supabase.auth.get_user(credentials.credentials)
-
-        if not user or not user.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid or expired token",
-            )
+    return await authenticate_token(credentials.credentials)
 
-        return user.user.id
-
-    except Exception:
+async def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(stream_security),
+    access_token: Optional[str] = Query(None),
+) -> str:
+    """
+    Like get_current_user, but also accepts ?access_token= because the
+    browser EventSource API cannot send an Authorization header
+    """
+    token = credentials.credentials if credentials else access_token
+    if not token:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
+            detail="Not authenticated",
         )
+    return await authenticate_token(token)
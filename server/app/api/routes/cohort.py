@@ -0,0 +1,46 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.api.deps import get_current_user
+from app.models.cohort import CohortPercentilesResponse
+from app.repositories.daily_summaries import DailySummaryRepository, get_daily_summary_repository
+from app.repositories.summary_rollups import SummaryRollupRepository, get_summary_rollup_repository
+from app.services.cohort_stats import cohort_stats
+from app.services.rollup_services import (
+    DAY_SCORE_COLUMNS, ROLLUP_COLUMNS, SCORE_METRICS, period_averages, period_start
+)
+from datetime import date
+
+router = APIRouter()
+
+
+@router.get("/cohort/percentiles", response_model=CohortPercentilesResponse)
+async def get_cohort_percentiles(
+    date: date,
+    granularity: str = Query("day", pattern="^(day|week)$"),
+    user_id: str = Depends(get_current_user),
+    summaries: DailySummaryRepository = Depends(get_daily_summary_repository),
+    rollups: SummaryRollupRepository = Depends(get_summary_rollup_repository)
+):
+    """
+    Rank the user's scores against everyone's for the day or ISO week containing `date`
+    
+    Weeks compare per-day averages. Percentiles are null while fewer than
+    COHORT_MIN_POPULATION users have a score in the period.
+    """
+    start = period_start(date, granularity)
+    if granularity == 'day':
+        scores = await summaries.get(user_id, start, columns=DAY_SCORE_COLUMNS)
+    else:
+        stored = await rollups.get_periods(user_id, {'week': start}, columns=ROLLUP_COLUMNS)
+        scores = period_averages(stored.get(('week', str(start))))
+    if not scores:
+        raise HTTPException(status_code=404, detail="No scores logged in this period.")
+    
+    population, percentiles = await cohort_stats.percentiles(granularity, start, scores)
+    return {
+        "granularity": granularity,
+        "period_start": str(start),
+        "population": population,
+        "metrics": {
+            metric: {"value": scores[metric], "percentile": percentiles[metric]} for metric in SCORE_METRICS
+        }
+    }
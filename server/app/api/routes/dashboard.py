@@ -0,0 +1,60 @@
+import asyncio
+from fastapi import APIRouter, Depends
+from app.api.deps import get_current_user
+from app.api.routes.summaries import cached_daily_summary, cached_weekly_summary
+from app.models.dashboard import DashboardResponse
+from app.repositories.base import RepositoryTimeout
+from app.repositories.daily_summaries import DailySummaryRepository, get_daily_summary_repository
+from app.repositories.food_entries import FoodEntryRepository, get_food_entry_repository
+from app.repositories.tips import TipsRepository, get_tips_repository
+from datetime import date, timedelta
+
+router = APIRouter()
+
+
+async def _tips(tips_repo: TipsRepository, user_id: str, day: date):
+    stored = await tips_repo.get(user_id, str(day))
+    return stored['tips'] if stored else None
+
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    date: date,
+    user_id: str = Depends(get_current_user),
+    entries: FoodEntryRepository = Depends(get_food_entry_repository),
+    summaries: DailySummaryRepository = Depends(get_daily_summary_repository),
+    tips_repo: TipsRepository = Depends(get_tips_repository)
+):
+    """
+    Everything the client shows for one day, in one request
+    
+    Sections are loaded concurrently. A failing section is returned as null
+    with its error under "errors" instead of failing the whole dashboard.
+    The weekly section covers the ISO week (Monday start) containing `date`.
+    """
+    week_start = date - timedelta(days=date.weekday())
+    
+    async def _daily():
+        return (await cached_daily_summary(user_id, date, summaries)).payload
+    
+    async def _weekly():
+        return (await cached_weekly_summary(user_id, week_start, summaries)).payload
+    
+    sections = {
+        "entries": entries.list_for_day(user_id, date),
+        "daily_summary": _daily(),
+        "weekly_summary": _weekly(),
+        "tips": _tips(tips_repo, user_id, date),
+    }
+    results = await asyncio.gather(*sections.values(), return_exceptions=True)
+    
+    payload = {"date": str(date)}
+    errors = {}
+    for name, result in zip(sections, results):
+        if isinstance(result, Exception):
+            print(f"Dashboard section {name} failed for {user_id}: {result!r}")
+            errors[name] = "timed out" if isinstance(result, RepositoryTimeout) else "unavailable"
+            result = None
+        payload[name] = result
+    payload["errors"] = errors
+    return payload
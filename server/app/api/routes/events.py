@@ -0,0 +1,61 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from app.api.deps import get_stream_user
+from app.core.config import settings
+from app.services.event_hub import CLOSE, TooManyStreams, event_hub
+
+router = APIRouter()
+
+
+async def _stream(user_id: str):
+    # Subscribed here, not in the endpoint: a client that disconnects before
+    # the body starts never runs the generator, and its slot would leak
+    try:
+        subscription = event_hub.subscribe(user_id)
+    except TooManyStreams:
+        # Another stream took the last slot since the endpoint checked
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n: too many streams\n\n"
+        return
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n: connected\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                message = ": ping\n\n"
+            if message is CLOSE:
+                return
+            yield message
+    finally:
+        # Runs on client disconnect too (the response cancels the generator)
+        event_hub.unsubscribe(subscription)
+
+
+@router.get("/events")
+async def stream_events(user_id: str = Depends(get_stream_user)):
+    """
+    Server-sent events with the user's live updates
+
+    The token is verified once when the stream opens. Events:
+    summary_updated {date, gut_score, status, entry_count},
+    entry_analyzed {entry_id, date, status} and tips_ready {date}.
+    Comment lines are sent as heartbeats while idle. Answers 503 when
+    the server runs several workers without a shared event backend.
+    """
+    if not event_hub.enabled:
+        raise HTTPException(status_code=503, detail="Live events need a single worker or a shared event backend")
+    try:
+        event_hub.check_capacity(user_id)
+    except TooManyStreams as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+    return StreamingResponse(
+        _stream(user_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx-style proxies from buffering the stream
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from app.api.deps import get_current_user
+from app.services.export_services import DATASETS, export_chunks, gzip_chunks
+from datetime import date, timedelta
+
+router = APIRouter()
+
+MEDIA_TYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    """True if Accept-Encoding gives gzip (or *, when gzip is not listed) a non-zero q-value"""
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[coding.strip().lower()] = q
+    return weights.get('gzip', weights.get('*', 0.0)) > 0
+
+
+@router.get("/export")
+async def export_history(
+    request: Request,
+    start: date = Query(..., alias="from"),
+    to: date = Query(...),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    dataset: str = Query("all", pattern="^(all|entries|summaries)$"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Stream food entries and/or daily summaries for an inclusive date range
+    
+    Rows are paged from the database and written as they arrive, so any
+    range length is fine. NDJSON lines carry a "type" of entry or summary;
+    CSV needs a single dataset. The body is gzip-encoded when the client's
+    Accept-Encoding allows gzip.
+    """
+    if start > to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if format == 'csv' and dataset == 'all':
+        raise HTTPException(status_code=400, detail="CSV export needs dataset=entries or dataset=summaries")
+    
+    datasets = DATASETS if dataset == 'all' else (dataset,)
+    body = export_chunks(user_id, start, to + timedelta(days=1), format, datasets)
+    headers = {
+        "Content-Disposition": f'attachment; filename="gut-health-{dataset}-{start}-{to}.{format}"',
+        "Vary": "Accept-Encoding",
+    }
+    if _accepts_gzip(request.headers.get('accept-encoding', '')):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
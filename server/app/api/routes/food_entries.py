@@ -1,38 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.db.supabase import get_supabase_client
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status as http_status
 from app.api.deps import get_current_user
-from app.models.food_entry import FoodEntryCreate, FoodEntryUpdate
-from app.services.llm_services import parse_food_text
-from app.services.summary_services import update_daily_summary
+from app.core.config import settings
+from app.models.food_entry import (
+    AnalysisStatus, AnalysisStatusResponse, FoodEntryBulkCreate, FoodEntryCreate, FoodEntryListResponse, FoodEntryUpdate,
+    analysis_status
+)
+from app.repositories.food_entries import FoodEntryRepository, get_food_entry_repository
+from app.services.analysis_queue import AnalysisJob, AnalysisQueueFull, analysis_queue, pending_analysis
+from app.services.idempotency import IdempotencyKeyReused, idempotency_store, request_fingerprint
+from app.services.llm_services import analyze_food_texts, fallback_analysis, parse_food_text
+from app.services.summary_coordinator import summary_coordinator
 from datetime import date, datetime
+from pydantic import ValidationError
 
 router = APIRouter()
-supabase = get_supabase_client()
+
+IdempotencyKey = Header(None, alias="Idempotency-Key", min_length=1, max_length=255)
+
+
+async def _idempotent(
+    user_id: str,
+    key: Optional[str],
+    fingerprint: str,
+    response: Response,
+    handler: Callable[[], Awaitable[Any]],
+) -> Any:
+    """Run a write once per Idempotency-Key; retries replay the first response"""
+    try:
+        return await idempotency_store.run(user_id, key, fingerprint, response, handler)
+    except IdempotencyKeyReused as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 
 @router.post("")
 async def create_food_entry(
     entry: FoodEntryCreate,
-    user_id: str = Depends(get_current_user)
+    response: Response,
+    user_id: str = Depends(get_current_user),
+    entries: FoodEntryRepository = Depends(get_food_entry_repository),
+    idempotency_key: Optional[str] = IdempotencyKey,
 ):
-    """Add a new food entry"""
-    print("Creating food entry")
-    llm_analysis = await parse_food_text(entry.food_text)
-    print("LLM analysis complete:", llm_analysis)
-    # Insert food entry
+    """
+    Add a new food entry
+    
+    With an Idempotency-Key header, a retried request returns the first
+    response instead of analyzing and inserting the entry again.
+    """
+    fingerprint = request_fingerprint('POST', '/food-entry', entry.model_dump(mode='json'))
+    return await _idempotent(
+        user_id, idempotency_key, fingerprint, response,
+        lambda: _create_food_entry(entry, response, user_id, entries),
+    )
+
+
+async def _create_food_entry(
+    entry: FoodEntryCreate, response: Response, user_id: str, entries: FoodEntryRepository
+) -> dict:
     entry_data = {
         'user_id': user_id,
         'date': str(entry.date),
         'time': str(entry.time) if entry.time else datetime.now().time().isoformat(),
         'meal_type': entry.meal_type.value,
         'food_text': entry.food_text,
-        'llm_analysis': llm_analysis
     }
-    
-    result = supabase.table('food_entries').insert(entry_data).execute()
-    entry_id = result.data[0]['id']
+
+    if settings.ASYNC_ANALYSIS_ENABLED:
+        # Insert with a pending analysis and hand off to the worker pool
+        inserted = await entries.insert({**entry_data, 'llm_analysis': pending_analysis()})
+        entry_id = inserted['id']
+        try:
+            analysis_queue.enqueue(AnalysisJob(entry_id, user_id, entry.date, entry.food_text))
+            response.status_code = http_status.HTTP_202_ACCEPTED
+            return {
+                "message": "Food entry accepted",
+                "entry_id": str(entry_id),
+                "analysis_status": AnalysisStatus.pending.value
+            }
+        except AnalysisQueueFull:
+            # Queue saturated: analyze inline rather than reject the write
+            llm_analysis = await parse_food_text(entry.food_text)
+            await entries.update(entry_id, {'llm_analysis': llm_analysis})
+    else:
+        print("Creating food entry")
+        llm_analysis = await parse_food_text(entry.food_text)
+        print("LLM analysis complete:", llm_analysis)
+        # Insert food entry
+        inserted = await entries.insert({**entry_data, 'llm_analysis': llm_analysis})
+        entry_id = inserted['id']
     
     # Update daily summary
-    gut_score, status = await update_daily_summary(user_id, entry.date)
+    gut_score, status = await summary_coordinator.submit(user_id, entry.date, added=[llm_analysis])
     
     return {
         "message": "Food entry added",
@@ -41,45 +100,202 @@ async def create_food_entry(
         "status": status
     }
 
-@router.get("")
+@router.post("/bulk")
+async def create_food_entries_bulk(
+    bulk: FoodEntryBulkCreate,
+    user_id: str = Depends(get_current_user),
+    entries: FoodEntryRepository = Depends(get_food_entry_repository)
+):
+    """
+    Import many food entries at once
+    
+    Identical food texts are analyzed once, in batched prompts; all valid
+    entries go in with one insert and each affected day's summary is
+    updated once. Results are reported per item, in request order, as
+    created, failed (not stored) or unconfirmed (the database stored some
+    of the batch without saying which).
+    """
+    if len(bulk.entries) > settings.BULK_MAX_ENTRIES:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.BULK_MAX_ENTRIES} entries per request"
+        )
+    
+    results = [None] * len(bulk.entries)
+    valid = []
+    for index, raw in enumerate(bulk.entries):
+        try:
+            valid.append((index, FoodEntryCreate.model_validate(raw)))
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            results[index] = {"index": index, "status": "failed", "error": errors}
+    
+    analyses = await analyze_food_texts([entry.food_text for _, entry in valid])
+    
+    now = datetime.now().time().isoformat()
+    rows = []
+    for _, entry in valid:
+        rows.append({
+            'user_id': user_id,
+            'date': str(entry.date),
+            'time': str(entry.time) if entry.time else now,
+            'meal_type': entry.meal_type.value,
+            'food_text': entry.food_text,
+            # Same fallback as a single create when analysis fails
+            'llm_analysis': analyses[entry.food_text] or fallback_analysis(entry.food_text),
+        })
+    
+    try:
+        inserted = await entries.insert_many(rows)
+    except Exception as e:
+        print(f"Bulk insert failed for {user_id}: {e!r}")
+        inserted = []
+        for index, _ in valid:
+            results[index] = {"index": index, "status": "failed", "error": "Could not store entry"}
+    
+    by_date = {}
+    full_days = set()
+    if len(inserted) == len(rows):
+        for (index, entry), row, stored in zip(valid, rows, inserted):
+            results[index] = {
+                "index": index,
+                "status": "created",
+                "entry_id": str(stored['id']),
+                "analyzed": analyses[entry.food_text] is not None
+            }
+            by_date.setdefault(entry.date, []).append(row['llm_analysis'])
+    elif inserted:
+        # Returned rows cannot be matched to the request; recount the days
+        # from whatever was stored rather than guess which entries made it.
+        # Some were stored, so a blind retry would duplicate them
+        print(f"Bulk insert for {user_id} returned {len(inserted)} of {len(rows)} rows")
+        for index, entry in valid:
+            results[index] = {
+                "index": index,
+                "status": "unconfirmed",
+                "error": "Entry may have been stored; list the day's entries before retrying"
+            }
+            by_date.setdefault(entry.date, [])
+            full_days.add(entry.date)
+    
+    # One summary update per affected day
+    days = sorted(by_date)
+    updated = await asyncio.gather(
+        *(summary_coordinator.submit(user_id, day, added=by_date[day], full=day in full_days) for day in days),
+        return_exceptions=True
+    )
+    summaries = []
+    for day, outcome in zip(days, updated):
+        if isinstance(outcome, Exception):
+            print(f"Summary update failed for {user_id} on {day}: {outcome!r}")
+            continue
+        gut_score, status = outcome
+        summaries.append({"date": str(day), "updated_gut_score": gut_score, "status": status})
+    
+    created = sum(1 for result in results if result["status"] == "created")
+    unconfirmed = sum(1 for result in results if result["status"] == "unconfirmed")
+    return {
+        "message": "Food entries imported",
+        "created": created,
+        "unconfirmed": unconfirmed,
+        "failed": len(results) - created - unconfirmed,
+        "results": results,
+        "summaries": summaries
+    }
+
+@router.get("", response_model=FoodEntryListResponse)
 async def get_food_entries(
     date: str,
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    entries: FoodEntryRepository = Depends(get_food_entry_repository)
 ):
     """Get all entries for a date"""
-    result = supabase.table('food_entries').select('id, time, meal_type, food_text').eq('user_id', user_id).eq('date', str(date)).order('time').execute()
+    rows = await entries.list_for_day(user_id, date)
     
     return {
         "date": str(date),
-        "entries": result.data
+        "entries": rows
     }
 
 @router.put("/{entry_id}")
 async def update_food_entry(
     entry_id: int,
     update: FoodEntryUpdate,
-    user_id: str = Depends(get_current_user)
+    response: Response,
+    user_id: str = Depends(get_current_user),
+    entries: FoodEntryRepository = Depends(get_food_entry_repository),
+    idempotency_key: Optional[str] = IdempotencyKey,
 ):
-    """Update a food entry"""
-    # Verify ownership
-    result = supabase.table('food_entries').select('date').eq('id', entry_id).eq('user_id', user_id).execute()
-    if not result.data:
+    """Update a food entry (Idempotency-Key supported, as for create)"""
+    fingerprint = request_fingerprint('PUT', f'/food-entry/{entry_id}', update.model_dump(mode='json'))
+    return await _idempotent(
+        user_id, idempotency_key, fingerprint, response,
+        lambda: _update_food_entry(entry_id, update, response, user_id, entries),
+    )
+
+
+async def _replace_entry(
+    entries: FoodEntryRepository, entry_id: int, user_id: str, fields: Dict[str, Any]
+) -> Tuple[str, Optional[Dict[str, Any]], bool]:
+    """
+    Write an edit over exactly the entry as read (compare-and-set on updated_at)
+
+    Re-reads and retries when another write got in between, so the summary
+    delta is taken from the analysis the edit really replaced. If the entry
+    keeps changing, the edit is written anyway and the day is recounted.
+
+    Returns:
+        Tuple: (entry date, replaced llm_analysis, whether that delta applies)
+
+    Raises:
+        HTTPException: 404 if the entry does not exist (or is not the user's)
+    """
+    fields = {**fields, 'updated_at': datetime.utcnow().isoformat()}
+    for _ in range(settings.SUMMARY_WRITE_MAX_ATTEMPTS):
+        existing = await entries.get_owned(entry_id, user_id, columns='date, llm_analysis, updated_at')
+        if not existing:
+            raise HTTPException(status_code=404, detail="Entry not found")
+        if await entries.update(entry_id, fields, match={'updated_at': existing.get('updated_at')}):
+            return existing['date'], existing.get('llm_analysis'), True
+    if not await entries.update(entry_id, fields, match={'user_id': user_id}):
         raise HTTPException(status_code=404, detail="Entry not found")
-    
-    entry_date = result.data[0]['date']
+    return existing['date'], None, False
+
+
+async def _update_food_entry(
+    entry_id: int, update: FoodEntryUpdate, response: Response, user_id: str, entries: FoodEntryRepository
+) -> dict:
+    if settings.ASYNC_ANALYSIS_ENABLED:
+        entry_date, old_analysis, exact = await _replace_entry(entries, entry_id, user_id, {
+            'food_text': update.food_text,
+            'llm_analysis': pending_analysis(),
+        })
+        entry_date = date.fromisoformat(entry_date)
+        # The old analysis leaves the score now; the worker adds the new one
+        await summary_coordinator.submit(user_id, entry_date, removed=[old_analysis], full=not exact)
+        try:
+            analysis_queue.enqueue(AnalysisJob(entry_id, user_id, entry_date, update.food_text))
+            response.status_code = http_status.HTTP_202_ACCEPTED
+            return {
+                "message": "Food entry update accepted",
+                "entry_id": str(entry_id),
+                "analysis_status": AnalysisStatus.pending.value
+            }
+        except AnalysisQueueFull:
+            pass  # fall through and analyze inline
     
     # Parse new food text
     llm_analysis = await parse_food_text(update.food_text)
     
     # Update entry
-    supabase.table('food_entries').update({
+    entry_date, old_analysis, exact = await _replace_entry(entries, entry_id, user_id, {
         'food_text': update.food_text,
         'llm_analysis': llm_analysis,
-        'updated_at': datetime.utcnow().isoformat()
-    }).eq('id', entry_id).execute()
+    })
     
     # Recalculate daily summary
-    gut_score, _ = await update_daily_summary(user_id, date.fromisoformat(entry_date))
+    gut_score, _ = await summary_coordinator.submit(
+        user_id, date.fromisoformat(entry_date), added=[llm_analysis], removed=[old_analysis], full=not exact
+    )
     
     return {
         "message": "Food entry updated",
@@ -87,23 +303,47 @@ async def update_food_entry(
     }
 
 
+@router.get("/{entry_id}/status", response_model=AnalysisStatusResponse)
+async def get_food_entry_status(
+    entry_id: int,
+    user_id: str = Depends(get_current_user),
+    entries: FoodEntryRepository = Depends(get_food_entry_repository)
+):
+    """Poll the background analysis status of an entry"""
+    existing = await entries.get_owned(entry_id, user_id, columns='id, llm_analysis')
+    if not existing:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    
+    llm_analysis = existing.get('llm_analysis')
+    status = analysis_status(llm_analysis)
+    
+    return AnalysisStatusResponse(
+        entry_id=str(entry_id),
+        analysis_status=status,
+        llm_analysis=llm_analysis if status != AnalysisStatus.pending else None
+    )
+
+
 @router.delete("/{entry_id}")
 async def delete_food_entry(
     entry_id: int,
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    entries: FoodEntryRepository = Depends(get_food_entry_repository)
 ):
     """Delete a food entry"""
-    result = supabase.table('food_entries').select('date').eq('id', entry_id).eq('user_id', user_id).execute()
-    if not result.data:
+    existing = await entries.get_owned(entry_id, user_id)
+    if not existing:
         raise HTTPException(status_code=404, detail="Entry not found")
     
-    entry_date = result.data[0]['date']
-    
-    # Delete entry
-    supabase.table('food_entries').delete().eq('id', entry_id).execute()
+    # Delete entry; only the request that removed the row moves the summary
+    deleted = await entries.delete(entry_id, columns='date, llm_analysis')
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Entry not found")
     
     # Recalculate daily summary
-    gut_score, _ = await update_daily_summary(user_id, date.fromisoformat(entry_date))
+    gut_score, _ = await summary_coordinator.submit(
+        user_id, date.fromisoformat(deleted[0]['date']), removed=[deleted[0].get('llm_analysis')]
+    )
     
     return {
         "message": "Food entry deleted",
@@ -1,20 +1,85 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from app.api.deps import get_current_user
-from app.db.supabase import get_supabase_client
+from app.models.summary import DailySummaryResponse, RangeSummaryResponse, WeeklySummaryResponse
+from app.repositories.daily_summaries import DailySummaryRepository, get_daily_summary_repository
+from app.repositories.summary_rollups import SummaryRollupRepository, get_summary_rollup_repository
+from app.services.rollup_services import (
+    DAY_SCORE_COLUMNS, PERIOD_COLUMNS, period_end, period_start, period_view, rollup_from_days
+)
+from app.services.scoring_services import determine_status
+from app.services.summary_cache import CachedSummary, summary_cache
+from app.services.trend_services import get_trend, is_better, moving_average
 from datetime import date, timedelta
+from email.utils import format_datetime, parsedate_to_datetime
 
 router = APIRouter()
-supabase = get_supabase_client()
 
-@router.get("/daily-summary")
+# Longest range served from daily rows; longer ranges should use rollups
+MAX_DAILY_RANGE_DAYS = 366
+
+# Everything except the internal aggregates blob (weekly daily_scores lists whole rows)
+SUMMARY_COLUMNS = (
+    'id, user_id, date, gut_score, fiber_grams, fiber_score, diversity_score, '
+    'processed_score, probiotic_score, digestive_score, updated_at'
+)
+
+# What the daily summary response is built from
+DAILY_COLUMNS = (
+    'gut_score, fiber_grams, fiber_score, diversity_score, processed_score, '
+    'probiotic_score, digestive_score, entry_count'
+)
+
+
+def _is_not_modified(request: Request, cached: CachedSummary) -> bool:
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or cached.etag in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            return cached.last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _cached_response(request: Request, cached: CachedSummary) -> Response:
+    """Serve a cached summary, or 304 if the client already has it"""
+    headers = {
+        'ETag': cached.etag,
+        'Last-Modified': format_datetime(cached.last_modified, usegmt=True),
+        'Cache-Control': 'private, no-cache',
+    }
+    if _is_not_modified(request, cached):
+        summary_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    # The body was serialized once, when the payload was cached
+    return Response(cached.body, media_type='application/json', headers=headers)
+
+
+@router.get("/daily-summary", response_model=DailySummaryResponse)
 async def get_daily_summary(
-    date: str,
-    user_id: str = Depends(get_current_user)
+    request: Request,
+    date: date,
+    user_id: str = Depends(get_current_user),
+    summaries: DailySummaryRepository = Depends(get_daily_summary_repository)
 ):
     """Get daily summary"""
-    result = supabase.table('daily_gut_summary').select('*').eq('user_id', user_id).eq('date', str(date)).execute()
+    return _cached_response(request, await cached_daily_summary(user_id, date, summaries))
+
+
+async def cached_daily_summary(user_id: str, date: date, summaries: DailySummaryRepository) -> CachedSummary:
+    return await summary_cache.read_through(
+        user_id, 'daily', str(date), str(date + timedelta(days=1)),
+        lambda: _load_daily_summary(user_id, date, summaries)
+    )
+
+
+async def _load_daily_summary(user_id: str, date: date, summaries: DailySummaryRepository) -> dict:
+    data = await summaries.get(user_id, date, columns=DAILY_COLUMNS)
     
-    if not result.data:
+    if not data:
         return {
             "date": str(date),
             "gut_score": 0,
@@ -29,11 +94,8 @@ async def get_daily_summary(
             "status": "partial"
         }
     
-    data = result.data[0]
-    
-    # Count entries to determine status
-    entries = supabase.table('food_entries').select('id').eq('user_id', user_id).eq('date', str(date)).execute()
-    status = "final" if len(entries.data) >= 3 else "partial"
+    # Status from the entry count stored with the summary
+    status = determine_status(data['entry_count'])
     
     return {
         "date": str(date),
@@ -49,17 +111,32 @@ async def get_daily_summary(
         "status": status
     }
 
-@router.get("/weekly-summary")
+@router.get("/weekly-summary", response_model=WeeklySummaryResponse)
 async def get_weekly_summary(
+    request: Request,
     start: date,
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    summaries: DailySummaryRepository = Depends(get_daily_summary_repository)
 ):
     """Get weekly trends"""
+    return _cached_response(request, await cached_weekly_summary(user_id, start, summaries))
+
+
+async def cached_weekly_summary(user_id: str, start: date, summaries: DailySummaryRepository) -> CachedSummary:
     end_date = start + timedelta(days=7)
+    return await summary_cache.read_through(
+        user_id, 'weekly', str(start), str(end_date),
+        lambda: _load_weekly_summary(user_id, start, end_date, summaries)
+    )
 
-    result = supabase.table('daily_gut_summary').select('*').eq('user_id', user_id).gte('date', str(start)).lt('date', str(end_date)).execute()
 
-    if not result.data:
+async def _load_weekly_summary(
+    user_id: str, start: date, end_date: date, summaries: DailySummaryRepository
+) -> dict:
+
+    rows = await summaries.list_range(user_id, start, end_date, columns=SUMMARY_COLUMNS)
+
+    if not rows:
         return {
             "average_gut_score": 0,
             "start_date": str(start),
@@ -72,35 +149,104 @@ async def get_weekly_summary(
             "processed_trend": "stable"
         }
     
-    scores = [d['gut_score'] for d in result.data]
+    scores = [d['gut_score'] for d in rows]
     avg_score = sum(scores) // len(scores) if scores else 0
     
-    best = max(result.data, key=lambda x: x['gut_score'])
-    worst = min(result.data, key=lambda x: x['gut_score'])
+    best = max(rows, key=lambda x: x['gut_score'])
+    worst = min(rows, key=lambda x: x['gut_score'])
     
     # Calculate trends
-    fiber_scores = [d['fiber_score'] for d in result.data]
-    processed_scores = [d['processed_score'] for d in result.data]
-    
-    def get_trend(scores_list):
-        if len(scores_list) < 3:
-            return "stable"
-        first_half = sum(scores_list[:len(scores_list)//2]) / (len(scores_list)//2)
-        second_half = sum(scores_list[len(scores_list)//2:]) / (len(scores_list) - len(scores_list)//2)
-        diff = second_half - first_half
-        if diff > 5:
-            return "improving"
-        elif diff < -5:
-            return "declining"
-        return "stable"
+    fiber_scores = [d['fiber_score'] for d in rows]
+    processed_scores = [d['processed_score'] for d in rows]
     
     return {
         "average_gut_score": avg_score,"start_date": str(start),
         "end_date": str(end_date),
         "trend": get_trend(scores),
-        "daily_scores": result.data,
+        "daily_scores": rows,
         "best_day": best['date'],
         "worst_day": worst['date'],
         "fiber_trend": get_trend(fiber_scores),
         "processed_trend": get_trend(processed_scores)
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/summary/range", response_model=RangeSummaryResponse)
+async def get_range_summary(
+    request: Request,
+    start: date = Query(..., alias="from"),
+    to: date = Query(...),
+    granularity: str = Query("week", pattern="^(day|week|month|year)$"),
+    window: int = Query(4, ge=1, le=52, description="Periods per moving average point"),
+    user_id: str = Depends(get_current_user),
+    summaries: DailySummaryRepository = Depends(get_daily_summary_repository),
+    rollups: SummaryRollupRepository = Depends(get_summary_rollup_repository)
+):
+    """
+    Get trends over a date range, one point per day, ISO week, month or year
+    
+    `to` is inclusive. For week/month/year the range is widened to whole
+    periods, and the response reports the bounds actually covered.
+    """
+    if start > to:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    if granularity == 'day':
+        range_start, range_end = start, to + timedelta(days=1)
+        if (range_end - range_start).days > MAX_DAILY_RANGE_DAYS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Ranges over {MAX_DAILY_RANGE_DAYS} days need week, month or year granularity"
+            )
+    else:
+        range_start = period_start(start, granularity)
+        range_end = period_end(period_start(to, granularity), granularity)
+    
+    cached = await summary_cache.read_through(
+        user_id, f'range:{granularity}:{window}', str(range_start), str(range_end),
+        lambda: _load_range_summary(user_id, range_start, range_end, granularity, window, summaries, rollups)
+    )
+    return _cached_response(request, cached)
+
+
+async def _load_range_summary(
+    user_id: str,
+    range_start: date,
+    range_end: date,
+    granularity: str,
+    window: int,
+    summaries: DailySummaryRepository,
+    rollups: SummaryRollupRepository
+) -> dict:
+    if granularity == 'day':
+        days = await summaries.list_range(user_id, range_start, range_end, columns=DAY_SCORE_COLUMNS)
+        # A day is a period of one, so it takes the same shape as a rollup
+        rows = [rollup_from_days(user_id, 'day', date.fromisoformat(day['date']), [day]) for day in days]
+    else:
+        rows = await rollups.list_range(user_id, granularity, range_start, range_end, columns=PERIOD_COLUMNS)
+        rows = [row for row in rows if row['day_count']]
+    periods = [period_view(row, granularity) for row in rows]
+    
+    best = worst = None
+    for row in rows:
+        if best is None or is_better(row['best_score'], row['best_date'], best['best_score'], best['best_date'], 1):
+            best = row
+        if worst is None or is_better(row['worst_score'], row['worst_date'], worst['worst_score'], worst['worst_date'], -1):
+            worst = row
+    
+    total_days = sum(row['day_count'] for row in rows)
+    gut_scores = [p['average_gut_score'] for p in periods]
+    moving = moving_average(gut_scores, window)
+    
+    return {
+        "granularity": granularity,
+        "start_date": str(range_start),
+        "end_date": str(range_end),
+        "days": total_days,
+        "average_gut_score": sum(row['gut_score_sum'] for row in rows) // total_days if total_days else 0,
+        "trend": get_trend(gut_scores),
+        "fiber_trend": get_trend([p['average_fiber_score'] for p in periods]),
+        "processed_trend": get_trend([p['average_processed_score'] for p in periods]),
+        "best_day": best['best_date'] if best else None,
+        "worst_day": worst['worst_date'] if worst else None,
+        "periods": [{**p, "moving_average": m} for p, m in zip(periods, moving)],
+    }
@@ -1,62 +1,65 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException
 from app.api.deps import get_current_user
-from app.models.summary import DailySummaryStats
-from app.services.llm_services import generate_daily_tips
-from app.db.supabase import get_supabase_client
+from app.models.tips import GeneratedTipsResponse, TipsLogResponse
+from app.services.llm_services import TIPS_PROMPT_VERSION, daily_tips
+from app.repositories.daily_summaries import DailySummaryRepository, get_daily_summary_repository
+from app.repositories.tips import TipsRepository, get_tips_repository
+from app.services.event_hub import event_hub
+from app.services.tips_cache import SCORE_DIMENSIONS, score_fingerprint
 
 
 router = APIRouter()
-supabase = get_supabase_client()
 
-@router.post("/tips/generate")
+@router.post("/tips/generate", response_model=GeneratedTipsResponse)
 async def generate_tips(
     date: str, 
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    summaries: DailySummaryRepository = Depends(get_daily_summary_repository),
+    tips_repo: TipsRepository = Depends(get_tips_repository)
 ):
-    # 1. Fetch the stats automatically from the daily_summaries table
-    summary_res = supabase.table('daily_gut_summary') \
-        .select('fiber_score, diversity_score, processed_score, probiotic_score, digestive_score') \
-        .eq('user_id', user_id) \
-        .eq('date', date) \
-        .execute()
-
-    if not summary_res.data:
+    # 1. Fetch the stats from the daily_summaries table, and any stored tips
+    data, stored = await asyncio.gather(
+        summaries.get(user_id, date, columns=', '.join(SCORE_DIMENSIONS)),
+        tips_repo.get(user_id, date, columns='tips, score_key'),
+    )
+
+    if not data:
         raise HTTPException(status_code=400, detail="Log food first to generate tips.")
 
-    data = summary_res.data[0]
+    # 2. Stored tips still fit if the scores have not changed since
+    scores = {name: data.get(name) or 0 for name in SCORE_DIMENSIONS}
+    fingerprint = score_fingerprint(scores, TIPS_PROMPT_VERSION)
+    if stored and stored.get('score_key') == fingerprint:
+        return {"tips": stored['tips'], "source": "stored"}
 
-    # 2. Pass those stats to the LLM
-    tips = await generate_daily_tips(
-        fiber_score=data.get('fiber_score', 0),
-        diversity_score=data.get('diversity_score', 0),
-        processed_score=data.get('processed_score', 0),
-        probiotic_score=data.get('probiotic_score', 0),
-        digestive_score=data.get('digestive_score', 0)
-    )
+    # 3. Tips cache by score bucket, or the LLM
+    tips, source = await daily_tips(scores, seed=f"{user_id}|{date}")
 
-    # 3. Upsert into tips_log
-    tip_data = {'user_id': user_id, 'date': date, 'tips': tips}
-    supabase.table('tips_log').upsert(tip_data, on_conflict='user_id,date').execute()
+    # 4. Upsert into tips_log; fallback tips get no key so the next request retries
+    tip_data = {
+        'user_id': user_id, 'date': date, 'tips': tips,
+        'score_key': fingerprint if source != 'fallback' else None
+    }
+    await tips_repo.upsert(tip_data)
+    await event_hub.publish(user_id, 'tips_ready', {'date': date})
 
-    return {"tips": tips}
+    return {"tips": tips, "source": source}
 
-@router.get("/tips")
+@router.get("/tips", response_model=TipsLogResponse)
 async def get_tips(
     date: str, 
-    user_id: str = Depends(get_current_user)
+    user_id: str = Depends(get_current_user),
+    tips_repo: TipsRepository = Depends(get_tips_repository)
 ):
     """Retrieve stored tips for a specific date"""
-    result = supabase.table('tips_log') \
-        .select('date, tips') \
-        .eq('user_id', user_id) \
-        .eq('date', date) \
-        .execute()
+    stored = await tips_repo.get(user_id, date)
     
-    if not result.data:
+    if not stored:
         # Return a 404 so the frontend knows to show the "Generate" button
         raise HTTPException(status_code=404, detail="No tips found for this date")
     
     return {
         "date": date,
-        "tips": result.data[0]['tips']
+        "tips": stored['tips']
     }
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+Rebuild the cohort score sketches from daily_gut_summary
+
+Streams daily summaries in (user_id, date) order once, counting every
+day's scores and every user's per-day week averages, then writes them as
+the 'base' shard of a new epoch and deletes the shards of older epochs.
+API processes drop their own changes from before the rebuild on their next
+reload. Run it once after migrations/005_cohort_sketches.sql, after bulk
+rescoring, and whenever the live counts may have drifted (e.g. a process
+that died before persisting).
+
+Usage:
+    python -m app.cli.cohort_stats [--chunk-size 5000] [--dry-run]
+"""
+
+import argparse
+import asyncio
+from datetime import date, datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db.postgrest import close_postgrest_client
+from app.repositories.cohort_sketches import get_cohort_sketch_repository
+from app.repositories.daily_summaries import get_daily_summary_repository
+from app.services.cohort_stats import BASE_SHARD, ScoreSketch, add_scores, empty_sketches
+from app.services.rollup_services import DAY_SCORE_COLUMNS, SCORE_METRICS, period_start
+
+# Base rows per upsert
+WRITE_BATCH_SIZE = 500
+
+
+def _add_weeks(
+    sketches: Dict[Tuple[str, str], Dict[str, ScoreSketch]], weeks: Dict[str, List[Dict[str, Any]]]
+) -> None:
+    """Count one user's per-day average of each week (floored, as the rollups report it)"""
+    for start, days in weeks.items():
+        averages = {metric: sum(day[metric] or 0 for day in days) // len(days) for metric in SCORE_METRICS}
+        add_scores(sketches.setdefault(('week', start), empty_sketches()), averages)
+
+
+async def run(chunk_size: int = 5000, dry_run: bool = False) -> int:
+    summaries = get_daily_summary_repository()
+    sketches: Dict[Tuple[str, str], Dict[str, ScoreSketch]] = {}
+    after = None
+    current_user: Optional[str] = None
+    weeks: Dict[str, List[Dict[str, Any]]] = {}
+    day_total = 0
+
+    while True:
+        page = await summaries.page_by_user_date(
+            after, limit=chunk_size, columns='user_id, ' + DAY_SCORE_COLUMNS
+        )
+        for row in page:
+            if row['user_id'] != current_user:
+                _add_weeks(sketches, weeks)
+                current_user, weeks = row['user_id'], {}
+            add_scores(sketches.setdefault(('day', row['date']), empty_sketches()), row)
+            week = str(period_start(date.fromisoformat(row['date']), 'week'))
+            weeks.setdefault(week, []).append(row)
+        day_total += len(page)
+        if len(page) < chunk_size:
+            break
+        after = (page[-1]['user_id'], page[-1]['date'])
+    _add_weeks(sketches, weeks)
+
+    print(f"Counted {day_total} daily summaries into {len(sketches)} day/week sketches")
+    if dry_run:
+        return len(sketches)
+
+    epoch = datetime.now(timezone.utc).isoformat()
+    rows = [
+        {
+            'granularity': granularity,
+            'period_start': start,
+            'shard': BASE_SHARD,
+            'epoch': epoch,
+            'counts': {metric: period[metric].counts for metric in SCORE_METRICS},
+            'updated_at': epoch,
+        }
+        for (granularity, start), period in sketches.items()
+    ]
+    repository = get_cohort_sketch_repository()
+    for i in range(0, len(rows), WRITE_BATCH_SIZE):
+        await repository.upsert_many(rows[i:i + WRITE_BATCH_SIZE])
+    await repository.delete_other_epochs(epoch)
+    print(f"Wrote {len(rows)} sketches (epoch {epoch})")
+    return len(rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--dry-run', action='store_true', help="Count without writing")
+    args = parser.parse_args()
+
+    async def _main():
+        try:
+            await run(args.chunk_size, args.dry_run)
+        finally:
+            await close_postgrest_client()
+
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
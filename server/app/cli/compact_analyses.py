@@ -0,0 +1,98 @@
+"""
+Rewrite stored analyses in the compact format
+
+Run once after migrations/004_compact_analysis.sql, with
+ANALYSIS_COMPACT_WRITES on for every worker: workers from before the
+compact format cannot read rewritten rows, so the job refuses to write
+while the setting is off. Streams entries whose
+llm_analysis predates the compact format in id order and rewrites them
+with one statement per distinct analysis and page. Nothing is re-analyzed
+and no summary changes: the compact form decodes to the same scores.
+
+Rewritten rows leave the legacy filter, so an interrupted run simply
+starts over on what is left. Reads accept both formats, so the app keeps
+serving while it runs.
+
+Usage:
+    python -m app.cli.compact_analyses [--page-size 1000] [--concurrency 4] [--user <uuid>] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+from app.cli.reanalyze import Progress
+from app.core.config import settings
+from app.db.postgrest import close_postgrest_client
+from app.models.stored_analysis import encode_analysis
+from app.repositories.food_entries import get_food_entry_repository
+
+
+async def run(
+    page_size: int = 1000, concurrency: int = 4, user_id: Optional[str] = None, dry_run: bool = False
+) -> Dict[str, int]:
+    entries = get_food_entry_repository()
+    total = await entries.count_legacy_analyses(user_id)
+    progress = Progress('entries', total)
+    counts = {'entries': 0, 'written': 0, 'bytes_before': 0, 'bytes_after': 0}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _write(entry_ids: List[int], analysis: Dict[str, Any]) -> int:
+        async with semaphore:
+            return len(await entries.compact_analysis(entry_ids, analysis))
+
+    after_id = None
+    while True:
+        page = await entries.page_legacy_analyses(after_id, page_size, user_id=user_id)
+        if not page:
+            break
+        after_id = page[-1]['id']
+        counts['entries'] += len(page)
+
+        # Entries analyzed from the same text usually share an analysis: one write each
+        groups: Dict[str, List[int]] = {}
+        analyses: Dict[str, Dict[str, Any]] = {}
+        for row in page:
+            key = json.dumps(row['llm_analysis'], sort_keys=True)
+            groups.setdefault(key, []).append(row['id'])
+            analyses[key] = row['llm_analysis']
+            counts['bytes_before'] += len(json.dumps(row['llm_analysis'], separators=(',', ':')))
+            counts['bytes_after'] += len(json.dumps(encode_analysis(row['llm_analysis']), separators=(',', ':')))
+
+        if not dry_run:
+            written = await asyncio.gather(*(_write(ids, analyses[key]) for key, ids in groups.items()))
+            counts['written'] += sum(written)
+        progress.add(len(page), f", {counts['written']} written")
+        if len(page) < page_size:
+            break
+
+    progress.add(0, force=True)
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-size', type=int, default=1000, help="Entries read per round trip")
+    parser.add_argument('--concurrency', type=int, default=4, help="Writes in flight")
+    parser.add_argument('--user', help="Only rewrite one user's entries")
+    parser.add_argument('--dry-run', action='store_true', help="Count legacy entries and the bytes saved only")
+    args = parser.parse_args()
+    if not args.dry_run and not settings.ANALYSIS_COMPACT_WRITES:
+        parser.error("set ANALYSIS_COMPACT_WRITES once every worker reads the compact format (or use --dry-run)")
+
+    async def _main():
+        try:
+            counts = await run(args.page_size, args.concurrency, args.user, args.dry_run)
+            print(
+                f"{counts['entries']} legacy entries, {counts['written']} rewritten; "
+                f"analysis JSON {counts['bytes_before']} -> {counts['bytes_after']} bytes"
+            )
+        finally:
+            await close_postgrest_client()
+
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
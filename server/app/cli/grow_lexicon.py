@@ -0,0 +1,117 @@
+"""
+Grow the food lexicon from cached Gemini analyses
+
+Reads the persistent analysis cache (LLM_CACHE_SQLITE_PATH), keeps
+single-food analyses of short texts the lexicon does not recognize yet,
+groups them by phrase and proposes one consensus row per phrase seen at
+least --min-count times. Prints the rows as CSV; --write appends them to
+the lexicon file.
+
+Usage:
+    python -m app.cli.grow_lexicon [--db cache.sqlite] [--min-count 2] [--max-words 3] [--write]
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import statistics
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.food_lexicon import (
+    COMPLEXITY_LEVELS, DEFAULT_LEXICON_PATH, STOPWORDS, get_food_lexicon, stem, tokenize
+)
+
+FIELDS = ['name', 'fiber_grams', 'categories', 'is_processed', 'has_probiotics', 'digestive_complexity']
+
+
+def _candidate(normalized_text: str, analysis: Dict[str, Any], max_words: int) -> Optional[tuple]:
+    """(phrase, per-unit analysis) for a short single-food text, else None"""
+    if not isinstance(analysis, dict):
+        return None
+    # Analyses before analysis-v2 listed the foods instead of counting them
+    if analysis.get('food_count', len(analysis.get('foods') or [])) != 1:
+        return None
+    tokens = tokenize(normalized_text)
+    counts = [quantity for word, quantity in tokens if quantity is not None]
+    words = [word for word, quantity in tokens if quantity is None and word not in STOPWORDS]
+    if not words or len(words) > max_words or len(counts) > 1:
+        return None
+    count = counts[0] if counts and counts[0] > 0 else 1
+    try:
+        fiber = float(analysis.get('fiber_grams') or 0) / count
+    except (TypeError, ValueError):
+        return None
+    return ' '.join(words), fiber, analysis
+
+
+def _consensus(phrase: str, samples: List[tuple]) -> Dict[str, Any]:
+    fibers = [fiber for fiber, _ in samples]
+    analyses = [analysis for _, analysis in samples]
+    categories = Counter(
+        str(c).lower() for a in analyses for c in set(a.get('food_categories') or []) if c != 'unknown'
+    )
+    complexity = Counter(
+        a.get('digestive_complexity') for a in analyses if a.get('digestive_complexity') in COMPLEXITY_LEVELS
+    )
+    majority = len(analyses) / 2
+    return {
+        'name': phrase,
+        'fiber_grams': round(statistics.median(fibers), 1),
+        'categories': '|'.join(c for c, n in categories.most_common() if n >= majority),
+        'is_processed': int(sum(bool(a.get('is_processed')) for a in analyses) > majority),
+        'has_probiotics': int(sum(bool(a.get('has_probiotics')) for a in analyses) > majority),
+        'digestive_complexity': complexity.most_common(1)[0][0] if complexity else 'moderate',
+    }
+
+
+def propose(db_path: str, min_count: int, max_words: int) -> List[Dict[str, Any]]:
+    lexicon = get_food_lexicon()
+    groups: Dict[str, List[tuple]] = {}
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT normalized_text, value FROM llm_analysis_cache")
+        for normalized_text, value in rows:
+            if lexicon.analyze(normalized_text) is not None:
+                continue
+            candidate = _candidate(normalized_text, json.loads(value), max_words)
+            if candidate is None:
+                continue
+            phrase, fiber, analysis = candidate
+            if tuple(stem(word) for word in phrase.split()) in lexicon.index:
+                continue
+            groups.setdefault(phrase, []).append((fiber, analysis))
+    finally:
+        conn.close()
+    return [
+        _consensus(phrase, samples)
+        for phrase, samples in sorted(groups.items()) if len(samples) >= min_count
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=settings.LLM_CACHE_SQLITE_PATH, help="SQLite analysis cache")
+    parser.add_argument('--min-count', type=int, default=2, help="Cached texts needed per phrase")
+    parser.add_argument('--max-words', type=int, default=3)
+    parser.add_argument('--write', action='store_true', help="Append to the lexicon file")
+    args = parser.parse_args()
+    if not args.db:
+        parser.error("--db is required when LLM_CACHE_SQLITE_PATH is not set")
+
+    proposed = propose(args.db, args.min_count, args.max_words)
+    if args.write:
+        with open(settings.LEXICON_PATH or DEFAULT_LEXICON_PATH, 'a', newline='', encoding='utf-8') as f:
+            csv.DictWriter(f, FIELDS, lineterminator='\n').writerows(proposed)
+        print(f"Appended {len(proposed)} foods", file=sys.stderr)
+    else:
+        writer = csv.DictWriter(sys.stdout, FIELDS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(proposed)
+
+
+if __name__ == '__main__':
+    main()
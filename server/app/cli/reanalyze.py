@@ -0,0 +1,284 @@
+"""
+Re-analyze stored food entries after the model or analysis prompt changes
+
+Every analysis is stamped with the version it was made with:
+ANALYSIS_VERSION for Gemini, the lexicon's version (a hash of its CSV) for
+lexicon matches; older entries and fallbacks have none. This job streams
+the entries with any other version in id order, skips pending ones (the analysis queue owns
+those), and:
+
+1. analyzes each distinct food text once across all users. Texts are
+   deduplicated by their normalized form and go out LLM_BATCH_SIZE at a
+   time over --concurrency workers (lexicon and analysis cache first).
+2. writes results back with one statement per distinct text and page,
+   guarded on food_text so entries edited meanwhile keep their analysis.
+3. once every page is written, recomputes each affected (user, date)
+   summary exactly once, a user's days one after another.
+
+Progress is checkpointed to a SQLite file: the last written id, the
+analysis of every text seen so far and the days still to recompute. Run
+again with the same --checkpoint to resume; a checkpoint from another
+analysis version or --user is discarded, and a finished run clears it.
+Texts that could not be analyzed keep their old analysis and are picked
+up by the next run.
+
+Usage:
+    python -m app.cli.reanalyze [--checkpoint reanalyze.sqlite3] [--page-size 1000] [--concurrency 4] [--user <uuid>] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import json
+import sqlite3
+import time
+from datetime import date
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.db.postgrest import close_postgrest_client
+from app.models.food_entry import AnalysisStatus, analysis_status
+from app.repositories.food_entries import get_food_entry_repository
+from app.services.cohort_stats import cohort_stats
+from app.services.llm_cache import normalize_food_text
+from app.services.llm_services import analyze_food_texts, current_analysis_versions
+from app.services.summary_services import update_daily_summary
+
+
+def checkpoint_scope(user_id: Optional[str] = None) -> str:
+    return f"{'+'.join(current_analysis_versions())}|{user_id or '*'}"
+
+
+class Checkpoint:
+    """Resumable job state in SQLite for one scope (analysis version and user filter)"""
+
+    def __init__(self, path: str, scope: str):
+        self._conn = sqlite3.connect(path)
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS progress (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS analyses (text TEXT PRIMARY KEY, analysis TEXT NOT NULL)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS days (user_id TEXT NOT NULL, date TEXT NOT NULL, PRIMARY KEY (user_id, date))"
+            )
+            row = self._conn.execute("SELECT value FROM progress WHERE key = 'scope'").fetchone()
+            if row is None or row[0] != scope:
+                self._clear()
+                self._conn.execute("INSERT INTO progress VALUES ('scope', ?)", (scope,))
+
+    def _clear(self) -> None:
+        for table in ('progress', 'analyses', 'days'):
+            self._conn.execute(f"DELETE FROM {table}")
+
+    @property
+    def after_id(self) -> Optional[int]:
+        row = self._conn.execute("SELECT value FROM progress WHERE key = 'after_id'").fetchone()
+        return int(row[0]) if row else None
+
+    def analyses(self, texts: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Analyses already made for these normalized texts"""
+        found = {}
+        for text in texts:
+            row = self._conn.execute("SELECT analysis FROM analyses WHERE text = ?", (text,)).fetchone()
+            if row:
+                found[text] = json.loads(row[0])
+        return found
+
+    def add(self, analyses: Dict[str, Dict[str, Any]], days: Iterable[Tuple[str, str]]) -> None:
+        """Record new analyses and the days they will change, before the entries are written"""
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO analyses VALUES (?, ?)",
+                ((text, json.dumps(analysis)) for text, analysis in analyses.items()),
+            )
+            self._conn.executemany("INSERT OR IGNORE INTO days VALUES (?, ?)", days)
+
+    def advance(self, after_id: int) -> None:
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO progress VALUES ('after_id', ?)", (str(after_id),))
+
+    def days(self) -> List[Tuple[str, str]]:
+        return self._conn.execute("SELECT user_id, date FROM days ORDER BY user_id, date").fetchall()
+
+    def day_done(self, user_id: str, day: str) -> None:
+        with self._conn:
+            self._conn.execute("DELETE FROM days WHERE user_id = ? AND date = ?", (user_id, day))
+
+    def finish(self) -> None:
+        """Forget a completed run, so the next one starts over and retries failed texts"""
+        with self._conn:
+            self._clear()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class Progress:
+    """Prints done/total, rate and ETA at most every `interval` seconds"""
+
+    def __init__(self, label: str, total: int, interval: float = 2.0):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.started = time.perf_counter()
+        self._printed = 0.0
+
+    def add(self, count: int, detail: str = '', force: bool = False) -> None:
+        self.done += count
+        now = time.perf_counter()
+        if not force and now - self._printed < self.interval:
+            return
+        self._printed = now
+        rate = self.done / (now - self.started) if now > self.started else 0.0
+        remaining = max(self.total - self.done, 0)
+        eta = f"{remaining / rate:.0f}s" if rate else '?'
+        print(f"{self.label}: {self.done}/{self.total}, {rate:.1f}/s, ETA {eta}{detail}")
+
+
+async def _analyze(texts: Dict[str, str], concurrency: int) -> Dict[str, Dict[str, Any]]:
+    """Analyze normalized text -> spelling over a bounded pool; failures are left out"""
+    spellings = list(texts.items())
+    size = max(1, settings.LLM_BATCH_SIZE)
+    semaphore = asyncio.Semaphore(concurrency)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    async def _batch(batch: List[Tuple[str, str]]) -> None:
+        async with semaphore:
+            analyses = await analyze_food_texts([spelling for _, spelling in batch])
+        for normalized, spelling in batch:
+            if analyses.get(spelling) is not None:
+                results[normalized] = analyses[spelling]
+
+    await asyncio.gather(*(_batch(spellings[i:i + size]) for i in range(0, len(spellings), size)))
+    return results
+
+
+async def reanalyze_entries(
+    checkpoint: Checkpoint, page_size: int, concurrency: int, user_id: Optional[str] = None, dry_run: bool = False
+) -> Dict[str, int]:
+    """Stream stale entries, analyze their distinct texts and write the results back"""
+    entries = get_food_entry_repository()
+    versions = current_analysis_versions()
+    total = await entries.count_stale_analyses(versions, checkpoint.after_id, user_id)
+    progress = Progress('entries', total)
+    counts = {'entries': 0, 'written': 0, 'skipped': 0, 'texts': 0, 'analyzed': 0, 'failed': 0}
+    seen: set = set()
+
+    def _fetch(after_id: Optional[int]) -> asyncio.Task:
+        return asyncio.create_task(entries.page_stale_analyses(versions, after_id, page_size, user_id=user_id))
+
+    next_page = _fetch(checkpoint.after_id)
+    try:
+        while True:
+            page = await next_page
+            if not page:
+                break
+            # The next page is read while this one is analyzed and written
+            next_page = _fetch(page[-1]['id'])
+
+            rows = [row for row in page if analysis_status(row.get('llm_analysis')) != AnalysisStatus.pending]
+            counts['entries'] += len(page)
+            counts['skipped'] += len(page) - len(rows)
+            texts: Dict[str, str] = {}
+            for row in rows:
+                texts.setdefault(normalize_food_text(row['food_text']), row['food_text'])
+            counts['texts'] += len(texts.keys() - seen)
+            seen.update(texts)
+
+            if dry_run:
+                progress.add(len(page), f", {len(seen)} distinct texts")
+                continue
+
+            known = checkpoint.analyses(texts)
+            missing = {text: spelling for text, spelling in texts.items() if text not in known}
+            fresh = await _analyze(missing, concurrency)
+            counts['analyzed'] += len(fresh)
+            counts['failed'] += len(missing) - len(fresh)
+            analyses = {**known, **fresh}
+
+            by_text: Dict[str, List[Dict[str, Any]]] = {}
+            for row in rows:
+                if normalize_food_text(row['food_text']) in analyses:
+                    by_text.setdefault(row['food_text'], []).append(row)
+            checkpoint.add(fresh, {(row['user_id'], row['date']) for group in by_text.values() for row in group})
+
+            writes = await asyncio.gather(*(
+                entries.set_analysis([row['id'] for row in group], food_text, analyses[normalize_food_text(food_text)])
+                for food_text, group in by_text.items()
+            ))
+            counts['written'] += sum(len(updated) for updated in writes)
+            checkpoint.advance(page[-1]['id'])
+            progress.add(len(page), f", {counts['written']} written, {counts['analyzed']} texts analyzed")
+    finally:
+        next_page.cancel()
+
+    progress.add(0, force=True)
+    return counts
+
+
+async def recompute_summaries(checkpoint: Checkpoint, concurrency: int) -> int:
+    """Rebuild every recorded day once; days of one user run in order so rollup updates do not race"""
+    days = checkpoint.days()
+    progress = Progress('days', len(days))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _user(user_id: str, user_days: List[str]) -> None:
+        async with semaphore:
+            for day in user_days:
+                await update_daily_summary(user_id, date.fromisoformat(day))
+                checkpoint.day_done(user_id, day)
+                progress.add(1)
+
+    await asyncio.gather(*(
+        _user(user_id, [day for _, day in group]) for user_id, group in groupby(days, key=lambda d: d[0])
+    ))
+    progress.add(0, force=True)
+    return len(days)
+
+
+async def run(
+    checkpoint_path: str,
+    page_size: int = 1000,
+    concurrency: int = 4,
+    user_id: Optional[str] = None,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    checkpoint = Checkpoint(':memory:' if dry_run else checkpoint_path, checkpoint_scope(user_id))
+    try:
+        print(f"Re-analyzing entries not at {' or '.join(current_analysis_versions())}")
+        counts = await reanalyze_entries(checkpoint, page_size, concurrency, user_id, dry_run)
+        print(
+            f"{counts['entries']} entries ({counts['skipped']} pending, skipped), {counts['texts']} distinct texts: "
+            f"{counts['analyzed']} analyzed, {counts['failed']} failed, {counts['written']} entries written"
+        )
+        if not dry_run:
+            counts['days'] = await recompute_summaries(checkpoint, concurrency)
+            checkpoint.finish()
+            print(f"Recomputed {counts['days']} daily summaries")
+        return counts
+    finally:
+        checkpoint.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--checkpoint', default='reanalyze.sqlite3', help="Progress file; rerun with it to resume")
+    parser.add_argument('--page-size', type=int, default=1000, help="Entries read per round trip")
+    parser.add_argument('--concurrency', type=int, default=4, help="Analysis batches (and users' summaries) in flight")
+    parser.add_argument('--user', help="Only re-analyze one user")
+    parser.add_argument('--dry-run', action='store_true', help="Count stale entries and distinct texts only")
+    args = parser.parse_args()
+
+    async def _main():
+        try:
+            await run(args.checkpoint, args.page_size, args.concurrency, args.user, args.dry_run)
+        finally:
+            # Summary rewrites moved this process's cohort sketches
+            await cohort_stats.stop()
+            await close_postgrest_client()
+
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
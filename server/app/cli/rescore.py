@@ -0,0 +1,99 @@
+"""
+Bulk rescoring backfill for daily_gut_summary
+
+Streams food_entries in (user_id, date, id) order with keyset pagination,
+scores complete (user, date) groups with the vectorized batch scorer and
+bulk-upserts the results, then rebuilds the rollups and (for a full run)
+the cohort sketches. Run it after changing WEIGHT_* or TARGET_*.
+
+Usage:
+    python -m app.cli.rescore [--chunk-size 5000] [--user <uuid>] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.cli import cohort_stats, rollups
+from app.db.postgrest import close_postgrest_client
+from app.repositories.daily_summaries import get_daily_summary_repository
+from app.repositories.food_entries import get_food_entry_repository
+from app.services.batch_scoring import score_groups
+from app.services.summary_services import is_scorable
+
+
+def _summary_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    scored = score_groups(
+        ((row['user_id'], row['date']), row['llm_analysis'])
+        for row in rows if is_scorable(row.get('llm_analysis'))
+    )
+    updated_at = datetime.utcnow().isoformat()
+    return [
+        {'user_id': user_id, 'date': day, **scores, 'updated_at': updated_at}
+        for (user_id, day), scores in scored.items()
+    ]
+
+
+async def run(chunk_size: int, user_id: Optional[str] = None, dry_run: bool = False) -> Tuple[int, int]:
+    entries = get_food_entry_repository()
+    summaries = get_daily_summary_repository()
+
+    started = time.perf_counter()
+    after = None
+    carry: List[Dict[str, Any]] = []
+    entry_total = day_total = 0
+
+    while True:
+        page = await entries.page_by_user_day(after, limit=chunk_size, user_id=user_id)
+        if page:
+            last = page[-1]
+            after = (last['user_id'], last['date'], last['id'])
+        rows = carry + page
+
+        if len(page) == chunk_size:
+            # The last (user, date) may continue on the next page; hold it back
+            tail_key = (rows[-1]['user_id'], rows[-1]['date'])
+            split = len(rows)
+            while split and (rows[split - 1]['user_id'], rows[split - 1]['date']) == tail_key:
+                split -= 1
+            rows, carry = rows[:split], rows[split:]
+        else:
+            carry = []
+
+        summary_rows = _summary_rows(rows)
+        if not dry_run:
+            await summaries.upsert_many(summary_rows)
+
+        entry_total += len(rows)
+        day_total += len(summary_rows)
+        elapsed = time.perf_counter() - started
+        print(f"{entry_total} entries, {day_total} days, {entry_total / elapsed:.0f} entries/s")
+
+        if len(page) < chunk_size:
+            if not dry_run:
+                await rollups.run(chunk_size, user_id)
+                if user_id is None:
+                    await cohort_stats.run(chunk_size)
+            return entry_total, day_total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--user', help="Only rescore one user")
+    parser.add_argument('--dry-run', action='store_true', help="Score without writing")
+    args = parser.parse_args()
+
+    async def _main():
+        try:
+            await run(args.chunk_size, args.user, args.dry_run)
+        finally:
+            await close_postgrest_client()
+
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Rebuild week/month/year rollups from daily_gut_summary
+
+Streams daily summaries in (user_id, date) order and rewrites every rollup
+of each user. Run it once after migrations/002_summary_rollups.sql and
+after bulk rescoring.
+
+Usage:
+    python -m app.cli.rollups [--chunk-size 5000] [--user <uuid>]
+"""
+
+import argparse
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from app.db.postgrest import close_postgrest_client
+from app.repositories.daily_summaries import get_daily_summary_repository
+from app.repositories.summary_rollups import get_summary_rollup_repository
+from app.services.rollup_services import DAY_SCORE_COLUMNS, build_rollups
+
+
+async def _flush(user_id: str, days: List[Dict[str, Any]]) -> int:
+    rows = build_rollups(user_id, days)
+    await get_summary_rollup_repository().upsert_many(rows)
+    return len(rows)
+
+
+async def run(chunk_size: int = 5000, user_id: Optional[str] = None) -> int:
+    summaries = get_daily_summary_repository()
+    after = None
+    current_user: Optional[str] = None
+    days: List[Dict[str, Any]] = []
+    rollup_total = 0
+
+    while True:
+        page = await summaries.page_by_user_date(
+            after, limit=chunk_size, columns='user_id, ' + DAY_SCORE_COLUMNS, user_id=user_id
+        )
+        for row in page:
+            if row['user_id'] != current_user:
+                if days:
+                    rollup_total += await _flush(current_user, days)
+                current_user, days = row['user_id'], []
+            days.append(row)
+        if len(page) < chunk_size:
+            break
+        after = (page[-1]['user_id'], page[-1]['date'])
+
+    if days:
+        rollup_total += await _flush(current_user, days)
+    print(f"Rebuilt {rollup_total} rollups")
+    return rollup_total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--user', help="Only rebuild one user")
+    args = parser.parse_args()
+
+    async def _main():
+        try:
+            await run(args.chunk_size, args.user)
+        finally:
+            await close_postgrest_client()
+
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Consistency check and repair for incrementally maintained daily summaries
+
+Usage:
+    python -m app.cli.summaries --user <uuid> --from 2025-01-01 --to 2025-02-01 [--repair]
+"""
+
+import argparse
+import asyncio
+from datetime import date, timedelta
+
+from app.db.postgrest import close_postgrest_client
+from app.repositories.daily_summaries import get_daily_summary_repository
+from app.services.cohort_stats import cohort_stats
+from app.services.summary_services import verify_daily_summary
+
+
+async def run(user_id: str, start: date, end: date, repair: bool) -> int:
+    rows = await get_daily_summary_repository().list_range(user_id, start, end, columns='date')
+    checked = mismatched = 0
+    for row in rows:
+        checked += 1
+        if not await verify_daily_summary(user_id, date.fromisoformat(row['date']), repair=repair):
+            mismatched += 1
+            print(f"{row['date']}: inconsistent{' (repaired)' if repair else ''}")
+    print(f"Checked {checked} days, {mismatched} inconsistent")
+    return mismatched
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--user', required=True, help="User ID")
+    parser.add_argument('--from', dest='start', type=date.fromisoformat, default=date.today() - timedelta(days=30))
+    parser.add_argument('--to', dest='end', type=date.fromisoformat, default=date.today() + timedelta(days=1))
+    parser.add_argument('--repair', action='store_true', help="Rewrite inconsistent days from scratch")
+    args = parser.parse_args()
+
+    async def _main():
+        try:
+            return await run(args.user, args.start, args.end, args.repair)
+        finally:
+            # Summary rewrites moved this process's cohort sketches
+            await cohort_stats.stop()
+            await close_postgrest_client()
+
+    raise SystemExit(1 if asyncio.run(_main()) and not args.repair else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Pre-generate tips for the most common score buckets
+
+Counts the score buckets of recent daily summaries and fills the most
+frequent ones up to TIPS_CACHE_VARIANTS tip sets each, so users landing in
+them are served from the cache. The results go to the SQLite tier, which
+TIPS_CACHE_SQLITE_PATH (or --db) must point at for the API to read them.
+
+Usage:
+    python -m app.cli.warm_tips --db tips.sqlite3 [--days 30] [--top 100] [--dry-run]
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.db.postgrest import close_postgrest_client
+from app.repositories.daily_summaries import get_daily_summary_repository
+from app.services.llm_services import TIPS_PROMPT_VERSION, request_daily_tips
+from app.services.tips_cache import SCORE_DIMENSIONS, TipsCache, bucket_scores
+
+
+async def count_buckets(cache: TipsCache, since: date, chunk_size: int) -> Counter:
+    summaries = get_daily_summary_repository()
+    buckets: Counter = Counter()
+    after: Optional[Tuple[str, str]] = None
+    while True:
+        page = await summaries.page_by_user_date(
+            after, limit=chunk_size, columns='user_id, date, ' + ', '.join(SCORE_DIMENSIONS)
+        )
+        for row in page:
+            if row['date'] >= str(since):
+                buckets[cache.bucket(row)] += 1
+        if len(page) < chunk_size:
+            return buckets
+        after = (page[-1]['user_id'], page[-1]['date'])
+
+
+async def run(
+    db: str, days: int = 30, top: int = 100, chunk_size: int = 5000, concurrency: int = 4, dry_run: bool = False
+) -> int:
+    cache = TipsCache(
+        prompt_version=TIPS_PROMPT_VERSION,
+        bucket_size=settings.TIPS_CACHE_BUCKET_SIZE,
+        variants=settings.TIPS_CACHE_VARIANTS,
+        max_entries=max(top, 1),
+        ttl=settings.TIPS_CACHE_TTL_SECONDS,
+        sqlite_path=db,
+    )
+    buckets = await count_buckets(cache, date.today() - timedelta(days=days), chunk_size)
+    common = buckets.most_common(top)
+    covered = sum(count for _, count in common)
+    print(f"{len(buckets)} buckets over {sum(buckets.values())} recent days; top {len(common)} cover {covered}")
+    if dry_run:
+        for bucket, count in common[:20]:
+            print(f"  {bucket_scores(bucket, cache.bucket_size)}: {count}")
+        return 0
+
+    semaphore = asyncio.Semaphore(concurrency)
+    generated = 0
+
+    async def _fill(bucket: Tuple[int, ...]) -> None:
+        nonlocal generated
+        for _ in range(cache.variants - len(await cache.variants_for(bucket))):
+            async with semaphore:
+                try:
+                    tips = await request_daily_tips(bucket_scores(bucket, cache.bucket_size))
+                except Exception as e:
+                    print(f"Tips generation failed for {bucket}: {e}")
+                    return
+            await cache.add(bucket, tips)
+            generated += 1
+
+    await asyncio.gather(*(_fill(bucket) for bucket, _ in common))
+    print(f"Generated {generated} tip sets into {db}")
+    return generated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', default=settings.TIPS_CACHE_SQLITE_PATH, help="Tips cache SQLite file")
+    parser.add_argument('--days', type=int, default=30, help="Summaries this recent are counted")
+    parser.add_argument('--top', type=int, default=100, help="Buckets to fill")
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--dry-run', action='store_true', help="Only report bucket frequencies")
+    args = parser.parse_args()
+    if not args.db:
+        parser.error("--db is required when TIPS_CACHE_SQLITE_PATH is not set")
+
+    async def _main():
+        try:
+            await run(args.db, args.days, args.top, args.chunk_size, args.concurrency, args.dry_run)
+        finally:
+            await close_postgrest_client()
+
+    asyncio.run(_main())
+
+
+if __name__ == '__main__':
+    main()
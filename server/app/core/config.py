@@ -2,8 +2,10 @@
 Configuration settings for the Gut Health Tracker API
 """
 
+import os
+
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -13,14 +15,122 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     
+    # Auth Configuration
+    AUTH_MODE: str = "remote"  # "remote" calls Supabase Auth; "local" verifies JWTs in-process (needs the secret or JWKS)
+    SUPABASE_JWT_SECRET: Optional[str] = None  # HS256 projects; asymmetric keys come from JWKS
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    SUPABASE_JWT_ISSUER: Optional[str] = None  # defaults to {SUPABASE_URL}/auth/v1
+    JWKS_CACHE_TTL_SECONDS: int = 600
+    JWKS_MIN_REFRESH_SECONDS: int = 30
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    
+    # Database HTTP Pool (PostgREST)
+    DB_MAX_CONNECTIONS: int = 100
+    DB_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    DB_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    DB_HTTP2: bool = True
+    DB_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    DB_QUERY_TIMEOUT_SECONDS: float = 10.0
+    
     # OpenAI Configuration
-    GEMINI_API_KEY: str
+    GEMINI_API_KEY: Optional[str] = None  # without it every analysis and tip uses the fallback
+    GEMINI_BASE_URL: Optional[str] = None  # override the API endpoint, e.g. a local stand-in
+    LLM_ANALYSIS_MAX_OUTPUT_TOKENS: int = 128  # per food; a schema-shaped analysis is ~60 tokens
+    LLM_TIPS_MAX_OUTPUT_TOKENS: int = 192
+    LLM_THINKING_BUDGET: int = 0  # thinking tokens count as output; extraction and tips need none
+    
+    # LLM Gateway
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_RATE_PER_SECOND: float = 10.0
+    LLM_BURST: int = 20
+    LLM_MAX_QUEUE_WAIT_SECONDS: float = 15.0
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    
+    # LLM Analysis Cache
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+    LLM_CACHE_TTL_SECONDS: int = 30 * 24 * 3600
+    LLM_CACHE_SQLITE_PATH: Optional[str] = None  # set to enable the persistent tier
+    
+    # Food Lexicon (local fast path before Gemini)
+    LEXICON_ENABLED: bool = True
+    LEXICON_MIN_CONFIDENCE: float = 0.8  # share of food words the lexicon must recognize
+    LEXICON_PATH: Optional[str] = None  # defaults to app/data/food_lexicon.csv
+    
+    # Tips Cache (keyed by score buckets)
+    TIPS_CACHE_ENABLED: bool = True
+    TIPS_CACHE_BUCKET_SIZE: int = 10  # score points per bucket in each of the five dimensions
+    TIPS_CACHE_VARIANTS: int = 3  # distinct tip sets kept per bucket
+    TIPS_CACHE_MAX_ENTRIES: int = 5000
+    TIPS_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    TIPS_CACHE_SQLITE_PATH: Optional[str] = None  # shared with `python -m app.cli.warm_tips`
+    
+    # Bulk Import
+    BULK_MAX_ENTRIES: int = 500
+    LLM_BATCH_SIZE: int = 20  # food texts per multi-item analysis prompt
+    
+    # Background Analysis (opt-in: entries return 202 and are analyzed by a worker pool)
+    ASYNC_ANALYSIS_ENABLED: bool = False
+    ANALYSIS_WORKERS: int = 4
+    ANALYSIS_QUEUE_MAX_SIZE: int = 1000
+    ANALYSIS_MAX_ATTEMPTS: int = 3
+    ANALYSIS_RETRY_BACKOFF_SECONDS: float = 2.0
+    
+    # Analysis Storage (reads accept both formats; turn compact writes on only once every worker runs this code)
+    ANALYSIS_COMPACT_WRITES: bool = False  # store llm_analysis in the compact format (app/models/stored_analysis.py)
+    
+    # Summary Response Cache
+    SUMMARY_CACHE_ENABLED: bool = True  # the in-memory backend only turns on with one worker (SERVER_WORKERS=1)
+    SUMMARY_CACHE_MAX_ENTRIES: int = 10000
+    SUMMARY_CACHE_TTL_SECONDS: int = 300
+    
+    # Summary Updates
+    SUMMARY_RECOMPUTE_WINDOW_SECONDS: float = 0.02  # writes to the same day within this window share one update
+    SUMMARY_WRITE_MAX_ATTEMPTS: int = 10  # conditional writes that lost to another worker are retried this often
+    SUMMARY_WRITE_BACKOFF_SECONDS: float = 0.01  # random wait before retry n is up to n times this
+    
+    # Cohort Percentiles (GET /cohort/percentiles)
+    COHORT_STATS_ENABLED: bool = True
+    COHORT_PERSIST_SECONDS: float = 60.0  # write this process's sketch changes and reload other workers'
+    COHORT_MAX_PERIODS: int = 64  # day/week sketches kept in memory
+    COHORT_MIN_POPULATION: int = 20  # smaller cohorts get no percentiles
+    
+    # Idempotent Writes (Idempotency-Key header on food-entry create/update)
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600  # how long a retry can still replay the first response
+    IDEMPOTENCY_LEASE_SECONDS: float = 120.0  # an unfinished claim older than this is taken over
+    IDEMPOTENCY_POLL_SECONDS: float = 0.2  # how often a duplicate on another process checks the original
+    
+    # History Export
+    EXPORT_PAGE_SIZE: int = 1000  # rows per database round trip; bounds export memory
+    
+    # Live Events (server-sent events on /events; served only with SERVER_WORKERS=1 or a shared event backend)
+    EVENTS_QUEUE_SIZE: int = 32  # undelivered events per stream before the oldest are dropped
+    EVENTS_MAX_STREAMS_PER_USER: int = 5
+    EVENTS_HEARTBEAT_SECONDS: float = 15.0  # keeps idle connections open through proxies
+    EVENTS_RETRY_MS: int = 3000  # reconnect delay suggested to clients
+    
+    # Observability
+    METRICS_ENABLED: bool = True
+    SLOW_REQUEST_SECONDS: float = 1.0  # slower requests log their per-stage breakdown
     
     # Server Configuration
     HOST: str = "0.0.0.0"
     PORT: int = 8000
     ENVIRONMENT: str = "development"
     
+    # Production Server (`python serve.py`)
+    SERVER_WORKERS: int = 0  # worker processes; 0 = one per CPU core
+    SERVER_LOOP: str = "uvloop"  # falls back to asyncio where uvloop is not installed (Windows)
+    SERVER_HTTP: str = "httptools"
+    SERVER_BACKLOG: int = 2048  # pending connections queued by the kernel per listening socket
+    SERVER_KEEP_ALIVE_SECONDS: int = 75  # above typical load balancer idle timeouts (60s)
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None  # per worker; excess connections get 503
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30  # in-flight requests, then queued analyses, get this long
+    SERVER_ACCESS_LOG: bool = False
+    READY_CHECK_TIMEOUT_SECONDS: float = 5.0  # per dependency checked by /ready
+    
     # CORS Configuration
     CORS_ORIGINS: List[str] = ["http://localhost:8080", "https://gut-health-gd2w.vercel.app", "http://127.0.0.1:8080"]
     
@@ -45,4 +155,9 @@ class Settings(BaseSettings):
 
 
 # Global settings instance
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+
+def server_workers() -> int:
+    """Worker processes serve.py runs"""
+    return settings.SERVER_WORKERS or os.cpu_count() or 1
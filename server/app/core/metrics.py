@@ -0,0 +1,265 @@
+"""
+Request and stage latency metrics with a Prometheus text endpoint
+
+Counters and histograms live in-process and are rendered in the Prometheus
+text format on /metrics; component stats (caches, LLM gateway, queue) are
+collected at scrape time. Stage spans (auth, db, llm, scoring) record into
+a histogram and into the current request's breakdown, which the middleware
+logs for requests slower than SLOW_REQUEST_SECONDS.
+
+Recording is a perf_counter pair and a few dict updates, cheap enough to
+leave on in production.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+# Latency buckets in seconds, from cache hits to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Fixed-bucket histogram; each series is [count per bucket..., sum, count]"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 3)
+        # Index len(buckets) is the +Inf bucket; cumulative counts are built at render
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        bounds = self.buckets + (float('inf'),)
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, series):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{suffix} {int(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, documentation, labelnames)
+        return self._metrics[name]
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return self._metrics[name]
+
+    def register_stats(
+        self, prefix: str, stats: Callable[[], Dict[str, Any]], counters: Iterable[str] = ()
+    ) -> None:
+        """
+        Export a component's stats() dict at scrape time
+
+        Numeric values become `{prefix}_{key}` gauges, or `{prefix}_{key}_total`
+        counters for the keys in `counters`; strings become a `{prefix}_{key}`
+        gauge of 1 with the value as a label.
+        """
+        counters = frozenset(counters)
+
+        def _collect() -> List[str]:
+            lines = []
+            for key, value in stats().items():
+                name = f"{prefix}_{key}"
+                if isinstance(value, str):
+                    lines += [f"# TYPE {name} gauge", f'{name}{{value="{_escape(value)}"}} 1']
+                elif isinstance(value, (int, float)):
+                    kind = 'counter' if key in counters else 'gauge'
+                    if kind == 'counter' and not name.endswith('_total'):
+                        name += '_total'
+                    lines += [f"# TYPE {name} {kind}", f"{name} {_format_value(value)}"]
+            return lines
+
+        self._collectors.append(_collect)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines += metric.render()
+        for collect in self._collectors:
+            try:
+                lines += collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e!r}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Request latency by endpoint and status', ('method', 'handler', 'status')
+)
+STAGE_SECONDS = registry.histogram(
+    'stage_duration_seconds', 'Time spent per request stage (auth, db, llm, scoring)', ('stage',)
+)
+SLOW_REQUESTS = registry.counter(
+    'http_slow_requests_total', 'Requests slower than SLOW_REQUEST_SECONDS', ('handler',)
+)
+
+# Per-request stage totals: stage -> [seconds, calls]; shared with child tasks
+_request_stages: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar('request_stages', default=None)
+
+
+class span:
+    """
+    Time a stage of the current request
+
+    Usable as `with span('db'):` or `async with span('db'):`. Overlapping
+    spans of concurrent tasks are each counted, so a request's stage total
+    can exceed its wall time.
+    """
+
+    __slots__ = ('stage', 'started')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+
+    def __enter__(self) -> 'span':
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not settings.METRICS_ENABLED:
+            return
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, self.stage)
+        stages = _request_stages.get()
+        if stages is not None:
+            total = stages.get(self.stage)
+            if total is None:
+                stages[self.stage] = [elapsed, 1]
+            else:
+                total[0] += elapsed
+                total[1] += 1
+
+    async def __aenter__(self) -> 'span':
+        return self.__enter__()
+
+    async def __aexit__(self, *exc) -> None:
+        self.__exit__(*exc)
+
+
+def format_breakdown(elapsed: float, stages: Dict[str, List[float]]) -> str:
+    parts = [
+        f"{stage}={seconds * 1000:.1f}ms" + (f"(x{int(calls)})" if calls > 1 else '')
+        for stage, (seconds, calls) in sorted(stages.items(), key=lambda item: -item[1][0])
+    ]
+    return f"{elapsed * 1000:.1f}ms total" + (': ' + ' '.join(parts) if parts else '')
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and logging slow requests"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        stages: Dict[str, List[float]] = {}
+        token = _request_stages.set(stages)
+        status = 500
+        streaming = False
+
+        async def _send(message):
+            nonlocal status, streaming
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                streaming = any(
+                    name == b'content-type' and value.startswith(b'text/event-stream')
+                    for name, value in message.get('headers', ())
+                )
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _request_stages.reset(token)
+            # Event streams stay open for minutes; their length is not latency
+            if not streaming:
+                self._record(scope, status, time.perf_counter() - started, stages)
+
+    @staticmethod
+    def _record(scope, status: int, elapsed: float, stages: Dict[str, List[float]]) -> None:
+        # Labelled by endpoint function, not raw path, to keep cardinality bounded
+        handler = getattr(scope.get('endpoint'), '__name__', 'unmatched')
+        REQUEST_SECONDS.observe(elapsed, scope['method'], handler, str(status))
+        if elapsed >= settings.SLOW_REQUEST_SECONDS:
+            SLOW_REQUESTS.inc(handler)
+            print(
+                f"Slow request {scope['method']} {scope['path']} ({handler}) {status}: "
+                f"{format_breakdown(elapsed, stages)}"
+            )
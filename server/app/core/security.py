@@ -0,0 +1,174 @@
+"""
+Supabase access token verification
+
+Tokens are verified in-process against the project's JWT secret (HS256) or
+its published JWKS (asymmetric keys). Verified tokens are memoized until they
+expire so repeat requests skip signature checks entirely.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+import jwt
+
+from app.core.config import settings
+
+
+class AuthError(Exception):
+    """Raised when a token cannot be verified"""
+
+
+def _issuer() -> str:
+    return settings.SUPABASE_JWT_ISSUER or f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1"
+
+
+class JWKSCache:
+    """
+    Signing keys from the Supabase JWKS endpoint, cached with a TTL
+
+    The key set is refetched when the TTL lapses or when a token names a
+    key id we have not seen (key rotation), but never more often than
+    JWKS_MIN_REFRESH_SECONDS so bad tokens cannot hammer the endpoint.
+    """
+
+    def __init__(self, url: str, ttl: int, min_refresh: int):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh = min_refresh
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._fetched_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+
+    async def get_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        now = time.monotonic()
+        age = None if self._fetched_at is None else now - self._fetched_at
+        missing = kid not in self._keys
+        if age is None or age > self.ttl or (missing and age > self.min_refresh):
+            await self._refresh(now)
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise AuthError("Unknown signing key")
+        return key
+
+    def has_keys(self) -> bool:
+        return bool(self._keys)
+
+    async def warm(self) -> None:
+        """Fetch the key set ahead of the first token"""
+        if self._fetched_at is None:
+            await self._refresh(time.monotonic())
+
+    async def _refresh(self, started_at: float) -> None:
+        async with self._lock:
+            # Another request refreshed while we waited for the lock
+            if self._fetched_at is not None and self._fetched_at > started_at:
+                return
+            async with httpx.AsyncClient(timeout=5.0) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+            keys = {}
+            for jwk in response.json().get('keys', []):
+                try:
+                    parsed = jwt.PyJWK(jwk)
+                except jwt.PyJWKError:
+                    continue  # unsupported key type, skip it
+                keys[parsed.key_id] = parsed
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+
+class TokenCache:
+    """Bounded LRU of verified tokens keyed by SHA-256 of the raw token"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        user_id, exp = cached
+        if exp <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return user_id
+
+    def put(self, token: str, user_id: str, exp: float) -> None:
+        key = self._key(token)
+        self._entries[key] = (user_id, exp)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+jwks_cache = JWKSCache(
+    f"{_issuer()}/.well-known/jwks.json",
+    ttl=settings.JWKS_CACHE_TTL_SECONDS,
+    min_refresh=settings.JWKS_MIN_REFRESH_SECONDS,
+)
+token_cache = TokenCache(settings.TOKEN_CACHE_MAX_SIZE)
+
+
+async def verify_access_token(token: str) -> str:
+    """
+    Verify a Supabase access token locally and return its user_id
+
+    Checks signature, expiry, audience and issuer.
+
+    Args:
+        token: Raw bearer token
+
+    Returns:
+        str: The token subject (user UUID)
+
+    Raises:
+        AuthError: If the token is invalid or expired
+    """
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError as e:
+        raise AuthError(str(e)) from e
+
+    algorithm = header.get('alg')
+    if algorithm == 'HS256':
+        if not settings.SUPABASE_JWT_SECRET:
+            raise AuthError("SUPABASE_JWT_SECRET is not configured")
+        key: Any = settings.SUPABASE_JWT_SECRET
+    else:
+        try:
+            jwk = await jwks_cache.get_key(header.get('kid'))
+        except httpx.HTTPError as e:
+            raise AuthError(f"Could not fetch JWKS: {e}") from e
+        key = jwk.key
+        algorithm = jwk.algorithm_name
+
+    try:
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=settings.SUPABASE_JWT_AUDIENCE,
+            issuer=_issuer(),
+            options={'require': ['exp', 'sub']},
+        )
+    except jwt.InvalidTokenError as e:
+        raise AuthError(str(e)) from e
+
+    token_cache.put(token, claims['sub'], float(claims['exp']))
+    return claims['sub']
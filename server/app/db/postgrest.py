@@ -0,0 +1,58 @@
+"""
+Async PostgREST client backed by a shared, pooled HTTP connection
+"""
+
+from typing import Optional
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from app.core.config import settings
+
+_http_client: Optional[httpx.AsyncClient] = None
+_postgrest_client: Optional[AsyncPostgrestClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared HTTP/2 connection pool used for all database calls"""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            http2=settings.DB_HTTP2,
+            limits=httpx.Limits(
+                max_connections=settings.DB_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DB_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.DB_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(
+                settings.DB_QUERY_TIMEOUT_SECONDS,
+                connect=settings.DB_CONNECT_TIMEOUT_SECONDS,
+            ),
+            follow_redirects=True,
+        )
+    return _http_client
+
+
+def get_postgrest_client() -> AsyncPostgrestClient:
+    global _postgrest_client
+    if _postgrest_client is None:
+        _postgrest_client = AsyncPostgrestClient(
+            f"{settings.SUPABASE_URL.rstrip('/')}/rest/v1",
+            headers={
+                'apikey': settings.SUPABASE_KEY,
+                'Authorization': f"Bearer {settings.SUPABASE_KEY}",
+                'Accept': 'application/json',
+                'Content-Type': 'application/json',
+            },
+            http_client=get_http_client(),
+        )
+    return _postgrest_client
+
+
+async def close_postgrest_client() -> None:
+    """Close pooled connections (called on application shutdown)"""
+    global _http_client, _postgrest_client
+    if _http_client is not None:
+        await _http_client.aclose()
+    _http_client = None
+    _postgrest_client = None
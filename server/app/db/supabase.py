@@ -1,13 +1,18 @@
-from supabase import create_client, Client
+from typing import TYPE_CHECKING, Optional
 from app.core.config import settings
 
-_supabase_client: Client = None
+if TYPE_CHECKING:
+    from supabase import Client
 
-def get_supabase_client() -> Client:
+_supabase_client: Optional['Client'] = None
+
+def get_supabase_client() -> 'Client':
+    """Supabase client, only needed for AUTH_MODE=remote; supabase is imported on first use"""
     global _supabase_client
     if _supabase_client is None:
+        from supabase import create_client
         _supabase_client = create_client(
             settings.SUPABASE_URL,
             settings.SUPABASE_KEY
         )
-    return _supabase_client
\ No newline at end of file
+    return _supabase_client
@@ -1,10 +1,45 @@
-from fastapi import FastAPI, Depends
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.core.config import settings
-from app.api.routes import food_entries, summaries, tips
+from app.core.metrics import MetricsMiddleware, registry
+from app.api.routes import cohort, dashboard, events, export, food_entries, summaries, tips
 from app.api.deps import get_current_user
+from app.db.postgrest import close_postgrest_client
+from app.repositories.base import RepositoryTimeout
+from app.services.analysis_queue import analysis_queue
+from app.services.cohort_stats import cohort_stats
+from app.services.event_hub import event_hub
+from app.services.food_lexicon import get_food_lexicon
+from app.services.idempotency import idempotency_store
+from app.services.llm_services import analysis_cache, llm_gateway, tips_cache
+from app.services.readiness import check_readiness
+from app.services.summary_cache import summary_cache
+from app.services.summary_coordinator import summary_coordinator
 
-app = FastAPI(title="Gut Health Tracker API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await event_hub.start()
+    await cohort_stats.start()
+    if settings.ASYNC_ANALYSIS_ENABLED:
+        await analysis_queue.start()
+    yield
+    # Queued analyses get the grace period; any left over stay pending in
+    # the database and are picked up by the next start
+    try:
+        await asyncio.wait_for(analysis_queue.stop(), settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS)
+    except asyncio.TimeoutError:
+        print(f"Analysis queue not drained in time, {analysis_queue.depth()} jobs left pending")
+        await analysis_queue.stop(drain=False)
+    await summary_coordinator.drain()
+    await cohort_stats.stop()
+    await event_hub.stop()
+    llm_gateway.shutdown(wait=False)
+    await close_postgrest_client()
+
+app = FastAPI(title="Gut Health Tracker API", version="1.0.0", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -15,15 +50,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and per-stage breakdown (outermost, so it times everything)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(food_entries.router, prefix="/food-entry", tags=["Food Entries"])
 app.include_router(summaries.router, prefix="", tags=["Summaries"])
 app.include_router(tips.router, prefix="", tags=["Tips"])
+app.include_router(dashboard.router, prefix="", tags=["Dashboard"])
+app.include_router(events.router, prefix="", tags=["Events"])
+app.include_router(export.router, prefix="", tags=["Export"])
+app.include_router(cohort.router, prefix="", tags=["Cohort"])
+
+@app.exception_handler(RepositoryTimeout)
+async def repository_timeout_handler(request: Request, exc: RepositoryTimeout):
+    return JSONResponse(status_code=504, content={"detail": "Database request timed out"})
+
+# Component stats, read at scrape time
+registry.register_stats(
+    'llm_gateway', llm_gateway.stats, counters=('calls', 'coalesced', 'rejected', 'failed', 'wait_seconds_total')
+)
+registry.register_stats(
+    'analysis_cache', analysis_cache.stats, counters=('hits', 'memory_hits', 'persistent_hits', 'misses')
+)
+registry.register_stats('tips_cache', tips_cache.stats, counters=('hits', 'misses'))
+registry.register_stats(
+    'summary_cache', summary_cache.stats, counters=('hits', 'misses', 'not_modified', 'invalidations')
+)
+registry.register_stats('event_hub', event_hub.stats, counters=('published', 'delivered', 'dropped', 'rejected'))
+registry.register_stats('analysis_queue', analysis_queue.stats, counters=('completed', 'retried', 'failed'))
+registry.register_stats('summary_coordinator', summary_coordinator.stats, counters=('submitted', 'updates'))
+registry.register_stats('cohort_stats', cohort_stats.stats, counters=('observed', 'lookups', 'loads', 'persisted'))
+registry.register_stats(
+    'idempotency', idempotency_store.stats, counters=('executed', 'replayed', 'waited', 'rejected')
+)
+if settings.LEXICON_ENABLED:
+    registry.register_stats('food_lexicon', lambda: get_food_lexicon().stats(), counters=('lookups', 'hits', 'fallbacks'))
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not settings.METRICS_ENABLED:
+        return PlainTextResponse("Metrics are disabled\n", status_code=404)
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Dependencies reachable and warmed; 503 until they are"""
+    ready, checks = await check_readiness()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not ready", "checks": checks},
+    )
+
 @app.get("/me")
 async def me(user_id: str = Depends(get_current_user)):
     return {"user_id": user_id}
\ No newline at end of file
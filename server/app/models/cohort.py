@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+class CohortMetric(BaseModel):
+    value: int
+    percentile: Optional[float]  # share of users scoring lower, ties counted half; null for small cohorts
+
+class CohortPercentilesResponse(BaseModel):
+    granularity: str  # day or week
+    period_start: str
+    population: int  # users with a score in the period
+    metrics: Dict[str, CohortMetric]  # gut_score and each sub-score
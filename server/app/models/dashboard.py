@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from app.models.food_entry import FoodEntryListItem
+from app.models.summary import DailySummaryResponse, WeeklySummaryResponse
+
+class DashboardResponse(BaseModel):
+    # Sections are null when they failed to load; see errors
+    date: str
+    entries: Optional[List[FoodEntryListItem]]
+    daily_summary: Optional[DailySummaryResponse]
+    weekly_summary: Optional[WeeklySummaryResponse]
+    tips: Optional[List[str]]
+    errors: Dict[str, str]
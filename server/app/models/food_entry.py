@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date, time
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from enum import Enum
 
 class MealType(str, Enum):
@@ -9,12 +9,27 @@ class MealType(str, Enum):
     dinner = "dinner"
     snack = "snack"
 
+class AnalysisStatus(str, Enum):
+    pending = "pending"
+    complete = "complete"
+    failed = "failed"
+
+def analysis_status(llm_analysis: Optional[Dict[str, Any]]) -> AnalysisStatus:
+    """Status recorded in an llm_analysis blob; plain analyses are complete"""
+    if not isinstance(llm_analysis, dict):
+        return AnalysisStatus.pending
+    return AnalysisStatus(llm_analysis.get('analysis_status', AnalysisStatus.complete.value))
+
 class FoodEntryCreate(BaseModel):
     date: date
     time: Optional[time] = None
     meal_type: MealType
     food_text: str
 
+class FoodEntryBulkCreate(BaseModel):
+    # Items are validated one by one so a bad row fails alone
+    entries: List[Dict[str, Any]]
+
 class FoodEntryUpdate(BaseModel):
     food_text: str
 
@@ -22,4 +37,20 @@ class FoodEntryResponse(BaseModel):
     id: str
     time: Optional[str]
     meal_type: str
-    food_text: str
\ No newline at end of file
+    food_text: str
+
+class FoodEntryListItem(BaseModel):
+    # Row as stored; the id stays numeric in listings
+    id: int
+    time: Optional[str] = None
+    meal_type: str
+    food_text: str
+
+class FoodEntryListResponse(BaseModel):
+    date: str
+    entries: List[FoodEntryListItem]
+
+class AnalysisStatusResponse(BaseModel):
+    entry_id: str
+    analysis_status: AnalysisStatus
+    llm_analysis: Optional[Dict[str, Any]] = None
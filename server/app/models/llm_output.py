@@ -0,0 +1,31 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List
+from enum import Enum
+
+# Response schemas for Gemini structured output. They are sent as the
+# response_schema, so the model can only produce these fields, and replies
+# are validated against them in one pass (unknown keys dropped, numeric
+# strings coerced). Every field costs output tokens on every call: add one
+# only when scoring reads it.
+
+class DigestiveComplexity(str, Enum):
+    easy = "easy"
+    moderate = "moderate"
+    heavy = "heavy"
+
+class FoodAnalysis(BaseModel):
+    food_count: int = Field(ge=1, description="Number of distinct foods in the text")
+    fiber_grams: float = Field(ge=0, description="Total dietary fiber for the stated amount")
+    food_categories: List[str] = Field(max_length=6, description="Lowercase food groups, e.g. legumes, fermented")
+    is_processed: bool
+    has_probiotics: bool
+    digestive_complexity: DigestiveComplexity
+
+    @field_validator('food_categories')
+    @classmethod
+    def _normalize_categories(cls, categories: List[str]) -> List[str]:
+        normalized = [c.strip().lower() for c in categories if c.strip()]
+        return normalized or ['unknown']
+
+class DailyTips(BaseModel):
+    tips: List[str] = Field(min_length=1, max_length=3, description="Short, actionable, one sentence each")
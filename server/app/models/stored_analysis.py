@@ -0,0 +1,99 @@
+"""
+Compact storage format for food_entries.llm_analysis
+
+Analyses are written as a small versioned object with fixed one-letter
+keys, 0/1 flags and integer codes instead of repeated strings:
+
+    {"v": 1, "n": 2, "f": 7.5, "c": [5, 7], "p": 0, "b": 1, "d": 1, "av": "gemini-2.5-flash/analysis-v2"}
+
+    v   format version          n   food_count          f   fiber_grams
+    c   food_categories (ids)   p   is_processed        b   has_probiotics
+    d   digestive_complexity    av  analysis version
+
+Categories and complexities outside the code tables are stored as plain
+strings. The `foods` list and `source` tag are not stored; nothing reads
+them. Status blobs (pending/failed) are stored unchanged.
+
+The repository decodes on read, so the rest of the app only sees the
+original shape. Rows written before the compact format (no "v") are
+returned as they are until `python -m app.cli.compact_analyses` rewrites them.
+"""
+
+from typing import Any, Dict, List, Optional, Union
+
+FORMAT_VERSION = 1
+
+# Codes are positions in these tuples: append only, never reorder or remove
+CATEGORIES = (
+    'unknown', 'grains', 'vegetables', 'fruits', 'meat', 'legumes', 'sweets', 'fermented',
+    'nuts', 'dairy', 'seeds', 'beverages', 'eggs', 'fish', 'soy', 'fats',
+)
+COMPLEXITY_LEVELS = ('easy', 'moderate', 'heavy')
+
+# JSON paths for PostgREST filters: format version, and analysis version in compact and legacy rows
+FORMAT_PATH = 'llm_analysis->>v'
+VERSION_PATH = 'llm_analysis->>av'
+LEGACY_VERSION_PATH = 'llm_analysis->>analysis_version'
+
+_CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+_COMPLEXITY_CODES = {name: code for code, name in enumerate(COMPLEXITY_LEVELS)}
+_CATEGORY_NAMES = dict(enumerate(CATEGORIES))
+_COMPLEXITY_NAMES = dict(enumerate(COMPLEXITY_LEVELS))
+
+
+def is_compact(stored: Any) -> bool:
+    return isinstance(stored, dict) and 'v' in stored
+
+
+def _code(codes: Dict[str, int], value: Any) -> Union[int, str]:
+    # Non-string junk is kept as its string form, which is how scoring keys it
+    value = value if type(value) is str else str(value)
+    return codes.get(value, value)
+
+
+def encode_analysis(analysis: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Compact form of an analysis; status blobs and already compact values pass through"""
+    if not isinstance(analysis, dict) or 'analysis_status' in analysis or is_compact(analysis):
+        return analysis
+    categories = analysis.get('food_categories') or []
+    stored: Dict[str, Any] = {
+        'v': FORMAT_VERSION,
+        'n': analysis.get('food_count', len(analysis.get('foods') or []) or 1),
+        'f': analysis.get('fiber_grams', 0),
+        'c': [_code(_CATEGORY_CODES, c) for c in categories] if isinstance(categories, list) else categories,
+        'p': 1 if analysis.get('is_processed') else 0,
+        'b': 1 if analysis.get('has_probiotics') else 0,
+        'd': _code(_COMPLEXITY_CODES, analysis.get('digestive_complexity', 'moderate')),
+    }
+    if 'analysis_version' in analysis:
+        stored['av'] = analysis['analysis_version']
+    return stored
+
+
+def decode_analysis(stored: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """The analysis shape the app reads; legacy rows and status blobs are returned as they are"""
+    if not is_compact(stored):
+        return stored
+    categories = stored.get('c') or []
+    if isinstance(categories, list):
+        categories = [_CATEGORY_NAMES.get(c, c) if type(c) is int else c for c in categories]
+    complexity = stored.get('d', 1)
+    analysis = {
+        'food_count': stored.get('n', 1),
+        'fiber_grams': stored.get('f', 0),
+        'food_categories': categories,
+        'is_processed': stored.get('p') == 1,
+        'has_probiotics': stored.get('b') == 1,
+        'digestive_complexity': _COMPLEXITY_NAMES.get(complexity, complexity) if type(complexity) is int else complexity,
+    }
+    if 'av' in stored:
+        analysis['analysis_version'] = stored['av']
+    return analysis
+
+
+def decode_rows(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Decode llm_analysis in place on rows that selected it"""
+    for row in rows:
+        if 'llm_analysis' in row:
+            row['llm_analysis'] = decode_analysis(row['llm_analysis'])
+    return rows
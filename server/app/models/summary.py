@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import List, Optional
 
 class DailySummaryStats(BaseModel):
     fiber_grams: float
@@ -12,4 +13,54 @@ class DailySummaryResponse(BaseModel):
     date: str
     gut_score: int
     stats: DailySummaryStats
-    status: str
\ No newline at end of file
+    status: str
+
+class DailyScore(BaseModel):
+    # A stored daily_gut_summary row, as listed in weekly summaries
+    id: Optional[int] = None
+    user_id: Optional[str] = None
+    date: str
+    gut_score: int
+    fiber_grams: Optional[float] = None
+    fiber_score: Optional[int] = None
+    diversity_score: Optional[int] = None
+    processed_score: Optional[int] = None
+    probiotic_score: Optional[int] = None
+    digestive_score: Optional[int] = None
+    updated_at: Optional[str] = None
+
+class WeeklySummaryResponse(BaseModel):
+    average_gut_score: int
+    start_date: str
+    end_date: str
+    trend: str
+    daily_scores: List[DailyScore]
+    best_day: Optional[str]
+    worst_day: Optional[str]
+    fiber_trend: str
+    processed_trend: str
+
+class RangePeriod(BaseModel):
+    period_start: str
+    period_end: str
+    days: int
+    average_gut_score: int
+    average_fiber_score: int
+    average_processed_score: int
+    fiber_grams: float
+    best_day: Optional[str]
+    worst_day: Optional[str]
+    moving_average: float
+
+class RangeSummaryResponse(BaseModel):
+    granularity: str
+    start_date: str
+    end_date: str
+    days: int
+    average_gut_score: int
+    trend: str
+    fiber_trend: str
+    processed_trend: str
+    best_day: Optional[str]
+    worst_day: Optional[str]
+    periods: List[RangePeriod]
@@ -7,4 +7,8 @@ class TipsLogCreate(BaseModel):
 
 class TipsLogResponse(BaseModel):
     date: str
-    tips: List[str]
\ No newline at end of file
+    tips: List[str]
+
+class GeneratedTipsResponse(BaseModel):
+    tips: List[str]
+    source: str  # stored, cache, generated or fallback
@@ -0,0 +1,53 @@
+"""
+Shared plumbing for the async repositories
+"""
+
+import asyncio
+import random
+from typing import Any, Optional
+
+from postgrest import AsyncPostgrestClient
+
+from app.core.config import settings
+from app.core.metrics import span
+from app.db.postgrest import get_postgrest_client
+
+
+class RepositoryTimeout(Exception):
+    """Raised when a database call exceeds its timeout"""
+
+
+class WriteConflict(Exception):
+    """Raised when a conditional write kept losing to concurrent writers"""
+
+
+async def write_backoff(attempt: int) -> None:
+    """Random wait before retry `attempt` of a conditional write, so racing writers spread out"""
+    if attempt:
+        await asyncio.sleep(random.uniform(0, attempt * settings.SUMMARY_WRITE_BACKOFF_SECONDS))
+
+
+class BaseRepository:
+    """Base class holding the PostgREST client and per-call timeout"""
+
+    table_name: str = ""
+
+    def __init__(self, client: Optional[AsyncPostgrestClient] = None, timeout: Optional[float] = None):
+        self._client = client
+        self.timeout = timeout if timeout is not None else settings.DB_QUERY_TIMEOUT_SECONDS
+
+    @property
+    def client(self) -> AsyncPostgrestClient:
+        # Resolved per call so a pool recreated after shutdown is picked up
+        return self._client or get_postgrest_client()
+
+    def table(self):
+        return self.client.table(self.table_name)
+
+    async def _execute(self, query: Any, timeout: Optional[float] = None) -> Any:
+        """Execute a query builder, bounded by the per-call timeout"""
+        try:
+            with span('db'):
+                return await asyncio.wait_for(query.execute(), timeout or self.timeout)
+        except asyncio.TimeoutError as e:
+            raise RepositoryTimeout(f"{self.table_name} query timed out") from e
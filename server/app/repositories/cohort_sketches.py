@@ -0,0 +1,108 @@
+"""
+Data access for the cohort_sketches table
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Union
+
+from postgrest.types import ReturnMethod
+
+from app.repositories.base import BaseRepository
+
+
+class CohortSketchRepository(BaseRepository):
+    table_name = 'cohort_sketches'
+
+    async def list_period(
+        self, granularity: str, period_start: Union[date, str], columns: str = 'shard, epoch, counts'
+    ) -> List[Dict[str, Any]]:
+        """Every shard stored for one period"""
+        result = await self._execute(
+            self.table()
+            .select(columns)
+            .eq('granularity', granularity)
+            .eq('period_start', str(period_start))
+        )
+        return result.data
+
+    async def list_shard(self, shard: str) -> List[Dict[str, Any]]:
+        """Every period one shard has a row for"""
+        result = await self._execute(
+            self.table().select('granularity, period_start, epoch, counts').eq('shard', shard)
+        )
+        return result.data
+
+    async def get(
+        self, granularity: str, period_start: Union[date, str], shard: str,
+        columns: str = 'epoch, counts, updated_at',
+    ) -> Optional[Dict[str, Any]]:
+        result = await self._execute(
+            self.table()
+            .select(columns)
+            .eq('granularity', granularity)
+            .eq('period_start', str(period_start))
+            .eq('shard', shard)
+            .limit(1)
+        )
+        return result.data[0] if result.data else None
+
+    async def write_if_unchanged(
+        self, row: Dict[str, Any], epoch: str, updated_at: Optional[str], exists: bool
+    ) -> bool:
+        """
+        Write a row only if the stored one still has the epoch and updated_at read before
+
+        Args:
+            row: Full row, with a new updated_at
+            epoch: epoch of the row as read
+            updated_at: updated_at of the row as read
+            exists: Whether a row was read at all; if not, only insert
+
+        Returns:
+            bool: False if another writer changed (or created) the row since
+        """
+        if not exists:
+            query = self.table().upsert(row, on_conflict='granularity,period_start,shard', ignore_duplicates=True)
+        else:
+            query = (
+                self.table()
+                .update(row)
+                .eq('granularity', row['granularity'])
+                .eq('period_start', row['period_start'])
+                .eq('shard', row['shard'])
+                .eq('epoch', epoch)
+            )
+            query = query.eq('updated_at', updated_at) if updated_at is not None else query.is_('updated_at', 'null')
+        result = await self._execute(query.select('shard'))
+        return bool(result.data)
+
+    async def delete(self, granularity: str, period_start: Union[date, str], shard: str) -> None:
+        await self._execute(
+            self.table()
+            .delete(returning=ReturnMethod.minimal)
+            .eq('granularity', granularity)
+            .eq('period_start', str(period_start))
+            .eq('shard', shard)
+        )
+
+    async def upsert_many(self, rows: List[Dict[str, Any]]) -> None:
+        if rows:
+            await self._execute(
+                self.table().upsert(
+                    rows, on_conflict='granularity,period_start,shard', returning=ReturnMethod.minimal
+                )
+            )
+
+    async def delete_other_epochs(self, epoch: str) -> None:
+        """Drop every shard not counted from `epoch` (after a rebuild wrote its base rows)"""
+        await self._execute(self.table().delete(returning=ReturnMethod.minimal).neq('epoch', epoch))
+
+
+_repository: Optional[CohortSketchRepository] = None
+
+
+def get_cohort_sketch_repository() -> CohortSketchRepository:
+    global _repository
+    if _repository is None:
+        _repository = CohortSketchRepository()
+    return _repository
@@ -0,0 +1,124 @@
+"""
+Data access for the daily_gut_summary table
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from postgrest.types import ReturnMethod
+
+from app.repositories.base import BaseRepository
+
+
+class DailySummaryRepository(BaseRepository):
+    table_name = 'daily_gut_summary'
+
+    async def get(
+        self, user_id: str, summary_date: Union[date, str], columns: str = '*'
+    ) -> Optional[Dict[str, Any]]:
+        result = await self._execute(
+            self.table().select(columns).eq('user_id', user_id).eq('date', str(summary_date))
+        )
+        return result.data[0] if result.data else None
+
+    async def list_range(
+        self,
+        user_id: str,
+        start: Union[date, str],
+        end: Union[date, str],
+        columns: str = '*',
+    ) -> List[Dict[str, Any]]:
+        """Summaries with start <= date < end, oldest first"""
+        result = await self._execute(
+            self.table()
+            .select(columns)
+            .eq('user_id', user_id)
+            .gte('date', str(start))
+            .lt('date', str(end))
+            .order('date')
+        )
+        return result.data
+
+    async def page_by_user_date(
+        self,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 5000,
+        columns: str = '*',
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyset page of summaries ordered by (user_id, date)
+
+        Args:
+            after: (user_id, date) of the last row of the previous page
+        """
+        query = self.table().select(columns)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if after is not None:
+            last_user, last_date = after
+            query = query.or_(f"user_id.gt.{last_user},and(user_id.eq.{last_user},date.gt.{last_date})")
+        result = await self._execute(query.order('user_id').order('date').limit(limit))
+        return result.data
+
+    async def page_range(
+        self,
+        user_id: str,
+        start: Union[date, str],
+        end: Union[date, str],
+        after: Optional[str] = None,
+        limit: int = 1000,
+        columns: str = '*',
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyset page of one user's summaries with start <= date < end, oldest first
+
+        Args:
+            after: Date of the last row of the previous page
+        """
+        query = self.table().select(columns).eq('user_id', user_id).lt('date', str(end))
+        query = query.gt('date', after) if after is not None else query.gte('date', str(start))
+        result = await self._execute(query.order('date').limit(limit))
+        return result.data
+
+    async def write_if_unchanged(self, summary_data: Dict[str, Any], updated_at: Optional[str], exists: bool) -> bool:
+        """
+        Write a summary only if the stored row is still the one read before
+
+        Args:
+            summary_data: Full row, with a new updated_at
+            updated_at: updated_at of the row as read
+            exists: Whether a row was read at all; if not, only insert
+
+        Returns:
+            bool: False if another writer changed (or created) the row since
+        """
+        if not exists:
+            query = self.table().upsert(summary_data, on_conflict='user_id,date', ignore_duplicates=True)
+        else:
+            query = (
+                self.table()
+                .update(summary_data)
+                .eq('user_id', summary_data['user_id'])
+                .eq('date', summary_data['date'])
+            )
+            query = query.eq('updated_at', updated_at) if updated_at is not None else query.is_('updated_at', 'null')
+        result = await self._execute(query.select('date'))
+        return bool(result.data)
+
+    async def upsert_many(self, rows: List[Dict[str, Any]]) -> None:
+        """Bulk upsert; only the columns present in rows are written"""
+        if rows:
+            await self._execute(
+                self.table().upsert(rows, on_conflict='user_id,date', returning=ReturnMethod.minimal)
+            )
+
+
+_repository: Optional[DailySummaryRepository] = None
+
+
+def get_daily_summary_repository() -> DailySummaryRepository:
+    global _repository
+    if _repository is None:
+        _repository = DailySummaryRepository()
+    return _repository
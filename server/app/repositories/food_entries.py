@@ -0,0 +1,296 @@
+"""
+Data access for the food_entries table
+"""
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from postgrest.types import ReturnMethod
+
+from app.core.config import settings
+from app.models.stored_analysis import FORMAT_PATH, LEGACY_VERSION_PATH, VERSION_PATH, decode_rows, encode_analysis
+from app.repositories.base import BaseRepository
+
+
+def _encoded(fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a row or update with llm_analysis in the storage format"""
+    if not settings.ANALYSIS_COMPACT_WRITES or 'llm_analysis' not in fields:
+        return fields
+    return {**fields, 'llm_analysis': encode_analysis(fields['llm_analysis'])}
+
+
+def _stale(query: Any, analysis_versions: Sequence[str]) -> Any:
+    """Rows analyzed with none of analysis_versions, in either storage format"""
+    for version in analysis_versions:
+        query = query.filter(VERSION_PATH, 'isdistinct', version).filter(LEGACY_VERSION_PATH, 'isdistinct', version)
+    return query
+
+
+def _legacy(query: Any) -> Any:
+    """Complete analyses still in the format from before the compact one (status blobs never change format)"""
+    return (
+        query.not_.is_('llm_analysis', 'null')
+        .is_(FORMAT_PATH, 'null')
+        .is_('llm_analysis->>analysis_status', 'null')
+    )
+
+
+class FoodEntryRepository(BaseRepository):
+    """
+    llm_analysis is written in the compact format once ANALYSIS_COMPACT_WRITES
+    is on, and decoded on every read (see app.models.stored_analysis), so
+    callers only see the full shape
+    """
+
+    table_name = 'food_entries'
+
+    async def insert(self, entry_data: Dict[str, Any], columns: str = 'id') -> Dict[str, Any]:
+        """Insert one entry; returns `columns` of the stored row"""
+        result = await self._execute(self.table().insert(_encoded(entry_data)).select(columns))
+        return decode_rows(result.data)[0]
+
+    async def insert_many(self, rows: List[Dict[str, Any]], columns: str = 'id') -> List[Dict[str, Any]]:
+        """Insert rows in one statement; returns `columns` of the stored rows in input order"""
+        if not rows:
+            return []
+        result = await self._execute(self.table().insert([_encoded(row) for row in rows]).select(columns))
+        return decode_rows(result.data)
+
+    async def list_for_day(
+        self,
+        user_id: str,
+        entry_date: Union[date, str],
+        columns: str = 'id, time, meal_type, food_text',
+    ) -> List[Dict[str, Any]]:
+        result = await self._execute(
+            self.table()
+            .select(columns)
+            .eq('user_id', user_id)
+            .eq('date', str(entry_date))
+            .order('time')
+        )
+        return decode_rows(result.data)
+
+    async def get_owned(
+        self, entry_id: int, user_id: str, columns: str = 'date'
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch an entry only if it belongs to user_id"""
+        result = await self._execute(
+            self.table().select(columns).eq('id', entry_id).eq('user_id', user_id)
+        )
+        return decode_rows(result.data)[0] if result.data else None
+
+    async def update(
+        self, entry_id: int, fields: Dict[str, Any], match: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Update an entry; `match` adds equality guards (compare-and-set)
+
+        A None in `match` requires the column to be NULL.
+
+        Returns:
+            bool: True if a row was updated
+        """
+        query = self.table().update(_encoded(fields)).select('id').eq('id', entry_id)
+        for column, value in (match or {}).items():
+            query = query.eq(column, value) if value is not None else query.is_(column, 'null')
+        result = await self._execute(query)
+        return bool(result.data)
+
+    async def delete(self, entry_id: int, columns: str = 'id') -> List[Dict[str, Any]]:
+        """
+        Delete an entry
+
+        Returns:
+            `columns` of the deleted row; empty if it was already gone
+        """
+        result = await self._execute(self.table().delete().select(columns).eq('id', entry_id))
+        return decode_rows(result.data)
+
+    async def list_by_analysis_status(
+        self, status: str, columns: str = 'id, user_id, date, food_text', limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        result = await self._execute(
+            self.table()
+            .select(columns)
+            .eq('llm_analysis->>analysis_status', status)
+            .order('id')
+            .limit(limit)
+        )
+        return decode_rows(result.data)
+
+    async def page_by_user_day(
+        self,
+        after: Optional[Tuple[str, str, int]] = None,
+        limit: int = 5000,
+        columns: str = 'id, user_id, date, llm_analysis',
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyset page of entries ordered by (user_id, date, id)
+
+        Args:
+            after: (user_id, date, id) of the last row of the previous page
+        """
+        query = self.table().select(columns)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if after is not None:
+            last_user, last_date, last_id = after
+            query = query.or_(
+                f"user_id.gt.{last_user},"
+                f"and(user_id.eq.{last_user},date.gt.{last_date}),"
+                f"and(user_id.eq.{last_user},date.eq.{last_date},id.gt.{last_id})"
+            )
+        result = await self._execute(
+            query.order('user_id').order('date').order('id').limit(limit)
+        )
+        return decode_rows(result.data)
+
+    async def page_stale_analyses(
+        self,
+        analysis_versions: Sequence[str],
+        after_id: Optional[int] = None,
+        limit: int = 1000,
+        columns: str = 'id, user_id, date, food_text, llm_analysis',
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyset page (by id) of entries analyzed with none of analysis_versions
+
+        Includes legacy entries without a version, fallbacks and pending
+        or failed analyses; the caller decides which to redo.
+        """
+        query = _stale(self.table().select(columns), analysis_versions)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        result = await self._execute(query.order('id').limit(limit))
+        return decode_rows(result.data)
+
+    async def count_stale_analyses(
+        self, analysis_versions: Sequence[str], after_id: Optional[int] = None, user_id: Optional[str] = None
+    ) -> int:
+        query = _stale(self.table().select('id', count='exact'), analysis_versions)
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        result = await self._execute(query.limit(1))
+        return result.count or 0
+
+    async def set_analysis(
+        self, entry_ids: List[int], food_text: str, llm_analysis: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Store one analysis on several entries in a single statement
+
+        Entries whose food_text changed since they were read are left alone
+        (their edit wrote a newer analysis).
+
+        Returns:
+            The ids of the updated rows, as {'id': ...}
+        """
+        result = await self._execute(
+            self.table()
+            .update(_encoded({'llm_analysis': llm_analysis, 'updated_at': datetime.utcnow().isoformat()}))
+            .select('id')
+            .in_('id', entry_ids)
+            .eq('food_text', food_text)
+        )
+        return result.data
+
+    async def page_legacy_analyses(
+        self,
+        after_id: Optional[int] = None,
+        limit: int = 1000,
+        columns: str = 'id, llm_analysis',
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Keyset page (by id) of entries whose analysis is not yet in the compact format; returned as stored"""
+        query = _legacy(self.table().select(columns))
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        if after_id is not None:
+            query = query.gt('id', after_id)
+        result = await self._execute(query.order('id').limit(limit))
+        return result.data
+
+    async def count_legacy_analyses(self, user_id: Optional[str] = None) -> int:
+        query = _legacy(self.table().select('id', count='exact'))
+        if user_id is not None:
+            query = query.eq('user_id', user_id)
+        result = await self._execute(query.limit(1))
+        return result.count or 0
+
+    async def compact_analysis(self, entry_ids: List[int], llm_analysis: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Rewrite one legacy analysis, shared by several entries, in the compact format
+
+        Entries written since they were read are already compact and are
+        left alone.
+
+        Returns:
+            The ids of the updated rows, as {'id': ...}
+        """
+        result = await self._execute(
+            _legacy(
+                self.table()
+                .update({'llm_analysis': encode_analysis(llm_analysis)})
+                .select('id')
+                .in_('id', entry_ids)
+            )
+        )
+        return result.data
+
+    async def page_range(
+        self,
+        user_id: str,
+        start: Union[date, str],
+        end: Union[date, str],
+        after: Optional[Tuple[str, int]] = None,
+        limit: int = 1000,
+        columns: str = 'id, date, time, meal_type, food_text, llm_analysis',
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyset page of one user's entries with start <= date < end, ordered by (date, id)
+
+        Args:
+            after: (date, id) of the last row of the previous page
+        """
+        query = (
+            self.table()
+            .select(columns)
+            .eq('user_id', user_id)
+            .gte('date', str(start))
+            .lt('date', str(end))
+        )
+        if after is not None:
+            last_date, last_id = after
+            query = query.or_(f"date.gt.{last_date},and(date.eq.{last_date},id.gt.{last_id})")
+        result = await self._execute(query.order('date').order('id').limit(limit))
+        return decode_rows(result.data)
+
+    async def count_for_day(self, user_id: str, entry_date: Union[date, str]) -> int:
+        result = await self._execute(
+            self.table()
+            .select('id', count='exact')
+            .eq('user_id', user_id)
+            .eq('date', str(entry_date))
+        )
+        return result.count or 0
+
+    async def ping(self, timeout: Optional[float] = None) -> None:
+        """Cheapest round trip through the pool (readiness checks)"""
+        await self._execute(self.table().select('id').limit(1), timeout)
+
+
+_repository: Optional[FoodEntryRepository] = None
+
+
+def get_food_entry_repository() -> FoodEntryRepository:
+    global _repository
+    if _repository is None:
+        _repository = FoodEntryRepository()
+    return _repository
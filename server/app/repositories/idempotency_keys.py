@@ -0,0 +1,83 @@
+"""
+Data access for the idempotency_keys table
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from postgrest.types import ReturnMethod
+
+from app.repositories.base import BaseRepository
+
+
+class IdempotencyKeyRepository(BaseRepository):
+    table_name = 'idempotency_keys'
+
+    async def claim(self, user_id: str, key: str, fingerprint: str, created_at: str) -> bool:
+        """
+        Insert the claim row for (user, key) unless one exists
+
+        Returns:
+            bool: True if this call inserted it
+        """
+        result = await self._execute(
+            self.table()
+            .upsert(
+                {'user_id': user_id, 'key': key, 'fingerprint': fingerprint, 'created_at': created_at},
+                on_conflict='user_id,key',
+                ignore_duplicates=True,
+            )
+            .select('key')
+        )
+        return bool(result.data)
+
+    async def get(self, user_id: str, key: str) -> Optional[Dict[str, Any]]:
+        result = await self._execute(
+            self.table()
+            .select('fingerprint, status_code, body, created_at')
+            .eq('user_id', user_id)
+            .eq('key', key)
+            .limit(1)
+        )
+        return result.data[0] if result.data else None
+
+    async def complete(self, user_id: str, key: str, created_at: str, status_code: int, body: Any) -> None:
+        """Store the response of a claim, if it is still the one made at `created_at`"""
+        await self._execute(
+            self.table()
+            .update({'status_code': status_code, 'body': body}, returning=ReturnMethod.minimal)
+            .eq('user_id', user_id)
+            .eq('key', key)
+            .eq('created_at', created_at)
+        )
+
+    async def release(self, user_id: str, key: str, created_at: str) -> None:
+        """
+        Delete a claim, if it is still the one made at `created_at`
+
+        Args:
+            created_at: created_at of the claim, as written or read back
+        """
+        await self._execute(
+            self.table()
+            .delete(returning=ReturnMethod.minimal)
+            .eq('user_id', user_id)
+            .eq('key', key)
+            .eq('created_at', created_at)
+        )
+
+    async def delete_expired(self, before: datetime) -> None:
+        """Delete every row created before `before`"""
+        await self._execute(
+            self.table().delete(returning=ReturnMethod.minimal).lt('created_at', before.isoformat())
+        )
+
+
+_repository: Optional[IdempotencyKeyRepository] = None
+
+
+def get_idempotency_key_repository() -> IdempotencyKeyRepository:
+    global _repository
+    if _repository is None:
+        _repository = IdempotencyKeyRepository()
+    return _repository
@@ -0,0 +1,105 @@
+"""
+Data access for the summary_rollups table
+"""
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from postgrest.types import ReturnMethod
+
+from app.repositories.base import BaseRepository
+
+
+class SummaryRollupRepository(BaseRepository):
+    table_name = 'summary_rollups'
+
+    async def get_periods(
+        self, user_id: str, periods: Dict[str, date], columns: str = '*'
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Fetch one rollup per granularity in a single query
+
+        Args:
+            periods: Period start per granularity, e.g. {'week': date(...)}
+            columns: Must include granularity and period_start
+
+        Returns:
+            Rollups keyed by (granularity, period_start)
+        """
+        result = await self._execute(
+            self.table()
+            .select(columns)
+            .eq('user_id', user_id)
+            .in_('granularity', list(periods))
+            .in_('period_start', sorted({str(start) for start in periods.values()}))
+        )
+        wanted = {(granularity, str(start)) for granularity, start in periods.items()}
+        return {
+            (row['granularity'], row['period_start']): row
+            for row in result.data if (row['granularity'], row['period_start']) in wanted
+        }
+
+    async def list_range(
+        self,
+        user_id: str,
+        granularity: str,
+        start: Union[date, str],
+        end: Union[date, str],
+        columns: str = '*',
+    ) -> List[Dict[str, Any]]:
+        """Rollups with start <= period_start < end, oldest first"""
+        result = await self._execute(
+            self.table()
+            .select(columns)
+            .eq('user_id', user_id)
+            .eq('granularity', granularity)
+            .gte('period_start', str(start))
+            .lt('period_start', str(end))
+            .order('period_start')
+        )
+        return result.data
+
+    async def write_if_unchanged(self, row: Dict[str, Any], updated_at: Optional[str]) -> bool:
+        """
+        Write one rollup only if it is still the version read before
+
+        Args:
+            row: Full rollup, with a new updated_at
+            updated_at: updated_at of the rollup as read, None if there was none (insert only)
+
+        Returns:
+            bool: False if another writer changed (or created) the rollup since
+        """
+        if updated_at is None:
+            query = self.table().upsert(
+                row, on_conflict='user_id,granularity,period_start', ignore_duplicates=True
+            )
+        else:
+            query = (
+                self.table()
+                .update(row)
+                .eq('user_id', row['user_id'])
+                .eq('granularity', row['granularity'])
+                .eq('period_start', row['period_start'])
+                .eq('updated_at', updated_at)
+            )
+        result = await self._execute(query.select('period_start'))
+        return bool(result.data)
+
+    async def upsert_many(self, rows: List[Dict[str, Any]]) -> None:
+        if rows:
+            await self._execute(
+                self.table().upsert(
+                    rows, on_conflict='user_id,granularity,period_start', returning=ReturnMethod.minimal
+                )
+            )
+
+
+_repository: Optional[SummaryRollupRepository] = None
+
+
+def get_summary_rollup_repository() -> SummaryRollupRepository:
+    global _repository
+    if _repository is None:
+        _repository = SummaryRollupRepository()
+    return _repository
@@ -0,0 +1,36 @@
+"""
+Data access for the tips_log table
+"""
+
+from typing import Any, Dict, Optional
+
+from postgrest.types import ReturnMethod
+
+from app.repositories.base import BaseRepository
+
+
+class TipsRepository(BaseRepository):
+    table_name = 'tips_log'
+
+    async def get(
+        self, user_id: str, tips_date: str, columns: str = 'date, tips'
+    ) -> Optional[Dict[str, Any]]:
+        result = await self._execute(
+            self.table().select(columns).eq('user_id', user_id).eq('date', tips_date)
+        )
+        return result.data[0] if result.data else None
+
+    async def upsert(self, tip_data: Dict[str, Any]) -> None:
+        await self._execute(
+            self.table().upsert(tip_data, on_conflict='user_id,date', returning=ReturnMethod.minimal)
+        )
+
+
+_repository: Optional[TipsRepository] = None
+
+
+def get_tips_repository() -> TipsRepository:
+    global _repository
+    if _repository is None:
+        _repository = TipsRepository()
+    return _repository
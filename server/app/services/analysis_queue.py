@@ -0,0 +1,202 @@
+"""
+In-process background pipeline for food-entry analysis
+
+When ASYNC_ANALYSIS_ENABLED is set, write endpoints store the entry with a
+pending analysis and enqueue it here. Workers call the LLM, write the
+result back and recompute the daily summary. Failed jobs are retried with
+exponential backoff; after ANALYSIS_MAX_ATTEMPTS the entry is marked
+failed (dead-lettered) and kept out of scoring until it is edited again.
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Deque, List, Optional
+
+from app.core.config import settings
+from app.models.food_entry import AnalysisStatus
+from app.repositories.food_entries import get_food_entry_repository
+from app.services.event_hub import event_hub
+from app.services.llm_services import analyze_food_text
+from app.services.summary_coordinator import summary_coordinator
+
+
+def pending_analysis() -> dict:
+    return {'analysis_status': AnalysisStatus.pending.value}
+
+
+@dataclass
+class AnalysisJob:
+    entry_id: int
+    user_id: str
+    entry_date: date
+    food_text: str
+    attempts: int = 0
+    last_error: Optional[str] = None
+    written: bool = False
+
+
+class AnalysisQueueFull(Exception):
+    """Raised when the queue cannot accept more jobs"""
+
+
+class AnalysisQueue:
+    def __init__(self, workers: int, max_size: int, max_attempts: int, retry_backoff: float):
+        self.workers = workers
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.dead_letters: Deque[AnalysisJob] = deque(maxlen=1000)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._retries: set = set()
+
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self, recover: bool = True) -> None:
+        """Start workers; optionally requeue entries left pending by a previous process"""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if recover:
+            await self._recover_pending()
+
+    async def stop(self, drain: bool = True) -> None:
+        if self._queue is None:
+            return
+        if drain:
+            await self._queue.join()
+        for task in [*self._tasks, *self._retries]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retries, return_exceptions=True)
+        self._tasks = []
+        self._retries = set()
+        self._queue = None
+
+    def enqueue(self, job: AnalysisJob) -> None:
+        if self._queue is None:
+            raise AnalysisQueueFull("Analysis queue is not running")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise AnalysisQueueFull("Analysis queue is full")
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _recover_pending(self) -> None:
+        rows = await get_food_entry_repository().list_by_analysis_status(
+            AnalysisStatus.pending.value, limit=self.max_size
+        )
+        for row in rows:
+            job = AnalysisJob(row['id'], row['user_id'], date.fromisoformat(row['date']), row['food_text'])
+            try:
+                self.enqueue(job)
+            except AnalysisQueueFull:
+                break
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                await self._handle_failure(job, e)
+            finally:
+                self._queue.task_done()
+
+    def _pending_guard(self, job: AnalysisJob) -> dict:
+        # Only touch the row if it is still this job's pending entry; an
+        # edit or delete in the meantime enqueued (or needs) no work from us
+        return {
+            'food_text': job.food_text,
+            'llm_analysis->>analysis_status': AnalysisStatus.pending.value,
+        }
+
+    async def _process(self, job: AnalysisJob) -> None:
+        if job.written:
+            # Analysis landed but the summary update failed; a full
+            # recompute cannot double count the entry
+            await summary_coordinator.submit(job.user_id, job.entry_date, full=True)
+            self.completed += 1
+            return
+
+        llm_analysis = await analyze_food_text(job.food_text)
+
+        updated = await get_food_entry_repository().update(
+            job.entry_id,
+            {'llm_analysis': llm_analysis, 'updated_at': datetime.utcnow().isoformat()},
+            match=self._pending_guard(job),
+        )
+        if not updated:
+            return
+        job.written = True
+        await event_hub.publish(job.user_id, 'entry_analyzed', {
+            'entry_id': str(job.entry_id), 'date': str(job.entry_date), 'status': AnalysisStatus.complete.value,
+        })
+
+        await summary_coordinator.submit(job.user_id, job.entry_date, added=[llm_analysis])
+        self.completed += 1
+
+    async def _handle_failure(self, job: AnalysisJob, error: Exception) -> None:
+        job.attempts += 1
+        job.last_error = str(error)
+
+        if job.attempts < self.max_attempts:
+            self.retried += 1
+            delay = self.retry_backoff * (2 ** (job.attempts - 1))
+            task = asyncio.create_task(self._retry_later(job, delay))
+            self._retries.add(task)
+            task.add_done_callback(self._retries.discard)
+            return
+
+        print(f"Analysis failed for entry {job.entry_id} after {job.attempts} attempts: {error}")
+        self.failed += 1
+        self.dead_letters.append(job)
+        try:
+            updated = await get_food_entry_repository().update(
+                job.entry_id,
+                {'llm_analysis': {
+                    'analysis_status': AnalysisStatus.failed.value,
+                    'attempts': job.attempts,
+                    'error': job.last_error,
+                }, 'updated_at': datetime.utcnow().isoformat()},
+                match=self._pending_guard(job),
+            )
+        except Exception as e:
+            print(f"Could not mark entry {job.entry_id} as failed: {e}")
+            return
+        if updated:
+            await event_hub.publish(job.user_id, 'entry_analyzed', {
+                'entry_id': str(job.entry_id), 'date': str(job.entry_date), 'status': AnalysisStatus.failed.value,
+            })
+
+    async def _retry_later(self, job: AnalysisJob, delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            self.enqueue(job)
+        except AnalysisQueueFull as e:
+            await self._handle_failure(job, e)
+
+    def stats(self) -> dict:
+        return {
+            'depth': self.depth(),
+            'completed': self.completed,
+            'retried': self.retried,
+            'failed': self.failed,
+            'dead_letters': len(self.dead_letters),
+        }
+
+
+analysis_queue = AnalysisQueue(
+    workers=settings.ANALYSIS_WORKERS,
+    max_size=settings.ANALYSIS_QUEUE_MAX_SIZE,
+    max_attempts=settings.ANALYSIS_MAX_ATTEMPTS,
+    retry_backoff=settings.ANALYSIS_RETRY_BACKOFF_SECONDS,
+)
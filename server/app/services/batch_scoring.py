@@ -0,0 +1,158 @@
+"""
+Vectorized gut health scoring for many (user, date) groups at once
+
+Entries are loaded into columnar NumPy arrays and every metric is computed
+with segment reductions over the group index. Each float operation is the
+same one scoring_services performs, in the same order, so the results are
+bit-for-bit identical to calculate_gut_health_scores.
+"""
+
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.scoring_services import COMPLEXITY_SCORES, DEFAULT_COMPLEXITY_SCORE, fiber_milligrams
+
+
+class ColumnarEntries:
+    """
+    Food entries flattened into arrays
+
+    Attributes:
+        keys: Group key per group index, in first-seen order
+        group: Group index per entry
+        fiber_mg, processed, probiotic, complexity: Per-entry columns
+        category_group, category_code: One row per distinct (entry, category)
+        unknown_code: Code of the 'unknown' category, or -1
+    """
+
+    def __init__(self, rows: Iterable[Tuple[Hashable, Dict[str, Any]]]):
+        key_index: Dict[Hashable, int] = {}
+        rows = list(rows)
+        analyses = [analysis for _, analysis in rows]
+
+        # Column-wise comprehensions keep the per-entry Python work minimal
+        group = [key_index.setdefault(key, len(key_index)) for key, _ in rows]
+        self.keys: List[Hashable] = list(key_index)
+        self.group = np.asarray(group, dtype=np.int64)
+        self.fiber_mg = _fiber_column(analyses)
+        self.processed = np.asarray(
+            [1 if a.get('is_processed', False) else 0 for a in analyses], dtype=np.int64
+        )
+        self.probiotic = np.asarray(
+            [1 if a.get('has_probiotics', False) else 0 for a in analyses], dtype=np.int64
+        )
+        self.complexity = np.asarray([
+            COMPLEXITY_SCORES.get(_as_key(a.get('digestive_complexity', 'moderate')), DEFAULT_COMPLEXITY_SCORE)
+            for a in analyses
+        ], dtype=np.int64)
+
+        # One row per (entry, category); duplicates are harmless because
+        # diversity counts distinct categories per group
+        category_lists = [a.get('food_categories', []) for a in analyses]
+        category_index: Dict[str, int] = {}
+        self.category_group = np.asarray(
+            [g for g, cs in zip(group, category_lists) if type(cs) is list for _ in cs], dtype=np.int64
+        )
+        self.category_code = np.asarray(
+            [category_index.setdefault(_as_key(c), len(category_index))
+             for cs in category_lists if type(cs) is list for c in cs],
+            dtype=np.int64,
+        )
+        self.category_count = len(category_index)
+        self.unknown_code = category_index.get('unknown', -1)
+
+    def __len__(self) -> int:
+        return len(self.group)
+
+
+def _as_key(value: Any) -> str:
+    return value if type(value) is str else str(value)
+
+
+def _fiber_column(analyses: List[Dict[str, Any]]) -> np.ndarray:
+    """Fiber in integer milligrams, rounded exactly like fiber_milligrams"""
+    try:
+        grams = np.asarray([a.get('fiber_grams', 0) or 0 for a in analyses], dtype=np.float64)
+    except (TypeError, ValueError):
+        # Strings or junk somewhere in the column: take the per-entry path
+        return np.asarray([fiber_milligrams(a) for a in analyses], dtype=np.int64)
+    # round() and np.rint both round half to even
+    return np.rint(grams * 1000).astype(np.int64)
+
+
+def _segment_sum(group: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    # Integer sums below 2**53 are exact in float64 bincount weights
+    return np.bincount(group, weights=values, minlength=size).astype(np.int64)
+
+
+def score_columns(columns: ColumnarEntries) -> Dict[str, np.ndarray]:
+    """
+    Compute all 6 gut health metrics for every group
+
+    Returns:
+        Dict of arrays indexed like columns.keys, with the same keys as
+        calculate_gut_health_scores plus entry_count
+    """
+    size = len(columns.keys)
+    entry_count = np.bincount(columns.group, minlength=size).astype(np.int64)
+
+    # 1. Fiber Score
+    total_fiber = _segment_sum(columns.group, columns.fiber_mg, size) / 1000
+    fiber_score = np.minimum(100, np.trunc((total_fiber / settings.TARGET_FIBER_GRAMS) * 100)).astype(np.int64)
+
+    # 2. Diversity Score: distinct non-'unknown' categories per group
+    known = columns.category_code != columns.unknown_code
+    pairs = np.unique(columns.category_group[known] * max(columns.category_count, 1) + columns.category_code[known])
+    distinct = np.bincount(pairs // max(columns.category_count, 1), minlength=size).astype(np.int64)
+    diversity_score = np.minimum(100, distinct * 15)
+
+    # 3. Processed Score
+    processed_ratio = _segment_sum(columns.group, columns.processed, size) / entry_count
+    processed_score = np.trunc((1 - processed_ratio) * 100).astype(np.int64)
+
+    # 4. Probiotic Score
+    probiotic_score = np.minimum(100, _segment_sum(columns.group, columns.probiotic, size) * 40)
+
+    # 5. Digestive Score
+    digestive_score = np.trunc(_segment_sum(columns.group, columns.complexity, size) / entry_count).astype(np.int64)
+
+    # 6. Overall Gut Score
+    gut_score = np.trunc(
+        fiber_score * settings.WEIGHT_FIBER +
+        diversity_score * settings.WEIGHT_DIVERSITY +
+        processed_score * settings.WEIGHT_PROCESSED +
+        probiotic_score * settings.WEIGHT_PROBIOTIC +
+        digestive_score * settings.WEIGHT_DIGESTIVE
+    ).astype(np.int64)
+    gut_score = np.clip(gut_score, 0, 100)
+
+    return {
+        'fiber_grams': total_fiber,
+        'fiber_score': fiber_score,
+        'diversity_score': diversity_score,
+        'processed_score': processed_score,
+        'probiotic_score': probiotic_score,
+        'digestive_score': digestive_score,
+        'gut_score': gut_score,
+        'entry_count': entry_count,
+    }
+
+
+def score_groups(rows: Iterable[Tuple[Hashable, Dict[str, Any]]]) -> Dict[Hashable, Dict[str, Any]]:
+    """
+    Score (group key, llm_analysis) rows, e.g. keyed by (user_id, date)
+
+    Returns:
+        Dict mapping each group key to plain-Python scores, matching
+        calculate_gut_health_scores for that group's entries
+    """
+    columns = ColumnarEntries(rows)
+    if not len(columns):
+        return {}
+    scores = score_columns(columns)
+    names = list(scores)
+    # tolist() converts to Python int/float in one C-level pass
+    lists = [scores[name].tolist() for name in names]
+    return {key: dict(zip(names, values)) for key, values in zip(columns.keys, zip(*lists))}
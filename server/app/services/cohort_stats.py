@@ -0,0 +1,372 @@
+"""
+Population percentiles of the gut score and its sub-scores
+
+Every score is an integer from 0 to 100, so the distribution of one metric
+over one day or ISO week is kept as a ScoreSketch: 101 counts. That is a
+mergeable quantile summary of fixed size whatever the population, exact for
+these metrics, and, unlike KLL or t-digest, it can take a value back out.
+Daily scores are rewritten on every entry write, so each write moves the
+user's old value to the new one instead of adding a sample. Percentile
+lookups are O(1) from cached prefix sums.
+
+Day sketches count each user's daily summary; week sketches each user's
+per-day averages over the week (as the rollups report them). Both are fed
+from the summary write path; a week whose rollup is first built after it
+already had days counts that user twice until the next rebuild (run
+`python -m app.cli.rollups` first).
+
+Each process keeps, per period, the counts loaded from the database and its
+own changes since (its shard). Every COHORT_PERSIST_SECONDS the changed
+periods are written to this process's shard row and the other shards are
+reloaded, so a process sees the others' writes within about one interval.
+A period evicted from memory (COHORT_MAX_PERIODS) is reloaded with this
+process's shard row as its own changes. On shutdown a process folds its
+shard rows into the base rows and deletes them, so shards do not pile up
+with every restart and CLI run; the base rows are written conditionally
+on their epoch and updated_at. Shards of processes that died are left
+until the next rebuild.
+`python -m app.cli.cohort_stats` rebuilds every period in one pass over
+daily_gut_summary and starts a new epoch. On its next reload of a period a
+process keeps only the changes made since its previous reload; the older
+ones are counted in the rebuild. Changes a process made while the rebuild
+was reading can be counted twice, so run it when writes are quiet.
+"""
+
+import asyncio
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.repositories.base import write_backoff
+from app.repositories.cohort_sketches import CohortSketchRepository, get_cohort_sketch_repository
+from app.services.rollup_services import SCORE_METRICS, period_start
+
+GRANULARITIES = ('day', 'week')
+
+# Shard written by the offline rebuild
+BASE_SHARD = 'base'
+
+MAX_SCORE = 100
+
+
+class ScoreSketch:
+    """Counts of each 0-100 integer score; merge by adding, remove by a negative weight"""
+
+    __slots__ = ('counts', 'total', '_below')
+
+    def __init__(self, counts: Optional[Iterable[int]] = None):
+        self.counts = list(counts) if counts is not None else [0] * (MAX_SCORE + 1)
+        self.total = sum(self.counts)
+        self._below: Optional[List[int]] = None
+
+    def add(self, value: Any, weight: int = 1) -> None:
+        score = min(MAX_SCORE, max(0, int(value or 0)))
+        self.counts[score] += weight
+        self.total += weight
+        self._below = None
+
+    def merge(self, other: 'ScoreSketch') -> 'ScoreSketch':
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self._below = None
+        return self
+
+    def percentile(self, value: Any) -> Optional[float]:
+        """Share of the population below `value`, ties counted half (0-100), None if empty"""
+        if self.total <= 0:
+            return None
+        if self._below is None:
+            below, running = [], 0
+            for count in self.counts:
+                below.append(running)
+                running += count
+            self._below = below
+        score = min(MAX_SCORE, max(0, int(value or 0)))
+        return round(100 * (self._below[score] + self.counts[score] / 2) / self.total, 1)
+
+    def quantile(self, q: float) -> Optional[int]:
+        """Smallest score with at least a q share of the population at or below it"""
+        if self.total <= 0:
+            return None
+        target, running = q * self.total, 0
+        for score, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return score
+        return MAX_SCORE
+
+
+def empty_sketches() -> Dict[str, ScoreSketch]:
+    return {metric: ScoreSketch() for metric in SCORE_METRICS}
+
+
+def stored_sketches(counts: Optional[Dict[str, List[int]]]) -> Dict[str, ScoreSketch]:
+    """Sketches of a stored counts column; metrics it lacks are empty"""
+    sketches = empty_sketches()
+    for metric in SCORE_METRICS:
+        if counts and counts.get(metric):
+            sketches[metric].merge(ScoreSketch(counts[metric]))
+    return sketches
+
+
+def add_scores(sketches: Dict[str, ScoreSketch], scores: Optional[Dict[str, Any]], weight: int = 1) -> None:
+    if scores:
+        for metric in SCORE_METRICS:
+            sketches[metric].add(scores.get(metric), weight)
+
+
+class _Period:
+    """One (granularity, period) in memory: the other shards as last loaded plus this process's changes"""
+
+    def __init__(self):
+        self.loaded: Optional[Dict[str, ScoreSketch]] = None
+        self.loaded_at = 0.0
+        self.local = empty_sketches()  # since the epoch began; this process's shard
+        self.recent = empty_sketches()  # since the last load
+        self.epoch: Optional[str] = None
+        self.dirty = False
+        self._combined: Optional[Dict[str, ScoreSketch]] = None
+
+    def combined(self) -> Dict[str, ScoreSketch]:
+        if self._combined is None:
+            self._combined = {
+                metric: ScoreSketch(self.loaded[metric].counts).merge(self.local[metric]) for metric in SCORE_METRICS
+            }
+        return self._combined
+
+    def changed(self) -> None:
+        self.dirty = True
+        self._combined = None
+
+
+class CohortStats:
+    def __init__(self, persist_interval: float, max_periods: int, min_population: int, enabled: bool = True):
+        self.persist_interval = persist_interval
+        self.max_periods = max_periods
+        self.min_population = min_population
+        self.enabled = enabled
+        self.shard = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._periods: "OrderedDict[Tuple[str, str], _Period]" = OrderedDict()
+        self._loading: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.observed = 0
+        self.lookups = 0
+        self.loads = 0
+        self.persisted = 0
+
+    def _period(self, key: Tuple[str, str]) -> _Period:
+        period = self._periods.get(key)
+        if period is None:
+            period = self._periods[key] = _Period()
+        self._periods.move_to_end(key)
+        return period
+
+    def observe(
+        self, granularity: str, start: date, previous: Optional[Dict[str, Any]], current: Optional[Dict[str, Any]]
+    ) -> None:
+        """
+        Move one user's scores for a period from `previous` to `current`
+
+        Args:
+            granularity: 'day' or 'week'
+            start: First day of the period
+            previous: Scores counted so far (None if the user was not counted)
+            current: Scores after the write (None to stop counting the user)
+        """
+        if not self.enabled:
+            return
+        if previous and current and all(previous[metric] == current[metric] for metric in SCORE_METRICS):
+            return
+        period = self._period((granularity, str(start)))
+        for sketches in (period.local, period.recent):
+            add_scores(sketches, previous, -1)
+            add_scores(sketches, current, 1)
+        period.changed()
+        self.observed += 1
+
+    async def _load(self, key: Tuple[str, str]) -> None:
+        """Sum the other shards of the current epoch; after a rebuild keep only own changes since the last load"""
+        rows = await get_cohort_sketch_repository().list_period(*key)
+        epoch = next((row['epoch'] for row in rows if row['shard'] == BASE_SHARD), '')
+        loaded = empty_sketches()
+        own = None
+        for row in rows:
+            if row['epoch'] != epoch:
+                continue
+            if row['shard'] == self.shard:
+                own = row
+                continue
+            for metric, sketch in stored_sketches(row['counts']).items():
+                loaded[metric].merge(sketch)
+        period = self._period(key)
+        if period.epoch is None:
+            # First load since the period was evicted (or this process
+            # started): what this process persisted before is in its shard row
+            if own is not None:
+                for metric, sketch in stored_sketches(own['counts']).items():
+                    period.local[metric].merge(sketch)
+        elif period.epoch != epoch:
+            # Rebuilt since: the base counts what this process wrote before
+            period.local = period.recent
+            period.dirty = True
+        period.recent = empty_sketches()
+        period.epoch = epoch
+        period.loaded = loaded
+        period.loaded_at = time.monotonic()
+        period._combined = None
+        self.loads += 1
+
+    async def _ensure_loaded(self, key: Tuple[str, str], max_age: Optional[float] = None) -> _Period:
+        period = self._period(key)
+        age = time.monotonic() - period.loaded_at
+        if period.loaded is None or (max_age is not None and age > max_age):
+            # Concurrent lookups of a cold period share one read
+            task = self._loading.get(key)
+            if task is None:
+                task = self._loading[key] = asyncio.ensure_future(self._load(key))
+                task.add_done_callback(lambda _: self._loading.pop(key, None))
+            await task
+        return self._period(key)
+
+    async def percentiles(
+        self, granularity: str, day: date, scores: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Optional[float]]]:
+        """
+        Where `scores` fall in the population of the period containing `day`
+
+        Returns:
+            Tuple[int, Dict]: (population, percentile per metric); percentiles
+            are None below COHORT_MIN_POPULATION
+        """
+        key = (granularity, str(period_start(day, granularity)))
+        period = await self._ensure_loaded(key, self.persist_interval)
+        sketches = period.combined()
+        population = sketches['gut_score'].total
+        self.lookups += 1
+        if population < self.min_population:
+            return population, {metric: None for metric in SCORE_METRICS}
+        return population, {metric: sketches[metric].percentile(scores.get(metric)) for metric in SCORE_METRICS}
+
+    async def persist(self) -> int:
+        """Write this process's changed periods to its shard and reload the other shards"""
+        dirty = [key for key, period in self._periods.items() if period.dirty]
+        for key in dirty:
+            await self._ensure_loaded(key, 0)
+        rows = []
+        for key in dirty:
+            period = self._periods[key]
+            period.dirty = False
+            rows.append({
+                'granularity': key[0],
+                'period_start': key[1],
+                'shard': self.shard,
+                'epoch': period.epoch,
+                'counts': {metric: period.local[metric].counts for metric in SCORE_METRICS},
+                'updated_at': datetime.utcnow().isoformat(),
+            })
+        try:
+            await get_cohort_sketch_repository().upsert_many(rows)
+        except Exception:
+            for key in dirty:
+                self._periods[key].dirty = True
+            raise
+        self.persisted += len(rows)
+        # Clean periods are on disk; forget the least recently used ones
+        for key in [key for key, period in self._periods.items() if not period.dirty]:
+            if len(self._periods) <= self.max_periods:
+                break
+            del self._periods[key]
+        return len(rows)
+
+    async def fold(self) -> int:
+        """
+        Add this process's shard rows into the base rows and delete them
+
+        Forgets every period in memory, since the base rows now count them.
+
+        Returns:
+            int: Shard rows folded (or dropped as counted by a rebuild)
+        """
+        repository = get_cohort_sketch_repository()
+        folded = 0
+        for row in await repository.list_shard(self.shard):
+            folded += await self._fold_row(repository, row)
+        self._periods.clear()
+        return folded
+
+    async def _fold_row(self, repository: CohortSketchRepository, row: Dict[str, Any]) -> bool:
+        key = (row['granularity'], row['period_start'])
+        for attempt in range(settings.SUMMARY_WRITE_MAX_ATTEMPTS):
+            await write_backoff(attempt)
+            base = await repository.get(*key, BASE_SHARD)
+            epoch = base['epoch'] if base else ''
+            if row['epoch'] != epoch:
+                break  # Rebuilt since: the base already counts this shard
+            sketches = stored_sketches(base['counts'] if base else None)
+            for metric, sketch in stored_sketches(row['counts']).items():
+                sketches[metric].merge(sketch)
+            written = await repository.write_if_unchanged(
+                {
+                    'granularity': key[0],
+                    'period_start': key[1],
+                    'shard': BASE_SHARD,
+                    'epoch': epoch,
+                    'counts': {metric: sketches[metric].counts for metric in SCORE_METRICS},
+                    'updated_at': datetime.utcnow().isoformat(),
+                },
+                epoch, base.get('updated_at') if base else None, exists=base is not None,
+            )
+            if written:
+                break
+        else:
+            print(f"Cohort shard {self.shard} of {key} kept losing to other writers; left unfolded")
+            return False
+        await repository.delete(*key, self.shard)
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.persist_interval)
+            try:
+                await self.persist()
+            except Exception as e:
+                print(f"Cohort sketch persist failed: {e!r}")
+
+    async def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.persist()
+            await self.fold()
+        except Exception as e:
+            print(f"Cohort sketch flush failed on shutdown: {e!r}")
+
+    def stats(self) -> dict:
+        return {
+            'periods': len(self._periods),
+            'dirty': sum(1 for period in self._periods.values() if period.dirty),
+            'observed': self.observed,
+            'lookups': self.lookups,
+            'loads': self.loads,
+            'persisted': self.persisted,
+        }
+
+
+cohort_stats = CohortStats(
+    persist_interval=settings.COHORT_PERSIST_SECONDS,
+    max_periods=settings.COHORT_MAX_PERIODS,
+    min_population=settings.COHORT_MIN_POPULATION,
+    enabled=settings.COHORT_STATS_ENABLED,
+)
@@ -0,0 +1,187 @@
+"""
+Per-user pub/sub hub behind the /events server-sent events stream
+
+Writers publish small notifications (summary_updated, entry_analyzed,
+tips_ready) after their database write commits; every open stream of that
+user receives them. Each stream owns a bounded queue: when a client reads
+too slowly the oldest undelivered events are dropped, so one stuck
+connection never holds memory or blocks a writer. Events only say what
+changed; clients that missed some can refetch.
+
+Fan-out goes through a pluggable backend. LocalBackend delivers within this
+process, so a stream held by one worker would never see events published
+by another; /events is therefore only served with a single worker or a
+shared bus (e.g. Redis pub/sub implementing EventBackend with
+`shared = True`).
+"""
+
+import asyncio
+import json
+from itertools import count
+from typing import Any, Callable, Dict, Optional, Protocol, Set
+
+from app.core.config import server_workers, settings
+
+# Queued in place of a message to end a stream (shutdown)
+CLOSE = None
+
+
+class TooManyStreams(Exception):
+    """Raised when a user already holds EVENTS_MAX_STREAMS_PER_USER streams"""
+
+
+class EventBackend(Protocol):
+    shared: bool  # events published on any worker reach streams on every worker
+
+    async def start(self, deliver: Callable[[str, Dict[str, Any]], None]) -> None: ...
+
+    async def publish(self, user_id: str, event: Dict[str, Any]) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class LocalBackend:
+    """Single-process fan-out: publishing delivers straight to local streams"""
+
+    shared = False
+
+    def __init__(self):
+        self._deliver: Optional[Callable[[str, Dict[str, Any]], None]] = None
+
+    async def start(self, deliver: Callable[[str, Dict[str, Any]], None]) -> None:
+        self._deliver = deliver
+
+    async def publish(self, user_id: str, event: Dict[str, Any]) -> None:
+        # Not started (CLI scripts, tests): there are no streams to reach
+        if self._deliver is not None:
+            self._deliver(user_id, event)
+
+    async def stop(self) -> None:
+        self._deliver = None
+
+
+class Subscription:
+    """One open stream: a bounded queue of pre-encoded SSE messages"""
+
+    def __init__(self, user_id: str, max_queue: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, message: Optional[str]) -> bool:
+        """Queue a message, dropping the oldest one if the client is behind"""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.queue.put_nowait(message)
+            self.dropped += 1
+            return False
+
+
+def encode_event(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    body = json.dumps(data, separators=(',', ':'), default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {body}\n\n"
+
+
+class EventHub:
+    def __init__(self, backend: EventBackend, queue_size: int, max_streams_per_user: int, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self.queue_size = queue_size
+        self.max_streams_per_user = max_streams_per_user
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._ids = count(1)
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    async def start(self) -> None:
+        await self.backend.start(self._deliver)
+
+    async def stop(self) -> None:
+        """Stop fan-out and end every open stream"""
+        await self.backend.stop()
+        for subscriptions in self._subscribers.values():
+            for subscription in subscriptions:
+                subscription.offer(CLOSE)
+
+    def check_capacity(self, user_id: str) -> None:
+        """Raise TooManyStreams if the user cannot open another stream"""
+        if len(self._subscribers.get(user_id, ())) >= self.max_streams_per_user:
+            self.rejected += 1
+            raise TooManyStreams(f"At most {self.max_streams_per_user} event streams per user")
+
+    def subscribe(self, user_id: str) -> Subscription:
+        self.check_capacity(user_id)
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscribers.get(subscription.user_id)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[subscription.user_id]
+        self.dropped += subscription.dropped
+
+    async def publish(self, user_id: str, event: str, data: Dict[str, Any]) -> None:
+        """
+        Notify the user's open streams; never raises
+
+        Args:
+            user_id: User ID
+            event: Event name (summary_updated, entry_analyzed, tips_ready)
+            data: JSON-serializable payload
+        """
+        self.published += 1
+        try:
+            await self.backend.publish(user_id, {'event': event, 'data': data})
+        except Exception as e:
+            # A lost notification only delays the client's refresh
+            print(f"Event publish failed for {user_id}: {e!r}")
+
+    def _deliver(self, user_id: str, event: Dict[str, Any]) -> None:
+        subscriptions = self._subscribers.get(user_id)
+        if not subscriptions:
+            return
+        # Encoded once, shared by every stream of the user
+        message = encode_event(next(self._ids), event['event'], event['data'])
+        for subscription in subscriptions:
+            subscription.offer(message)
+            self.delivered += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'streams': sum(len(subscriptions) for subscriptions in self._subscribers.values()),
+            'users': len(self._subscribers),
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped + sum(
+                subscription.dropped
+                for subscriptions in self._subscribers.values()
+                for subscription in subscriptions
+            ),
+            'rejected': self.rejected,
+        }
+
+
+def events_enabled(backend: EventBackend) -> bool:
+    """Whether /events can see every event: one worker, or a backend shared by all of them"""
+    if backend.shared or server_workers() == 1:
+        return True
+    print(f"Live events disabled: their backend is per process and {server_workers()} workers are configured")
+    return False
+
+
+_backend = LocalBackend()
+event_hub = EventHub(
+    _backend,
+    queue_size=settings.EVENTS_QUEUE_SIZE,
+    max_streams_per_user=settings.EVENTS_MAX_STREAMS_PER_USER,
+    enabled=events_enabled(_backend),
+)
@@ -0,0 +1,147 @@
+"""
+Streaming export of a user's food entries and daily summaries
+
+Rows are read one keyset page at a time and encoded as they arrive, so
+memory use is bounded by EXPORT_PAGE_SIZE no matter how long the range is.
+Each page becomes one output chunk, optionally gzip-compressed on the fly.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import date
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.repositories.daily_summaries import get_daily_summary_repository
+from app.repositories.food_entries import get_food_entry_repository
+
+DATASETS = ('entries', 'summaries')
+
+ENTRY_COLUMNS = 'id, date, time, meal_type, food_text, llm_analysis'
+SUMMARY_COLUMNS = (
+    'date, gut_score, fiber_grams, fiber_score, diversity_score, processed_score, '
+    'probiotic_score, digestive_score, entry_count'
+)
+
+# CSV flattens llm_analysis into these columns
+ENTRY_CSV_FIELDS = [
+    'id', 'date', 'time', 'meal_type', 'food_text', 'fiber_grams', 'food_categories',
+    'is_processed', 'has_probiotics', 'digestive_complexity', 'analysis_status',
+]
+SUMMARY_CSV_FIELDS = [column.strip() for column in SUMMARY_COLUMNS.split(',')]
+
+
+async def iter_entries(user_id: str, start: date, end: date, page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Pages of entries with start <= date < end, ordered by (date, id)"""
+    entries = get_food_entry_repository()
+    after = None
+    while True:
+        page = await entries.page_range(user_id, start, end, after=after, limit=page_size, columns=ENTRY_COLUMNS)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = (page[-1]['date'], page[-1]['id'])
+
+
+async def iter_summaries(user_id: str, start: date, end: date, page_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Pages of daily summaries with start <= date < end, oldest first"""
+    summaries = get_daily_summary_repository()
+    after = None
+    while True:
+        page = await summaries.page_range(user_id, start, end, after=after, limit=page_size, columns=SUMMARY_COLUMNS)
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        after = page[-1]['date']
+
+
+def entry_csv_row(entry: Dict[str, Any]) -> Dict[str, Any]:
+    analysis = entry.get('llm_analysis') or {}
+    return {
+        'id': entry['id'],
+        'date': entry['date'],
+        'time': entry.get('time'),
+        'meal_type': entry.get('meal_type'),
+        'food_text': entry.get('food_text'),
+        'fiber_grams': analysis.get('fiber_grams'),
+        'food_categories': '|'.join(analysis.get('food_categories') or []),
+        'is_processed': analysis.get('is_processed'),
+        'has_probiotics': analysis.get('has_probiotics'),
+        'digestive_complexity': analysis.get('digestive_complexity'),
+        'analysis_status': analysis.get('analysis_status', 'complete' if analysis else None),
+    }
+
+
+class CSVEncoder:
+    """Encodes batches of rows as CSV text, header first, reusing one buffer"""
+
+    def __init__(self, fields: List[str]):
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(self.buffer, fieldnames=fields, extrasaction='ignore', lineterminator='\n')
+        self.writer.writeheader()
+
+    def encode(self, rows: Iterable[Dict[str, Any]]) -> str:
+        self.writer.writerows(rows)
+        text = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return text
+
+
+def ndjson_lines(record_type: str, rows: Iterable[Dict[str, Any]]) -> str:
+    return ''.join(
+        json.dumps({'type': record_type, **row}, separators=(',', ':'), default=str) + '\n' for row in rows
+    )
+
+
+async def export_chunks(
+    user_id: str,
+    start: date,
+    end: date,
+    format: str,
+    datasets: Iterable[str] = DATASETS,
+    page_size: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Encoded export text, one chunk per database page
+
+    Args:
+        user_id: User ID
+        start: First date to export
+        end: Day after the last date to export
+        format: 'ndjson' (entries then summaries, each line tagged with
+            its "type") or 'csv' (exactly one dataset)
+        datasets: Any of 'entries', 'summaries'
+        page_size: Rows per database round trip, defaults to EXPORT_PAGE_SIZE
+    """
+    page_size = page_size or settings.EXPORT_PAGE_SIZE
+    datasets = list(datasets)
+    if format == 'csv' and len(datasets) != 1:
+        raise ValueError("CSV export covers exactly one dataset")
+
+    for dataset in datasets:
+        pages = (iter_entries if dataset == 'entries' else iter_summaries)(user_id, start, end, page_size)
+        if format == 'csv':
+            encoder = CSVEncoder(ENTRY_CSV_FIELDS if dataset == 'entries' else SUMMARY_CSV_FIELDS)
+            header = encoder.encode(())
+            yield header
+            async for page in pages:
+                yield encoder.encode(map(entry_csv_row, page) if dataset == 'entries' else page)
+        else:
+            record_type = 'entry' if dataset == 'entries' else 'summary'
+            async for page in pages:
+                yield ndjson_lines(record_type, page)
+
+
+async def gzip_chunks(chunks: AsyncIterator[str], level: int = 6) -> AsyncIterator[bytes]:
+    """Compress a text stream incrementally into one gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,244 @@
+"""
+Local food lexicon: answers common foods without calling the LLM
+
+The lexicon is loaded from a bundled CSV into parallel arrays (fiber,
+flag bits, complexity codes, and a flat category-id list with offsets),
+plus one dict from token phrases to row numbers. Food text is normalized
+like the analysis cache keys, tokenized, and matched greedily
+longest-phrase-first.
+
+Confidence is the share of content words covered by matches; callers fall
+back to Gemini below LEXICON_MIN_CONFIDENCE.
+
+Lexicon analyses are stamped with the lexicon's version (the matcher
+version plus a hash of the CSV) rather than ANALYSIS_VERSION, so editing
+the CSV makes them stale for `python -m app.cli.reanalyze`.
+"""
+
+import csv
+import hashlib
+import io
+import re
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.stored_analysis import COMPLEXITY_LEVELS
+from app.services.llm_cache import normalize_food_text
+
+DEFAULT_LEXICON_PATH = Path(__file__).resolve().parent.parent / 'data' / 'food_lexicon.csv'
+
+# Bump when tokenizing or matching changes what the lexicon answers
+LEXICON_MATCHER_VERSION = 'lexicon-v1'
+
+PROCESSED_FLAG = 1
+PROBIOTIC_FLAG = 2
+
+# Words that carry no food identity; they neither match nor lower confidence
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'the', 'with', 'of', 'on', 'in', 'plus', 'some', 'side', 'topped', 'w',
+    'for', 'my', 'few', 'bit', 'little', 'lot', 'bowl', 'cup', 'glass', 'plate', 'slice',
+    'piece', 'serving', 'handful', 'portion', 'large', 'small', 'medium', 'big', 'fresh', 'homemade',
+    'organic', 'plain', 'raw', 'whole', 'sliced', 'chopped', 'mixed', 'cooked', 'leftover',
+    'breakfast', 'lunch', 'dinner', 'snack', 'had', 'ate', 'eat',
+    # Cooking methods that rarely change the analysis ("fried" does, so it stays)
+    'steamed', 'grilled', 'roasted', 'baked', 'boiled', 'toasted', 'sauteed', 'poached',
+})
+
+_QUANTITY_RE = re.compile(r'(\d+(?:\.\d+)?)([a-z]*)')
+_WORD_RE = re.compile(r'[a-z]+')
+
+
+def stem(token: str) -> str:
+    """Crude singular form, applied identically to lexicon names and input"""
+    if len(token) <= 3 or token.endswith('ss'):
+        return token
+    if token.endswith('ies'):
+        return token[:-3] + 'y'
+    if token.endswith(('oes', 'ches', 'shes', 'xes')):
+        return token[:-2]
+    if token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+def lexicon_version(csv_data: bytes) -> str:
+    return f"{LEXICON_MATCHER_VERSION}/{hashlib.sha256(csv_data).hexdigest()[:12]}"
+
+
+def tokenize(food_text: str) -> List[Tuple[str, Optional[float]]]:
+    """
+    Split food text into (stemmed word, None) and ("", count) tokens
+
+    Bare numbers become count tokens; numbers with a unit ("100g", "2cup")
+    are dropped since they do not change which foods were eaten.
+    """
+    tokens: List[Tuple[str, Optional[float]]] = []
+    for raw in normalize_food_text(food_text).split():
+        quantity = _QUANTITY_RE.fullmatch(raw)
+        if quantity:
+            if not quantity.group(2):
+                tokens.append(('', float(quantity.group(1))))
+            continue
+        for word in _WORD_RE.findall(raw):
+            tokens.append((stem(word), None))
+    return tokens
+
+
+class FoodLexicon:
+    """Array-backed lexicon with a phrase index and coverage/latency counters"""
+
+    def __init__(self, rows: Iterable[Dict[str, str]], version: str = LEXICON_MATCHER_VERSION):
+        self.version = version
+        self.names: List[str] = []
+        self.fiber = array('f')
+        self.flags = array('B')
+        self.complexity = array('B')
+        self.category_names: List[str] = []
+        self.category_offsets = array('H', [0])
+        self.category_ids = array('B')
+        self.index: Dict[Tuple[str, ...], int] = {}
+        self.max_phrase = 1
+
+        category_index: Dict[str, int] = {}
+        for row in rows:
+            phrase = tuple(stem(word) for word in _WORD_RE.findall(row['name'].lower()))
+            if not phrase or phrase in self.index:
+                continue
+            self.index[phrase] = len(self.names)
+            self.max_phrase = max(self.max_phrase, len(phrase))
+            self.names.append(row['name'])
+            self.fiber.append(float(row['fiber_grams'] or 0))
+            self.flags.append(
+                (PROCESSED_FLAG if row['is_processed'] == '1' else 0) |
+                (PROBIOTIC_FLAG if row['has_probiotics'] == '1' else 0)
+            )
+            self.complexity.append(COMPLEXITY_LEVELS.index(row['digestive_complexity']))
+            for category in filter(None, row['categories'].split('|')):
+                if category not in category_index:
+                    category_index[category] = len(self.category_names)
+                    self.category_names.append(category)
+                self.category_ids.append(category_index[category])
+            self.category_offsets.append(len(self.category_ids))
+
+        self.lookups = 0
+        self.hits = 0
+        self.confidence_total = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def match(self, food_text: str) -> Tuple[List[Tuple[int, float]], float]:
+        """
+        Greedy longest-phrase match
+
+        Returns:
+            ([(row, count), ...], confidence) with confidence in [0, 1]
+        """
+        tokens = tokenize(food_text)
+        matches: List[Tuple[int, float]] = []
+        content = covered = 0
+        count: Optional[float] = None
+        i = 0
+        while i < len(tokens):
+            word, quantity = tokens[i]
+            if quantity is not None:
+                count = quantity
+                i += 1
+                continue
+            # Phrases run over consecutive words only; a stopword may start
+            # one ("whole wheat bread") and is skipped otherwise
+            end = i
+            while end < len(tokens) and end - i < self.max_phrase and tokens[end][1] is None:
+                end += 1
+            for length in range(end - i, 0, -1):
+                row = self.index.get(tuple(word for word, _ in tokens[i:i + length]))
+                if row is not None:
+                    # Clamp counts so "500 almonds"-style typos cannot explode fiber
+                    matches.append((row, min(max(count or 1, 0.25), 10)))
+                    content += length
+                    covered += length
+                    i += length
+                    break
+            else:
+                if word not in STOPWORDS:
+                    content += 1
+                i += 1
+                continue
+            count = None
+        return matches, (covered / content if content else 0.0)
+
+    def analysis(self, matches: List[Tuple[int, float]]) -> Dict[str, Any]:
+        """Combine matched rows into the llm_analysis shape the scorer reads"""
+        categories: Dict[str, None] = {}
+        flags = 0
+        complexity = 0
+        fiber = 0.0
+        for row, count in matches:
+            fiber += self.fiber[row] * count
+            flags |= self.flags[row]
+            complexity = max(complexity, self.complexity[row])
+            for category_id in self.category_ids[self.category_offsets[row]:self.category_offsets[row + 1]]:
+                categories[self.category_names[category_id]] = None
+        return {
+            "foods": [self.names[row] for row, _ in matches],
+            "fiber_grams": round(fiber, 1),
+            "food_categories": list(categories) or ["unknown"],
+            "is_processed": bool(flags & PROCESSED_FLAG),
+            "has_probiotics": bool(flags & PROBIOTIC_FLAG),
+            "digestive_complexity": COMPLEXITY_LEVELS[complexity],
+            "source": "lexicon",
+        }
+
+    def analyze(self, food_text: str, min_confidence: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Analysis from the lexicon, or None when confidence is too low
+
+        Args:
+            food_text: Free-text food description
+            min_confidence: Defaults to settings.LEXICON_MIN_CONFIDENCE
+        """
+        started = time.perf_counter()
+        matches, confidence = self.match(food_text)
+        threshold = settings.LEXICON_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        result = self.analysis(matches) if matches and confidence >= threshold else None
+
+        elapsed = time.perf_counter() - started
+        self.lookups += 1
+        self.hits += result is not None
+        self.confidence_total += confidence
+        self.latency_total += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'size': len(self.names),
+            'lookups': self.lookups,
+            'hits': self.hits,
+            'fallbacks': self.lookups - self.hits,
+            'coverage': self.hits / self.lookups if self.lookups else 0.0,
+            'avg_confidence': self.confidence_total / self.lookups if self.lookups else 0.0,
+            'avg_latency_us': self.latency_total / self.lookups * 1e6 if self.lookups else 0.0,
+            'max_latency_us': self.latency_max * 1e6,
+        }
+
+
+def load_lexicon(path: Optional[str] = None) -> FoodLexicon:
+    data = Path(path or DEFAULT_LEXICON_PATH).read_bytes()
+    rows = csv.DictReader(io.StringIO(data.decode('utf-8'), newline=''))
+    return FoodLexicon(rows, version=lexicon_version(data))
+
+
+_lexicon: Optional[FoodLexicon] = None
+
+
+def get_food_lexicon() -> FoodLexicon:
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = load_lexicon(settings.LEXICON_PATH)
+    return _lexicon
@@ -0,0 +1,188 @@
+"""
+Idempotency-Key support for write endpoints
+
+Mobile clients retry writes on flaky networks. When a request carries an
+Idempotency-Key header, its response is stored per (user, key) together
+with a fingerprint of the request. A retry with the same key and request
+gets the stored response back without running the handler again, so no
+second Gemini call and no duplicate entry. A duplicate that arrives while
+the original is still running waits for it. Reusing a key for a
+different request is rejected.
+
+Keys live in the idempotency_keys table, so a retry that lands on another
+API process is deduplicated too: the first request claims the key by
+inserting its row (a unique (user_id, key) insert only one process can
+win) and stores its response there when done. Duplicates on the same
+process wait on the original directly; on other processes they poll the
+row. A claim left unfinished for IDEMPOTENCY_LEASE_SECONDS (its process
+died) can be taken over.
+
+Only successful responses are stored; a handler that raises (including
+HTTP errors) releases the key so the client can retry. Rows are kept for
+IDEMPOTENCY_TTL_SECONDS.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import settings
+from app.repositories.idempotency_keys import get_idempotency_key_repository
+
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+class IdempotencyKeyReused(Exception):
+    """Raised when a key is sent again with a different request"""
+
+
+def request_fingerprint(method: str, path: str, payload: Any) -> str:
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f"{method} {path}\n{body}".encode()).hexdigest()
+
+
+def _age_seconds(created_at: str) -> float:
+    """Age of a stored created_at (naive values are UTC)"""
+    stamp = datetime.fromisoformat(created_at)
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return (datetime.utcnow() - stamp).total_seconds()
+
+
+class IdempotencyStore:
+    def __init__(self, ttl: float, lease: float, poll_interval: float, enabled: bool = True):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._pruned_at = 0.0
+
+        self.executed = 0
+        self.replayed = 0
+        self.waited = 0
+        self.rejected = 0
+        self.taken_over = 0
+
+    async def run(
+        self,
+        user_id: str,
+        key: Optional[str],
+        fingerprint: str,
+        response: Response,
+        handler: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Run the handler once per (user, key) and replay its response after
+
+        Args:
+            user_id: User ID, keys are scoped per user
+            key: Idempotency-Key header value; None runs the handler as usual
+            fingerprint: request_fingerprint of the request
+            response: The endpoint's Response, for the status code and headers
+            handler: Produces the response body; may set response.status_code
+
+        Returns:
+            The response body, stored or fresh
+
+        Raises:
+            IdempotencyKeyReused: The key belongs to a different request
+        """
+        if not self.enabled or key is None:
+            return await handler()
+
+        repository = get_idempotency_key_repository()
+        scope = f"{user_id}|{key}"
+        waited = False
+        while True:
+            in_flight = self._in_flight.get(scope)
+            if in_flight is not None:
+                # The original runs on this process: wait for it directly
+                self._check(in_flight[0], fingerprint)
+                waited = self._count_wait(waited)
+                await asyncio.shield(in_flight[1])
+                continue
+
+            created_at = datetime.utcnow().isoformat()
+            if await repository.claim(user_id, key, fingerprint, created_at):
+                break
+
+            stored = await repository.get(user_id, key)
+            if stored is None:
+                continue  # released since; claim again
+            age = _age_seconds(stored['created_at'])
+            if age > self.ttl:
+                await repository.release(user_id, key, stored['created_at'])
+                continue
+            self._check(stored['fingerprint'], fingerprint)
+            if stored['status_code'] is not None:
+                self.replayed += 1
+                response.status_code = stored['status_code']
+                response.headers[REPLAYED_HEADER] = 'true'
+                return stored['body']
+            if age > self.lease:
+                # Its process never finished it; take the key over
+                self.taken_over += 1
+                await repository.release(user_id, key, stored['created_at'])
+                continue
+            # The original runs on another process
+            waited = self._count_wait(waited)
+            await asyncio.sleep(self.poll_interval)
+
+        done = asyncio.get_running_loop().create_future()
+        self._in_flight[scope] = (fingerprint, done)
+        try:
+            try:
+                body = await handler()
+            except BaseException:
+                await asyncio.shield(repository.release(user_id, key, created_at))
+                raise
+            await repository.complete(user_id, key, created_at, response.status_code or 200, jsonable_encoder(body))
+            self.executed += 1
+            await self._prune(repository)
+            return body
+        finally:
+            del self._in_flight[scope]
+            done.set_result(None)
+
+    def _check(self, stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            self.rejected += 1
+            raise IdempotencyKeyReused("Idempotency-Key was already used for a different request")
+
+    def _count_wait(self, waited: bool) -> bool:
+        if not waited:
+            self.waited += 1
+        return True
+
+    async def _prune(self, repository) -> None:
+        """Delete expired keys, at most once per hour (or TTL) per process"""
+        now = time.monotonic()
+        if now - self._pruned_at < min(self.ttl, 3600):
+            return
+        self._pruned_at = now
+        await repository.delete_expired(datetime.utcnow() - timedelta(seconds=self.ttl))
+
+    def stats(self) -> dict:
+        return {
+            'executed': self.executed,
+            'replayed': self.replayed,
+            'waited': self.waited,
+            'rejected': self.rejected,
+            'taken_over': self.taken_over,
+            'in_flight': len(self._in_flight),
+        }
+
+
+idempotency_store = IdempotencyStore(
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    lease=settings.IDEMPOTENCY_LEASE_SECONDS,
+    poll_interval=settings.IDEMPOTENCY_POLL_SECONDS,
+    enabled=settings.IDEMPOTENCY_ENABLED,
+)
@@ -0,0 +1,284 @@
+"""
+Content-addressed cache for LLM food analyses
+
+Keys are derived from normalized food text plus the model and prompt
+version, so "Oatmeal with Banana!" and "oatmeal with banana" share an entry
+and bumping the prompt version invalidates everything written before it.
+
+Two tiers:
+- an in-process LRU with TTL (always on)
+- an optional SQLite file shared by workers on the same host
+"""
+
+import asyncio
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+NUMBER_WORDS = {
+    'half': '0.5', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
+    'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9',
+    'ten': '10', 'eleven': '11', 'twelve': '12', 'dozen': '12',
+}
+
+UNIT_ALIASES = {
+    'g': 'g', 'gr': 'g', 'gram': 'g', 'grams': 'g',
+    'kg': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'ml': 'ml', 'milliliter': 'ml', 'milliliters': 'ml', 'millilitre': 'ml', 'millilitres': 'ml',
+    'l': 'l', 'liter': 'l', 'liters': 'l', 'litre': 'l', 'litres': 'l',
+    'oz': 'oz', 'ounce': 'oz', 'ounces': 'oz',
+    'lb': 'lb', 'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    'cup': 'cup', 'cups': 'cup',
+    'tbsp': 'tbsp', 'tbs': 'tbsp', 'tablespoon': 'tbsp', 'tablespoons': 'tbsp',
+    'tsp': 'tsp', 'teaspoon': 'tsp', 'teaspoons': 'tsp',
+    'slice': 'slice', 'slices': 'slice',
+    'piece': 'piece', 'pieces': 'piece', 'pc': 'piece', 'pcs': 'piece',
+    'serving': 'serving', 'servings': 'serving',
+    'bowl': 'bowl', 'bowls': 'bowl',
+}
+
+UNICODE_FRACTIONS = {'½': ' 0.5', '¼': ' 0.25', '¾': ' 0.75', '⅓': ' 0.33', '⅔': ' 0.67'}
+
+_FRACTION_RE = re.compile(r'\b(\d+)\s*[/⁄]\s*(\d+)\b')
+_NUMBER_UNIT_RE = re.compile(r'(\d+(?:\.\d+)?)([a-z]+)')
+_PUNCT_RE = re.compile(r'[^\w\s.]|(?<!\d)\.|\.(?!\d)')
+
+
+def normalize_food_text(food_text: str) -> str:
+    """
+    Canonical form of a food description used for cache keys
+
+    Lowercases, folds unicode, drops punctuation, and rewrites quantity
+    tokens ("two", "1/2", "½", "grams") into one spelling so that
+    "2 Slices of toast." and "two slice of toast" normalize identically.
+    """
+    text = food_text
+    for char, replacement in UNICODE_FRACTIONS.items():
+        text = text.replace(char, replacement)
+    text = unicodedata.normalize('NFKC', text).lower()
+    text = _FRACTION_RE.sub(lambda m: _format_number(int(m.group(1)) / int(m.group(2)) if int(m.group(2)) else 0), text)
+    text = _PUNCT_RE.sub(' ', text)
+
+    tokens = []
+    for token in text.split():
+        # Split glued quantities such as "100g" into number and unit
+        match = _NUMBER_UNIT_RE.fullmatch(token)
+        if match and match.group(2) in UNIT_ALIASES:
+            tokens.extend([match.group(1), match.group(2)])
+        else:
+            tokens.append(token)
+
+    normalized = []
+    for token in tokens:
+        token = NUMBER_WORDS.get(token, token)
+        if normalized and _is_number(normalized[-1]) and token in UNIT_ALIASES:
+            normalized[-1] = f"{_format_number(float(normalized[-1]))}{UNIT_ALIASES[token]}"
+            continue
+        if _is_number(token):
+            token = _format_number(float(token))
+        normalized.append(token)
+    return ' '.join(normalized)
+
+
+def _is_number(token: str) -> bool:
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+def _format_number(value: float) -> str:
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+
+def cache_key(normalized_text: str, model: str, prompt_version: str) -> str:
+    return hashlib.sha256(f"{model}|{prompt_version}|{normalized_text}".encode()).hexdigest()
+
+
+class MemoryTier:
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        value, expires_at = cached
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Dict[str, Any], expires_at: Optional[float] = None) -> None:
+        self._entries[key] = (value, expires_at or time.time() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteTier:
+    """
+    Persistent tier in a local SQLite file
+
+    Rows written under an older prompt version are purged when the tier is
+    opened, and expired rows are dropped lazily on read.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int, prompt_version: str):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    normalized_text TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS llm_analysis_cache_expires_at ON llm_analysis_cache (expires_at)"
+            )
+            self._conn.execute(
+                "DELETE FROM llm_analysis_cache WHERE prompt_version != ?", (prompt_version,)
+            )
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                with self._conn:
+                    self._conn.execute("DELETE FROM llm_analysis_cache WHERE key = ?", (key,))
+                return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, model: str, prompt_version: str, normalized_text: str, value: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_analysis_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, normalized_text, json.dumps(value), time.time() + self.ttl),
+            )
+            # Evict expired rows, then the soonest-to-expire beyond the cap
+            self._conn.execute("DELETE FROM llm_analysis_cache WHERE expires_at <= ?", (time.time(),))
+            self._conn.execute(
+                """
+                DELETE FROM llm_analysis_cache WHERE key IN (
+                    SELECT key FROM llm_analysis_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_analysis_cache")
+
+
+class AnalysisCache:
+    """Two-tier cache for food analyses with hit/miss counters"""
+
+    def __init__(
+        self,
+        model: str,
+        prompt_version: str,
+        max_entries: int,
+        ttl: float,
+        sqlite_path: Optional[str] = None,
+        enabled: bool = True,
+    ):
+        self.model = model
+        self.prompt_version = prompt_version
+        self.enabled = enabled
+        self.memory = MemoryTier(max_entries, ttl)
+        self.persistent = (
+            SQLiteTier(sqlite_path, ttl, max_entries * 10, prompt_version) if sqlite_path else None
+        )
+        self.hits = 0
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def _key(self, food_text: str) -> tuple:
+        normalized = normalize_food_text(food_text)
+        return cache_key(normalized, self.model, self.prompt_version), normalized
+
+    async def get(self, food_text: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        key, _ = self._key(food_text)
+
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+            return copy.deepcopy(value)
+
+        if self.persistent is not None:
+            cached = await asyncio.to_thread(self.persistent.get, key)
+            if cached is not None:
+                value, expires_at = cached
+                self.memory.set(key, value, expires_at)
+                self.hits += 1
+                self.persistent_hits += 1
+                return copy.deepcopy(value)
+
+        self.misses += 1
+        return None
+
+    async def set(self, food_text: str, analysis: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        key, normalized = self._key(food_text)
+        self.memory.set(key, copy.deepcopy(analysis))
+        if self.persistent is not None:
+            await asyncio.to_thread(
+                self.persistent.set, key, self.model, self.prompt_version, normalized, analysis
+            )
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'memory_hits': self.memory_hits,
+            'persistent_hits': self.persistent_hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'size': len(self.memory),
+            'prompt_version': self.prompt_version,
+        }
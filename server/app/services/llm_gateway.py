@@ -0,0 +1,223 @@
+"""
+Gateway for outbound LLM calls
+
+Every blocking SDK call goes through one LLMGateway, which provides:
+- a dedicated thread pool with a hard concurrency cap
+- single-flight deduplication: identical in-flight requests share one call
+- a token-bucket rate limiter; callers queue up to a maximum wait
+- a circuit breaker that fails fast after repeated upstream errors
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional
+
+
+class LLMUnavailableError(Exception):
+    """Base class for calls rejected by the gateway without reaching the model"""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised while the circuit breaker is open"""
+
+
+class RateLimitTimeout(LLMUnavailableError):
+    """Raised when a call would wait longer than the queue allows"""
+
+
+class TokenBucket:
+    """
+    Async token bucket; waiting callers are served in FIFO order
+
+    Args:
+        rate: Tokens added per second
+        capacity: Maximum burst size
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self, timeout: float) -> None:
+        # A caller reserves its token before waiting (the balance may go
+        # negative), so its wait is known up front and checked against the
+        # timeout, later callers queue behind it, and nobody sleeps on a lock
+        self._refill()
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if wait > timeout:
+            raise RateLimitTimeout("LLM rate limit queue is full")
+        self._tokens -= 1
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Give the reservation back to the callers behind
+                self._refill()
+                self._tokens = min(self.capacity, self._tokens + 1)
+                raise
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures, then lets a single
+    trial call through once `reset_timeout` seconds have passed
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.state = 'closed'
+        self._opened_at = 0.0
+
+    def before_call(self) -> None:
+        if self.state == 'open':
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("LLM circuit breaker is open")
+            self.state = 'half_open'
+        elif self.state == 'half_open':
+            # Only one trial call at a time
+            raise CircuitOpenError("LLM circuit breaker is half-open")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.state = 'closed'
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == 'half_open' or self.failures >= self.failure_threshold:
+            self.state = 'open'
+            self._opened_at = time.monotonic()
+
+
+class LLMGateway:
+    def __init__(
+        self,
+        max_concurrency: int,
+        rate_per_second: float,
+        burst: int,
+        max_queue_wait: float,
+        failure_threshold: int,
+        reset_timeout: float,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue_wait = max_queue_wait
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.active = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.failed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def run(self, key: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a blocking call through the gateway
+
+        Args:
+            key: Identity of the request; concurrent calls with the same key
+                share one upstream call and its result (or exception)
+            fn: Blocking callable, executed on the gateway's thread pool
+
+        Raises:
+            LLMUnavailableError: If the call was rejected by the breaker or
+                rate limiter
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._execute(fn, *args, **kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shield so one cancelled caller does not cancel the shared call
+        return await asyncio.shield(task)
+
+    async def _execute(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self.rejected += 1
+            raise
+
+        queued_at = time.monotonic()
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            await self.bucket.acquire(self.max_queue_wait)
+            remaining = self.max_queue_wait - (time.monotonic() - queued_at)
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), max(remaining, 0))
+            except asyncio.TimeoutError:
+                raise RateLimitTimeout("LLM concurrency queue is full")
+        except RateLimitTimeout:
+            self.rejected += 1
+            if self.breaker.state == 'half_open':
+                self.breaker.state = 'open'
+            raise
+        finally:
+            self.queue_depth -= 1
+
+        waited = time.monotonic() - queued_at
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+        self.active += 1
+        self.calls += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self.executor, partial(fn, *args, **kwargs))
+        except Exception:
+            self.failed += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+        self.breaker.record_success()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'active': self.active,
+            'in_flight_keys': len(self._inflight),
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'failed': self.failed,
+            'wait_seconds_total': self.wait_seconds_total,
+            'wait_seconds_avg': self.wait_seconds_total / self.calls if self.calls else 0.0,
+            'wait_seconds_max': self.wait_seconds_max,
+            'circuit_state': self.breaker.state,
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
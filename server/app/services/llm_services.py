@@ -1,48 +1,277 @@
-from google import genai
-from google.genai import types
-import json
 import asyncio
-from typing import Dict, Any, List
+import hashlib
+from pydantic import TypeAdapter
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Tuple
 from app.core.config import settings
+from app.core.metrics import registry, span
+from app.models.llm_output import DailyTips, FoodAnalysis
+from app.services.food_lexicon import get_food_lexicon
+from app.services.llm_cache import AnalysisCache, normalize_food_text
+from app.services.llm_gateway import LLMGateway
+from app.services.tips_cache import TipsCache, bucket_scores
 
-# Initialize the new Client
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
+if TYPE_CHECKING:
+    from google import genai
+    from google.genai import types
 
-async def parse_food_text(food_text: str) -> Dict[str, Any]:
-    prompt = f"Analyze this food: '{food_text}'. Return JSON with: foods, fiber_grams, food_categories, is_processed, has_probiotics, digestive_complexity."
-    
-    try:
-        # Use asyncio.to_thread because the new SDK call is synchronous
-        response = await asyncio.to_thread(
-            client.models.generate_content,
-            model='gemini-2.5-flash',
+MODEL = 'gemini-2.5-flash'
+
+# Bump when the analysis prompt changes so cached analyses are invalidated
+ANALYSIS_PROMPT_VERSION = 'analysis-v2'
+
+# Stamped into every stored Gemini analysis (lexicon ones carry the
+# lexicon's version); `python -m app.cli.reanalyze` redoes entries with any
+# other (or no) version after a model, prompt or lexicon change
+ANALYSIS_VERSION = f"{MODEL}/{ANALYSIS_PROMPT_VERSION}"
+
+# Bump when the tips prompt changes so cached and stored tips are regenerated
+TIPS_PROMPT_VERSION = 'tips-v2'
+
+_client: Optional['genai.Client'] = None
+
+
+def get_gemini_client() -> 'genai.Client':
+    """
+    Shared Gemini client, created on first use
+
+    google.genai takes about half of the app's import time, so it is only
+    imported here (first LLM call, or /ready warming the worker).
+
+    Raises:
+        RuntimeError: GEMINI_API_KEY is not set
+    """
+    global _client
+    if _client is None:
+        if not settings.GEMINI_API_KEY:
+            raise RuntimeError("GEMINI_API_KEY is not set")
+        from google import genai
+        from google.genai import types
+        _client = genai.Client(
+            api_key=settings.GEMINI_API_KEY,
+            http_options=types.HttpOptions(base_url=settings.GEMINI_BASE_URL) if settings.GEMINI_BASE_URL else None,
+        )
+    return _client
+
+llm_gateway = LLMGateway(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    rate_per_second=settings.LLM_RATE_PER_SECOND,
+    burst=settings.LLM_BURST,
+    max_queue_wait=settings.LLM_MAX_QUEUE_WAIT_SECONDS,
+    failure_threshold=settings.LLM_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.LLM_BREAKER_RESET_SECONDS,
+)
+
+LLM_FALLBACKS = registry.counter(
+    'llm_fallbacks_total', 'Default analyses or tips served because Gemini failed', ('kind',)
+)
+
+analysis_cache = AnalysisCache(
+    model=MODEL,
+    prompt_version=ANALYSIS_PROMPT_VERSION,
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl=settings.LLM_CACHE_TTL_SECONDS,
+    sqlite_path=settings.LLM_CACHE_SQLITE_PATH,
+    enabled=settings.LLM_CACHE_ENABLED,
+)
+
+
+_ANALYSIS_BATCH = TypeAdapter(List[FoodAnalysis])
+
+
+def structured_config(schema: Any, max_output_tokens: int) -> 'types.GenerateContentConfig':
+    """JSON output constrained to `schema`, with a hard output-token cap"""
+    from google.genai import types
+
+    return types.GenerateContentConfig(
+        response_mime_type='application/json',
+        response_schema=schema,
+        max_output_tokens=max_output_tokens,
+        thinking_config=types.ThinkingConfig(thinking_budget=settings.LLM_THINKING_BUDGET),
+    )
+
+
+async def _generate_text(prompt: str, config: 'types.GenerateContentConfig') -> str:
+    """Run a generation through the gateway; raises when it produced no text"""
+    key = hashlib.sha256(f"{MODEL}|{prompt}".encode()).hexdigest()
+    with span('llm'):
+        response = await llm_gateway.run(
+            key,
+            get_gemini_client().models.generate_content,
+            model=MODEL,
             contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json'
-            )
+            config=config,
         )
-        return json.loads(response.text)
+    if not response.text:
+        reason = response.candidates[0].finish_reason if response.candidates else None
+        raise ValueError(f"Empty response (finish reason {reason})")
+    return response.text
+
+
+def fallback_analysis(food_text: str) -> Dict[str, Any]:
+    return {"food_count": 1, "fiber_grams": 0, "food_categories": ["unknown"], "is_processed": False, "has_probiotics": False, "digestive_complexity": "moderate"}
+
+def analysis_prompt(food_text: str) -> str:
+    return f"Analyze this food: '{food_text}'."
+
+def batch_prompt(food_texts: List[str]) -> str:
+    items = "\n".join(f"{i + 1}. '{text}'" for i, text in enumerate(food_texts))
+    return f"Analyze each of these foods:\n{items}\nReturn one object per food, in the same order."
+
+def tips_prompt(scores: Dict[str, int]) -> str:
+    return f"As a gut health coach, give 3 short, actionable tips for these scores (0-100): Fiber: {scores['fiber_score']}, Diversity: {scores['diversity_score']}, Processed: {scores['processed_score']}, Probiotics: {scores['probiotic_score']}, Digestion: {scores['digestive_score']}."
+
+async def _request_analysis(food_text: str) -> Dict[str, Any]:
+    """One Gemini call; raises if it fails or the reply does not match FoodAnalysis"""
+    text = await _generate_text(
+        analysis_prompt(food_text), structured_config(FoodAnalysis, settings.LLM_ANALYSIS_MAX_OUTPUT_TOKENS)
+    )
+    return FoodAnalysis.model_validate_json(text).model_dump(mode='json')
+
+def _stamped(analysis: Dict[str, Any], version: str = ANALYSIS_VERSION) -> Dict[str, Any]:
+    return {**analysis, 'analysis_version': version}
+
+def current_analysis_versions() -> Tuple[str, ...]:
+    """Versions a stored analysis can carry without being stale: Gemini's, and the lexicon's if enabled"""
+    if not settings.LEXICON_ENABLED:
+        return (ANALYSIS_VERSION,)
+    return (ANALYSIS_VERSION, get_food_lexicon().version)
+
+def lexicon_analysis(food_text: str) -> Optional[Dict[str, Any]]:
+    """Local analysis for recognizable foods (stamped with the lexicon's version), None when Gemini is needed"""
+    if not settings.LEXICON_ENABLED:
+        return None
+    lexicon = get_food_lexicon()
+    analysis = lexicon.analyze(food_text)
+    return _stamped(analysis, lexicon.version) if analysis is not None else None
+
+async def analyze_food_text(food_text: str) -> Dict[str, Any]:
+    """Lexicon or cached food analysis, stamped with its version; raises if Gemini fails"""
+    local = lexicon_analysis(food_text)
+    if local is not None:
+        return local
+
+    cached = await analysis_cache.get(food_text)
+    if cached is not None:
+        return _stamped(cached)
+
+    analysis = await _request_analysis(food_text)
+    await analysis_cache.set(food_text, analysis)
+    return _stamped(analysis)
+
+async def _request_batch_analysis(food_texts: List[str]) -> List[Dict[str, Any]]:
+    text = await _generate_text(
+        batch_prompt(food_texts),
+        structured_config(list[FoodAnalysis], settings.LLM_ANALYSIS_MAX_OUTPUT_TOKENS * len(food_texts)),
+    )
+    analyses = _ANALYSIS_BATCH.validate_json(text)
+    if len(analyses) != len(food_texts):
+        raise ValueError(f"Expected {len(food_texts)} analyses, got {len(analyses)}")
+    return [analysis.model_dump(mode='json') for analysis in analyses]
+
+async def analyze_food_texts(food_texts: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Analyze many food texts with as few Gemini calls as possible
+    
+    Texts are deduplicated by their normalized form and served from the
+    lexicon or the analysis cache where possible; the rest go out LLM_BATCH_SIZE at a time
+    in multi-item prompts. A batch whose response does not line up with its
+    items is retried item by item.
+    
+    Args:
+        food_texts: Food descriptions, duplicates allowed
+        
+    Returns:
+        Dict mapping each distinct input text to its analysis (stamped with
+        its version), or None if it could not be analyzed
+    """
+    results: Dict[str, Optional[Dict[str, Any]]] = {}
+    pending: Dict[str, List[str]] = {}  # normalized text -> original spellings
+    for text in dict.fromkeys(food_texts):
+        local = lexicon_analysis(text)
+        cached = await analysis_cache.get(text) if local is None else None
+        if local is not None:
+            results[text] = local
+        elif cached is not None:
+            results[text] = _stamped(cached)
+        else:
+            pending.setdefault(normalize_food_text(text), []).append(text)
+    
+    groups = list(pending.values())
+    size = max(1, settings.LLM_BATCH_SIZE)
+    
+    async def _analyze(batch: List[List[str]]) -> None:
+        texts = [group[0] for group in batch]
+        try:
+            analyses = await _request_batch_analysis(texts)
+        except Exception as e:
+            print(f"Gemini Batch Error: {e}; retrying {len(texts)} items individually")
+            analyses = await asyncio.gather(*(analyze_food_text(t) for t in texts), return_exceptions=True)
+        for group, analysis in zip(batch, analyses):
+            if isinstance(analysis, dict):
+                await analysis_cache.set(group[0], analysis)
+                analysis = _stamped(analysis)
+            else:
+                analysis = None
+                LLM_FALLBACKS.inc('analysis', amount=len(group))
+            for text in group:
+                results[text] = analysis
+    
+    await asyncio.gather(*(_analyze(groups[i:i + size]) for i in range(0, len(groups), size)))
+    return results
+
+async def parse_food_text(food_text: str) -> Dict[str, Any]:
+    try:
+        return await analyze_food_text(food_text)
     except Exception as e:
         print(f"Gemini Error: {e}")
-        return {"foods": [food_text], "fiber_grams": 0, "food_categories": ["unknown"], "is_processed": False, "has_probiotics": False, "digestive_complexity": "moderate"}
+        LLM_FALLBACKS.inc('analysis')
+        # Never cached, so the next request retries the model
+        return fallback_analysis(food_text)
+
+tips_cache = TipsCache(
+    prompt_version=TIPS_PROMPT_VERSION,
+    bucket_size=settings.TIPS_CACHE_BUCKET_SIZE,
+    variants=settings.TIPS_CACHE_VARIANTS,
+    max_entries=settings.TIPS_CACHE_MAX_ENTRIES,
+    ttl=settings.TIPS_CACHE_TTL_SECONDS,
+    sqlite_path=settings.TIPS_CACHE_SQLITE_PATH,
+    enabled=settings.TIPS_CACHE_ENABLED,
+)
+
+FALLBACK_TIPS = ["Focus on whole plants today.", "Stay hydrated."]
 
-async def generate_daily_tips(
-    fiber_score: int, diversity_score: int, processed_score: int, 
-    probiotic_score: int, digestive_score: int
-) -> List[str]:
-    prompt = f"As a gut health coach, give 3 short, actionable tips for these scores (0-100): Fiber: {fiber_score}, Diversity: {diversity_score}, Processed: {processed_score}, Probiotics: {probiotic_score}, Digestion: {digestive_score}. Return a JSON array of 3 strings."
+async def request_daily_tips(scores: Dict[str, int]) -> List[str]:
+    """One Gemini call for tips; raises if it fails or the reply does not match DailyTips"""
+    text = await _generate_text(tips_prompt(scores), structured_config(DailyTips, settings.LLM_TIPS_MAX_OUTPUT_TOKENS))
+    return DailyTips.model_validate_json(text).tips
+
+async def daily_tips(scores: Dict[str, int], seed: str) -> Tuple[List[str], str]:
+    """
+    Tips for a day's sub-scores, from the tips cache when its bucket is full
+    
+    New sets are generated for the bucket's midpoint scores so they suit
+    every day in the bucket, and added to it.
+    
+    Args:
+        scores: fiber, diversity, processed, probiotic and digestive scores
+        seed: Stable per user-day, picks which cached variant is served
+        
+    Returns:
+        Tuple[List[str], str]: (tips, source) with source 'cache',
+        'generated' or 'fallback'; fallback tips are never cached
+    """
+    cached = await tips_cache.get(scores, seed)
+    if cached is not None:
+        return cached, 'cache'
     
+    bucket = tips_cache.bucket(scores)
+    prompt_scores = bucket_scores(bucket, tips_cache.bucket_size) if tips_cache.enabled else scores
     try:
-        response = await asyncio.to_thread(
-            client.models.generate_content,
-            model='gemini-2.5-flash',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json'
-            )
-        )
-        tips = json.loads(response.text)
-        return tips[:3] if isinstance(tips, list) else ["Eat more plants.", "Stay hydrated."]
+        tips = await request_daily_tips(prompt_scores)
     except Exception as e:
         print(f"Gemini Tips Error: {e}")
-        return ["Focus on whole plants today.", "Stay hydrated."]
\ No newline at end of file
+        LLM_FALLBACKS.inc('tips')
+        return list(FALLBACK_TIPS), 'fallback'
+    
+    await tips_cache.add(bucket, tips)
+    return tips, 'generated'
@@ -0,0 +1,87 @@
+"""
+Readiness checks behind GET /ready
+
+/health only says the process is up. /ready also checks the dependencies
+a request needs and warms them on the way: it opens a pooled database
+connection, fetches JWKS signing keys (local auth without a JWT secret),
+loads the food lexicon and creates the Gemini client, which imports
+google.genai.
+Point the load balancer's readiness probe here so a fresh worker gets
+traffic only once the first request would not pay for any of that.
+
+The database and signing keys are required. Gemini is optional: without
+GEMINI_API_KEY analyses and tips use their fallbacks, so it is reported
+but does not fail the check.
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple
+
+from app.core.config import settings
+from app.core.security import jwks_cache
+from app.repositories.food_entries import get_food_entry_repository
+from app.services.food_lexicon import get_food_lexicon
+from app.services.llm_services import get_gemini_client
+
+
+async def _database() -> str:
+    await get_food_entry_repository().ping(settings.READY_CHECK_TIMEOUT_SECONDS)
+    return 'ok'
+
+
+async def _signing_keys() -> str:
+    if settings.AUTH_MODE != 'local' or settings.SUPABASE_JWT_SECRET:
+        return 'not used'
+    await jwks_cache.warm()
+    if not jwks_cache.has_keys():
+        # An HS256 project publishes no keys; every token would get 401
+        return 'error: no signing keys; set SUPABASE_JWT_SECRET or AUTH_MODE=remote'
+    return 'ok'
+
+
+async def _food_lexicon() -> str:
+    if not settings.LEXICON_ENABLED:
+        return 'disabled'
+    await asyncio.to_thread(get_food_lexicon)
+    return 'ok'
+
+
+async def _gemini() -> str:
+    if not settings.GEMINI_API_KEY:
+        return 'not configured'
+    # The import runs in a thread so probes do not stall requests on the loop
+    await asyncio.to_thread(get_gemini_client)
+    return 'ok'
+
+
+CHECKS: Dict[str, Tuple[Callable[[], Awaitable[str]], bool]] = {
+    'database': (_database, True),
+    'signing_keys': (_signing_keys, True),
+    'food_lexicon': (_food_lexicon, False),
+    'gemini': (_gemini, False),
+}
+
+
+async def check_readiness() -> Tuple[bool, Dict[str, str]]:
+    """
+    Run every check concurrently, each bounded by READY_CHECK_TIMEOUT_SECONDS
+
+    Returns:
+        Tuple[bool, Dict[str, str]]: (ready, status per check)
+    """
+    async def _run(check: Callable[[], Awaitable[str]]) -> str:
+        try:
+            return await asyncio.wait_for(check(), settings.READY_CHECK_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            return 'timed out'
+        except Exception as e:
+            return f"error: {e}"
+
+    results = await asyncio.gather(*(_run(check) for check, _ in CHECKS.values()))
+    statuses = dict(zip(CHECKS, results))
+    ready = all(
+        statuses[name] in ('ok', 'not used', 'disabled')
+        for name, (_, required) in CHECKS.items()
+        if required
+    )
+    return ready, statuses
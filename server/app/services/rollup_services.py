@@ -0,0 +1,237 @@
+"""
+Week, month and year rollups of the daily summaries
+
+Each rollup keeps per-metric sums, the day count and the best/worst day of
+its period. They are updated from the old and new score row of a day on
+every daily summary write, so range queries read one row per period
+instead of every day.
+
+Like the daily summaries, rollups are written conditionally on the
+updated_at they were read with, and re-derived from the fresh row when
+another process got there first.
+"""
+
+import asyncio
+import weakref
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.repositories.base import WriteConflict, write_backoff
+from app.repositories.daily_summaries import get_daily_summary_repository
+from app.repositories.summary_rollups import get_summary_rollup_repository
+from app.services.trend_services import is_better
+
+GRANULARITIES = ('week', 'month', 'year')
+
+SCORE_METRICS = (
+    'gut_score', 'fiber_score', 'diversity_score', 'processed_score', 'probiotic_score', 'digestive_score'
+)
+
+# Columns of a daily summary that feed the rollups
+DAY_SCORE_COLUMNS = 'date, fiber_grams, ' + ', '.join(SCORE_METRICS)
+
+# Columns of a stored rollup that are read back and rewritten (all but updated_at)
+ROLLUP_COLUMNS = (
+    'user_id, granularity, period_start, day_count, fiber_grams_sum, '
+    + ', '.join(f'{metric}_sum' for metric in SCORE_METRICS)
+    + ', best_date, best_score, worst_date, worst_score'
+)
+
+# Columns period_view and the best/worst day of a range read
+PERIOD_COLUMNS = (
+    'period_start, day_count, gut_score_sum, fiber_score_sum, processed_score_sum, fiber_grams_sum, '
+    'best_date, best_score, worst_date, worst_score'
+)
+
+# Serializes read-modify-write of one user's rollups within this process,
+# so only other processes can make a conditional write miss
+_user_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def period_start(day: date, granularity: str) -> date:
+    """First day of the period (day, ISO week, month or year) containing `day`"""
+    if granularity == 'day':
+        return day
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'year':
+        return day.replace(month=1, day=1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def period_end(start: date, granularity: str) -> date:
+    """First day after the period starting at `start`"""
+    if granularity == 'day':
+        return start + timedelta(days=1)
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if granularity == 'year':
+        return start.replace(year=start.year + 1)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def empty_rollup(user_id: str, granularity: str, start: date) -> Dict[str, Any]:
+    rollup = {
+        'user_id': user_id,
+        'granularity': granularity,
+        'period_start': str(start),
+        'day_count': 0,
+        'fiber_grams_sum': 0.0,
+        'best_date': None,
+        'best_score': None,
+        'worst_date': None,
+        'worst_score': None,
+    }
+    for metric in SCORE_METRICS:
+        rollup[f'{metric}_sum'] = 0
+    return rollup
+
+
+def _add_day(rollup: Dict[str, Any], day: Dict[str, Any], sign: int) -> None:
+    rollup['day_count'] += sign
+    # Rounded so repeated deltas do not accumulate float noise
+    rollup['fiber_grams_sum'] = round(rollup['fiber_grams_sum'] + sign * (day.get('fiber_grams') or 0), 3)
+    for metric in SCORE_METRICS:
+        rollup[f'{metric}_sum'] += sign * (day.get(metric) or 0)
+
+
+def _update_extreme(rollup: Dict[str, Any], prefix: str, sign: int, day: str, score: int) -> bool:
+    """
+    Fold a day's new score into best (sign=1) or worst (sign=-1)
+
+    Returns:
+        bool: False if the current extreme got worse and the period needs a rescan
+    """
+    date_key, score_key = f'{prefix}_date', f'{prefix}_score'
+    if rollup[date_key] == day:
+        if (score - rollup[score_key]) * sign < 0:
+            return False
+        rollup[score_key] = score
+    elif is_better(score, day, rollup[score_key], rollup[date_key], sign):
+        rollup[date_key], rollup[score_key] = day, score
+    return True
+
+
+def rollup_from_days(user_id: str, granularity: str, start: date, days: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Build a rollup from scratch from the daily summaries of its period"""
+    rollup = empty_rollup(user_id, granularity, start)
+    for day in days:
+        _add_day(rollup, day, 1)
+        _update_extreme(rollup, 'best', 1, day['date'], day['gut_score'])
+        _update_extreme(rollup, 'worst', -1, day['date'], day['gut_score'])
+    return rollup
+
+
+def build_rollups(user_id: str, days: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Every week, month and year rollup of one user's daily summaries"""
+    periods: Dict[tuple, List[Dict[str, Any]]] = {}
+    for day in days:
+        day_date = date.fromisoformat(day['date'])
+        for granularity in GRANULARITIES:
+            periods.setdefault((granularity, period_start(day_date, granularity)), []).append(day)
+    return [
+        rollup_from_days(user_id, granularity, start, period_days)
+        for (granularity, start), period_days in periods.items()
+    ]
+
+
+async def rebuild_rollup(user_id: str, granularity: str, start: date) -> Dict[str, Any]:
+    days = await get_daily_summary_repository().list_range(
+        user_id, start, period_end(start, granularity), columns=DAY_SCORE_COLUMNS
+    )
+    return rollup_from_days(user_id, granularity, start, days)
+
+
+def period_averages(rollup: Optional[Dict[str, Any]]) -> Optional[Dict[str, int]]:
+    """Per-day average of each score over a rollup's period (floored, as period_view), None if it has no days"""
+    days = rollup['day_count'] if rollup else 0
+    if not days:
+        return None
+    return {metric: rollup[f'{metric}_sum'] // days for metric in SCORE_METRICS}
+
+
+async def apply_rollup_delta(
+    user_id: str, day: date, previous: Optional[Dict[str, Any]], current: Dict[str, Any]
+) -> Dict[str, Tuple[Optional[Dict[str, int]], Optional[Dict[str, int]]]]:
+    """
+    Move one day's contribution in its week, month and year rollups
+
+    Must be called after the daily summary itself is written. Periods
+    without a stored rollup, and periods whose best or worst day got worse,
+    are rebuilt from their daily summaries instead.
+
+    Args:
+        user_id: User ID
+        day: Date of the daily summary
+        previous: Score row before the write (DAY_SCORE_COLUMNS), None if new
+        current: Score row after the write
+
+    Returns:
+        (before, after) period_averages per granularity, for the cohort sketches
+    """
+    starts = {granularity: period_start(day, granularity) for granularity in GRANULARITIES}
+    day_str = str(day)
+    repository = get_summary_rollup_repository()
+
+    lock = _user_locks.get(user_id)
+    if lock is None:
+        lock = _user_locks[user_id] = asyncio.Lock()
+
+    async with lock:
+        averages = {}
+        for attempt in range(settings.SUMMARY_WRITE_MAX_ATTEMPTS):
+            await write_backoff(attempt)
+            stored = await repository.get_periods(user_id, starts, columns=ROLLUP_COLUMNS + ', updated_at')
+            writes = []
+            for granularity, start in starts.items():
+                rollup = stored.get((granularity, str(start)))
+                before = period_averages(rollup)
+                if rollup is None:
+                    # New period, or data from before rollups existed
+                    writes.append((granularity, before, None, await rebuild_rollup(user_id, granularity, start)))
+                    continue
+                version = rollup.pop('updated_at')
+                if previous is not None:
+                    _add_day(rollup, previous, -1)
+                _add_day(rollup, current, 1)
+                score = current['gut_score']
+                if not (_update_extreme(rollup, 'best', 1, day_str, score) and
+                        _update_extreme(rollup, 'worst', -1, day_str, score)):
+                    rollup = await rebuild_rollup(user_id, granularity, start)
+                writes.append((granularity, before, version, rollup))
+
+            updated_at = datetime.utcnow().isoformat()
+            written = await asyncio.gather(*(
+                repository.write_if_unchanged({**rollup, 'updated_at': updated_at}, version)
+                for _, _, version, rollup in writes
+            ))
+            for (granularity, before, _, rollup), ok in zip(writes, written):
+                if ok:
+                    averages[granularity] = (before, period_averages(rollup))
+                    del starts[granularity]
+            if not starts:
+                return averages
+            # Another process moved these periods since they were read; redo them
+    raise WriteConflict(f"Rollups of {user_id} around {day} kept changing")
+
+
+def period_view(rollup: Dict[str, Any], granularity: str) -> Dict[str, Any]:
+    """API shape of one rollup: averages instead of sums"""
+    start = date.fromisoformat(rollup['period_start'])
+    days = rollup['day_count'] or 0
+    return {
+        'period_start': str(start),
+        'period_end': str(period_end(start, granularity)),
+        'days': days,
+        'average_gut_score': rollup['gut_score_sum'] // days if days else 0,
+        'average_fiber_score': rollup['fiber_score_sum'] // days if days else 0,
+        'average_processed_score': rollup['processed_score_sum'] // days if days else 0,
+        'fiber_grams': round(rollup['fiber_grams_sum'], 1),
+        'best_day': rollup['best_date'],
+        'worst_day': rollup['worst_date'],
+    }
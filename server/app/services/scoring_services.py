@@ -6,27 +6,98 @@ from typing import Dict, List, Any
 from app.core.config import settings
 
 
-def calculate_gut_health_scores(food_entries: List[Dict[str, Any]]) -> Dict[str, int]:
+COMPLEXITY_SCORES = {'easy': 100, 'moderate': 70, 'heavy': 40}
+DEFAULT_COMPLEXITY_SCORE = 70
+
+
+def empty_aggregates() -> Dict[str, Any]:
     """
-    Calculate all 6 gut health metrics from food entries
+    Running per-day aggregates that the scores are derived from
+
+    Fiber is kept in integer milligrams so that applying and reverting
+    deltas never accumulates floating point drift.
+    """
+    return {
+        'fiber_mg': 0,
+        'categories': {},
+        'processed_count': 0,
+        'probiotic_count': 0,
+        'entry_count': 0,
+        'complexity': {},
+    }
+
+
+def fiber_milligrams(analysis: Dict[str, Any]) -> int:
+    try:
+        return int(round(float(analysis.get('fiber_grams', 0) or 0) * 1000))
+    except (TypeError, ValueError):
+        return 0
+
+
+def apply_analysis(aggregates: Dict[str, Any], analysis: Dict[str, Any], sign: int = 1) -> Dict[str, Any]:
+    """
+    Add (sign=1) or remove (sign=-1) one entry's analysis from the aggregates in place
     
     Args:
-        food_entries: List of food entry records with llm_analysis
+        aggregates: Aggregates from empty_aggregates() or a stored summary
+        analysis: One entry's llm_analysis
+        sign: 1 to add the entry, -1 to remove it
         
     Returns:
-        Dict containing all scores:
-        {
-            "fiber_grams": int,
-            "fiber_score": int (0-100),
-            "diversity_score": int (0-100),
-            "processed_score": int (0-100),
-            "probiotic_score": int (0-100),
-            "digestive_score": int (0-100),
-            "gut_score": int (0-100)
-        }
+        The same aggregates dict
+    """
+    aggregates['fiber_mg'] += sign * fiber_milligrams(analysis)
+    aggregates['entry_count'] += sign
+    if analysis.get('is_processed', False):
+        aggregates['processed_count'] += sign
+    if analysis.get('has_probiotics', False):
+        aggregates['probiotic_count'] += sign
+    
+    categories = analysis.get('food_categories', [])
+    if isinstance(categories, list):
+        for category in set(str(c) for c in categories):
+            _bump(aggregates['categories'], category, sign)
+    
+    _bump(aggregates['complexity'], str(analysis.get('digestive_complexity', 'moderate')), sign)
+    return aggregates
+
+
+def _bump(counter: Dict[str, int], key: str, sign: int) -> None:
+    count = counter.get(key, 0) + sign
+    if count:
+        counter[key] = count
+    else:
+        counter.pop(key, None)
+
+
+def build_aggregates(food_entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregates for a full list of food entries (the from-scratch path)"""
+    aggregates = empty_aggregates()
+    for entry in food_entries:
+        apply_analysis(aggregates, entry.get('llm_analysis') or {})
+    return aggregates
+
+
+def aggregates_are_valid(aggregates: Dict[str, Any]) -> bool:
+    """False if deltas drove any counter negative, i.e. the aggregates drifted"""
+    counters = [aggregates.get(k, 0) for k in ('fiber_mg', 'processed_count', 'probiotic_count', 'entry_count')]
+    counters += list(aggregates.get('categories', {}).values())
+    counters += list(aggregates.get('complexity', {}).values())
+    return all(c >= 0 for c in counters) and sum(aggregates.get('complexity', {}).values()) == aggregates.get('entry_count', 0)
+
+
+def scores_from_aggregates(aggregates: Dict[str, Any]) -> Dict[str, Any]:
     """
+    Calculate all 6 gut health metrics from running aggregates in O(1)
     
-    if not food_entries:
+    Args:
+        aggregates: Aggregates built by build_aggregates/apply_analysis
+        
+    Returns:
+        Dict with the same keys as calculate_gut_health_scores
+    """
+    entry_count = aggregates['entry_count']
+    if entry_count <= 0:
         return {
             "fiber_grams": 0,
             "fiber_score": 0,
@@ -37,37 +108,28 @@ def calculate_gut_health_scores(food_entries: List[Dict[str, Any]]) -> Dict[str,
             "gut_score": 0
         }
     
-    # Extract all LLM analyses
-    analyses = [entry.get('llm_analysis', {}) for entry in food_entries]
-    
     # 1. Fiber Score (0-100)
-    total_fiber = sum(a.get('fiber_grams', 0) for a in analyses)
+    total_fiber = aggregates['fiber_mg'] / 1000
     fiber_score = min(100, int((total_fiber / settings.TARGET_FIBER_GRAMS) * 100))
     
     # 2. Diversity Score (0-100)
-    all_categories = set()
-    for a in analyses:
-        categories = a.get('food_categories', [])
-        if isinstance(categories, list):
-            all_categories.update(categories)
-    # Remove 'unknown' from count
-    all_categories.discard('unknown')
-    diversity_score = min(100, len(all_categories) * 15)  # ~7 categories = 100%
+    # 'unknown' does not count
+    category_count = sum(1 for c in aggregates['categories'] if c != 'unknown')
+    diversity_score = min(100, category_count * 15)  # ~7 categories = 100%
     
     # 3. Processed Score (0-100) - HIGHER is BETTER (less processed)
-    processed_count = sum(1 for a in analyses if a.get('is_processed', False))
-    total_count = len(analyses) or 1
-    processed_ratio = processed_count / total_count
+    processed_ratio = aggregates['processed_count'] / entry_count
     processed_score = int((1 - processed_ratio) * 100)
     
     # 4. Probiotic Score (0-100)
-    probiotic_count = sum(1 for a in analyses if a.get('has_probiotics', False))
-    probiotic_score = min(100, probiotic_count * 40)  # 2-3 probiotic foods = 100%
+    probiotic_score = min(100, aggregates['probiotic_count'] * 40)  # 2-3 probiotic foods = 100%
     
     # 5. Digestive Score (0-100)
-    complexity_map = {'easy': 100, 'moderate': 70, 'heavy': 40}
-    complexities = [a.get('digestive_complexity', 'moderate') for a in analyses]
-    digestive_score = int(sum(complexity_map.get(c, 70) for c in complexities) / len(complexities)) if complexities else 70
+    complexity_total = sum(
+        COMPLEXITY_SCORES.get(c, DEFAULT_COMPLEXITY_SCORE) * n
+        for c, n in aggregates['complexity'].items()
+    )
+    digestive_score = int(complexity_total / entry_count)
     
     # 6. Overall Gut Score (weighted average)
     gut_score = int(
@@ -92,6 +154,28 @@ def calculate_gut_health_scores(food_entries: List[Dict[str, Any]]) -> Dict[str,
     }
 
 
+def calculate_gut_health_scores(food_entries: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Calculate all 6 gut health metrics from food entries
+    
+    Args:
+        food_entries: List of food entry records with llm_analysis
+        
+    Returns:
+        Dict containing all scores:
+        {
+            "fiber_grams": float,
+            "fiber_score": int (0-100),
+            "diversity_score": int (0-100),
+            "processed_score": int (0-100),
+            "probiotic_score": int (0-100),
+            "digestive_score": int (0-100),
+            "gut_score": int (0-100)
+        }
+    """
+    return scores_from_aggregates(build_aggregates(food_entries))
+
+
 def determine_status(entry_count: int) -> str:
     """
     Determine if daily summary is partial or final
@@ -0,0 +1,210 @@
+"""
+Read-through cache for summary responses
+
+Entries are keyed by (user, endpoint, date range) and carry an ETag and
+Last-Modified stamp. Whenever a daily summary is written, every cached
+range of that user containing the date is dropped from the backend, and
+unrelated ranges stay warm.
+
+The backend is pluggable. InMemoryBackend is per-process, so a write only
+invalidates the copies of the worker that made it; with several workers
+(serve.py runs one per core) the others would keep serving the old
+payload and answering 304 for the old ETag. The cache therefore stays off
+unless the server runs a single worker or the backend is shared (e.g. a
+Redis store implementing SummaryCacheBackend with `shared = True`; its
+methods are async so a networked backend does not block the event loop).
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, Tuple, Union
+
+import orjson
+
+from app.core.config import server_workers, settings
+
+
+@dataclass
+class CachedSummary:
+    payload: Dict[str, Any]
+    body: bytes  # payload as JSON, serialized once and served as is
+    etag: str
+    last_modified: datetime
+    start: str
+    end: str  # exclusive
+
+
+class SummaryCacheBackend(Protocol):
+    shared: bool  # every worker sees the same entries, so invalidations reach them all
+
+    async def get(self, key: str) -> Optional[CachedSummary]: ...
+
+    async def set(self, user_id: str, key: str, value: CachedSummary, ttl: float) -> None: ...
+
+    async def user_entries(self, user_id: str) -> List[Tuple[str, CachedSummary]]: ...
+
+    async def delete(self, user_id: str, keys: List[str]) -> None: ...
+
+
+class InMemoryBackend:
+    """Per-process LRU with TTL and a per-user key index"""
+
+    shared = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, CachedSummary, float]]" = OrderedDict()
+        self._by_user: Dict[str, set] = {}
+
+    async def get(self, key: str) -> Optional[CachedSummary]:
+        cached = self._entries.get(key)
+        if cached is None:
+            return None
+        user_id, value, expires_at = cached
+        if expires_at <= time.time():
+            self._delete(user_id, [key])
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, user_id: str, key: str, value: CachedSummary, ttl: float) -> None:
+        self._entries[key] = (user_id, value, time.time() + ttl)
+        self._entries.move_to_end(key)
+        self._by_user.setdefault(user_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, (old_user, _, _) = self._entries.popitem(last=False)
+            self._discard_index(old_user, old_key)
+
+    async def user_entries(self, user_id: str) -> List[Tuple[str, CachedSummary]]:
+        return [(key, self._entries[key][1]) for key in self._by_user.get(user_id, ()) if key in self._entries]
+
+    async def delete(self, user_id: str, keys: List[str]) -> None:
+        self._delete(user_id, keys)
+
+    def _delete(self, user_id: str, keys: List[str]) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+            self._discard_index(user_id, key)
+
+    def _discard_index(self, user_id: str, key: str) -> None:
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+
+
+def encode_payload(payload: Dict[str, Any]) -> bytes:
+    return orjson.dumps(payload, default=str)
+
+
+def compute_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+class SummaryCache:
+    def __init__(self, backend: SummaryCacheBackend, ttl: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        # Bumped on every invalidation; a load that raced a write is not stored
+        self._write_seq = 0
+
+    @staticmethod
+    def key(user_id: str, endpoint: str, start: str, end: str) -> str:
+        return f"{user_id}|{endpoint}|{start}|{end}"
+
+    async def get(self, user_id: str, endpoint: str, start: str, end: str) -> Optional[CachedSummary]:
+        if not self.enabled:
+            return None
+        cached = await self.backend.get(self.key(user_id, endpoint, start, end))
+        if cached is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cached
+
+    async def read_through(
+        self,
+        user_id: str,
+        endpoint: str,
+        start: str,
+        end: str,
+        loader: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> CachedSummary:
+        """
+        Return the cached response, loading and storing it on a miss
+        
+        Args:
+            user_id: User ID
+            endpoint: Endpoint name, part of the key
+            start: First date covered by the response
+            end: Day after the last date covered
+            loader: Builds the response payload from the database
+            
+        Returns:
+            CachedSummary: Payload with its ETag and Last-Modified
+        """
+        cached = await self.get(user_id, endpoint, start, end)
+        if cached is not None:
+            return cached
+        write_seq = self._write_seq
+        payload = await loader()
+        return await self.put(user_id, endpoint, start, end, payload, store=write_seq == self._write_seq)
+
+    async def put(
+        self, user_id: str, endpoint: str, start: str, end: str, payload: Dict[str, Any], store: bool = True
+    ) -> CachedSummary:
+        body = encode_payload(payload)
+        value = CachedSummary(
+            payload=payload,
+            body=body,
+            etag=compute_etag(body),
+            last_modified=datetime.now(timezone.utc).replace(microsecond=0),
+            start=start,
+            end=end,
+        )
+        if self.enabled and store:
+            await self.backend.set(user_id, self.key(user_id, endpoint, start, end), value, self.ttl)
+        return value
+
+    async def invalidate(self, user_id: str, day: Union[date, str]) -> int:
+        """Drop every cached range of the user that contains `day`"""
+        day = str(day)
+        self._write_seq += 1
+        stale = [key for key, value in await self.backend.user_entries(user_id) if value.start <= day < value.end]
+        if stale:
+            await self.backend.delete(user_id, stale)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'invalidations': self.invalidations,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def cache_enabled(backend: SummaryCacheBackend) -> bool:
+    """SUMMARY_CACHE_ENABLED, unless other workers could keep copies this one cannot invalidate"""
+    if not settings.SUMMARY_CACHE_ENABLED:
+        return False
+    if backend.shared or server_workers() == 1:
+        return True
+    print(f"Summary cache disabled: its backend is per process and {server_workers()} workers are configured")
+    return False
+
+
+_backend = InMemoryBackend(settings.SUMMARY_CACHE_MAX_ENTRIES)
+summary_cache = SummaryCache(_backend, ttl=settings.SUMMARY_CACHE_TTL_SECONDS, enabled=cache_enabled(_backend))
@@ -0,0 +1,120 @@
+"""
+Per-(user, date) coordinator for daily summary updates
+
+Every write to a day's entries used to run its own read-modify-write of
+the summary. Concurrent writes to the same day then raced: both read the
+same stored aggregates and the later upsert dropped the earlier delta.
+
+Here each (user, date) has at most one updater task. Deltas submitted
+while it waits out SUMMARY_RECOMPUTE_WINDOW_SECONDS, or while it is busy
+with the previous batch, are applied together in one summary update. Each
+caller gets the scores of the batch that included its own delta.
+
+Coordination is per process. Across API workers the summary writes
+themselves are conditional (see summary_services), so a worker whose
+write lost the race re-applies its batch to the other worker's row; the
+coordinator only keeps those retries rare within one process.
+"""
+
+import asyncio
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.summary_services import apply_summary_delta, update_daily_summary
+
+
+@dataclass
+class _Batch:
+    added: List[Optional[Dict[str, Any]]] = field(default_factory=list)
+    removed: List[Optional[Dict[str, Any]]] = field(default_factory=list)
+    full: bool = False
+    waiters: List[asyncio.Future] = field(default_factory=list)
+
+
+class SummaryCoordinator:
+    def __init__(self, window: float):
+        self.window = window
+        self._pending: Dict[Tuple[str, date], _Batch] = {}
+        self._tasks: Dict[Tuple[str, date], asyncio.Task] = {}
+
+        self.submitted = 0
+        self.updates = 0
+
+    async def submit(
+        self,
+        user_id: str,
+        entry_date: date,
+        added: Iterable[Optional[Dict[str, Any]]] = (),
+        removed: Iterable[Optional[Dict[str, Any]]] = (),
+        full: bool = False,
+    ) -> Tuple[int, str]:
+        """
+        Queue a change to the day's summary and wait for it to be written
+
+        Takes the same deltas as apply_summary_delta and must likewise be
+        called after the entry write itself.
+
+        Args:
+            user_id: User ID
+            entry_date: Date of the changed entries
+            added: llm_analysis of inserted entries (and the new side of updates)
+            removed: llm_analysis of deleted entries (and the old side of updates)
+            full: Recompute the day from scratch instead of applying deltas
+
+        Returns:
+            Tuple[int, str]: (gut_score, status) after this change
+        """
+        key = (user_id, entry_date)
+        batch = self._pending.setdefault(key, _Batch())
+        batch.added.extend(added)
+        batch.removed.extend(removed)
+        batch.full = batch.full or full
+        waiter = asyncio.get_running_loop().create_future()
+        batch.waiters.append(waiter)
+        self.submitted += 1
+
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.create_task(self._run(key))
+        # A cancelled caller must not cancel the update other callers share
+        return await asyncio.shield(waiter)
+
+    async def _run(self, key: Tuple[str, date]) -> None:
+        user_id, entry_date = key
+        try:
+            while key in self._pending:
+                if self.window > 0:
+                    await asyncio.sleep(self.window)
+                batch = self._pending.pop(key)
+                try:
+                    if batch.full:
+                        result = await update_daily_summary(user_id, entry_date)
+                    else:
+                        result = await apply_summary_delta(user_id, entry_date, batch.added, batch.removed)
+                except Exception as e:
+                    for waiter in batch.waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                    continue
+                self.updates += 1
+                for waiter in batch.waiters:
+                    if not waiter.done():
+                        waiter.set_result(result)
+        finally:
+            del self._tasks[key]
+
+    async def drain(self) -> None:
+        """Wait for queued updates to be written (shutdown)"""
+        while self._tasks:
+            await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            'submitted': self.submitted,
+            'updates': self.updates,
+            'active_days': len(self._tasks),
+        }
+
+
+summary_coordinator = SummaryCoordinator(window=settings.SUMMARY_RECOMPUTE_WINDOW_SECONDS)
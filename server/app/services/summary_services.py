@@ -1,49 +1,61 @@
-from datetime import date
-from app.db.supabase import get_supabase_client
-from app.services.scoring_services import calculate_gut_health_scores, determine_status
 """
 Daily summary aggregation and update service
+
+Summary writes are conditional: a row is only replaced if its updated_at
+is still the one read before the scores were derived, and a day is only
+inserted if no other writer created it first. On a conflict the update is
+recomputed from the fresh row, so API workers in different processes
+never drop each other's deltas.
 """
 
+import asyncio
 from datetime import date, datetime
-from typing import Tuple
-from app.db.supabase import get_supabase_client
+from typing import Any, Dict, Iterable, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import span
+from app.models.food_entry import AnalysisStatus, analysis_status
+from app.repositories.base import WriteConflict, write_backoff
+from app.repositories.daily_summaries import get_daily_summary_repository
+from app.repositories.food_entries import get_food_entry_repository
+from app.services.cohort_stats import cohort_stats
+from app.services.event_hub import event_hub
+from app.services.rollup_services import DAY_SCORE_COLUMNS, apply_rollup_delta, period_start
+from app.services.scoring_services import (
+    aggregates_are_valid,
+    apply_analysis,
+    build_aggregates,
+    determine_status,
+    scores_from_aggregates,
+)
+from app.services.summary_cache import summary_cache
 
-async def update_daily_summary(user_id: str, entry_date: date) -> Tuple[int, str]:
+# Stored summary columns an update is derived from
+STORED_COLUMNS = 'aggregates, updated_at, ' + DAY_SCORE_COLUMNS
+
+
+def is_scorable(llm_analysis: Optional[Dict[str, Any]]) -> bool:
+    """Entries still waiting on (or failed) background analysis do not count yet"""
+    return analysis_status(llm_analysis) == AnalysisStatus.complete
+
+
+async def _write_summary(
+    user_id: str, entry_date: date, aggregates: Dict[str, Any], previous: Optional[Dict[str, Any]]
+) -> Optional[Tuple[int, str]]:
     """
-    Recalculate and update daily summary for a specific date
+    Derive scores from aggregates and write them with the summary
     
-    This function:
-    1. Fetches all food entries for the date
-    2. Calculates all gut health scores
-    3. Determines status (partial/final)
-    4. Upserts the summary to database
-    
-    Args:
-        user_id: User ID
-        entry_date: Date to update summary for
-        
-    Returns:
-        Tuple[int, str]: (gut_score, status)
+    `previous` is the stored row (updated_at and DAY_SCORE_COLUMNS) the
+    aggregates were derived from, or None for a new day; the rollups move
+    by the difference. Returns None, writing nothing, if the stored row is
+    no longer `previous`.
     """
-    supabase = get_supabase_client()
-    
-    # Get all food entries for this user and date
-    result = supabase.table('food_entries')\
-        .select('*')\
-        .eq('user_id', user_id)\
-        .eq('date', str(entry_date))\
-        .execute()
-    
-    entries = result.data
-    
     # Calculate all scores
-    scores = calculate_gut_health_scores(entries)
+    with span('scoring'):
+        scores = scores_from_aggregates(aggregates)
     
     # Determine status
-    status = determine_status(len(entries))
+    status = determine_status(aggregates['entry_count'])
     
-    # Prepare summary data in app/services/summary_services.py
     summary_data = {
         'user_id': user_id,
         'date': str(entry_date),
@@ -54,18 +66,151 @@ async def update_daily_summary(user_id: str, entry_date: date) -> Tuple[int, str
         'probiotic_score': int(round(scores['probiotic_score'])),
         'digestive_score': int(round(scores['digestive_score'])),
         'gut_score': int(round(scores['gut_score'])),
+        'entry_count': aggregates['entry_count'],
+        'aggregates': aggregates,
         'updated_at': datetime.utcnow().isoformat()
     }
     
-    # Upsert (insert or update) daily summary
-    supabase.table('daily_gut_summary').upsert(
-        summary_data,
-        on_conflict='user_id,date'
-        ).execute()
+    # Insert, or update the row only if nobody wrote it since it was read
+    written = await get_daily_summary_repository().write_if_unchanged(
+        summary_data, previous.get('updated_at') if previous else None, exists=previous is not None
+    )
+    if not written:
+        return None
+    averages = await apply_rollup_delta(user_id, entry_date, previous, summary_data)
+    cohort_stats.observe('day', entry_date, previous, summary_data)
+    cohort_stats.observe('week', period_start(entry_date, 'week'), *averages['week'])
+    
+    # Every summary write goes through here, so the summary cache drops the
+    # ranges it changed and open /events streams hear about every change
+    await summary_cache.invalidate(user_id, entry_date)
+    await event_hub.publish(user_id, 'summary_updated', {
+        'date': str(entry_date),
+        'gut_score': summary_data['gut_score'],
+        'status': status,
+        'entry_count': summary_data['entry_count'],
+    })
     
     return int(round(scores['gut_score'])), status
 
 
+async def rebuild_aggregates(user_id: str, entry_date: date) -> Dict[str, Any]:
+    """Aggregates computed from scratch from every food entry of the day"""
+    entries = await get_food_entry_repository().list_for_day(user_id, entry_date, columns='llm_analysis')
+    with span('scoring'):
+        return build_aggregates([e for e in entries if is_scorable(e.get('llm_analysis'))])
+
+
+async def update_daily_summary(user_id: str, entry_date: date) -> Tuple[int, str]:
+    """
+    Recalculate and update daily summary for a specific date from scratch
+    
+    This is the full path: it refetches every entry of the day. Write
+    endpoints apply deltas through the summary coordinator instead; this remains the repair tool
+    and the fallback when stored aggregates are missing or inconsistent.
+    
+    This function:
+    1. Fetches all food entries for the date
+    2. Rebuilds the running aggregates
+    3. Calculates all gut health scores and status (partial/final)
+    4. Upserts the summary to database
+    
+    Args:
+        user_id: User ID
+        entry_date: Date to update summary for
+        
+    Returns:
+        Tuple[int, str]: (gut_score, status)
+    """
+    for attempt in range(settings.SUMMARY_WRITE_MAX_ATTEMPTS):
+        await write_backoff(attempt)
+        aggregates, previous = await asyncio.gather(
+            rebuild_aggregates(user_id, entry_date),
+            get_daily_summary_repository().get(user_id, entry_date, columns='updated_at, ' + DAY_SCORE_COLUMNS),
+        )
+        result = await _write_summary(user_id, entry_date, aggregates, previous)
+        if result is not None:
+            return result
+    raise WriteConflict(f"Daily summary of {user_id} on {entry_date} kept changing")
+
+
+async def apply_summary_delta(
+    user_id: str,
+    entry_date: date,
+    added: Iterable[Optional[Dict[str, Any]]] = (),
+    removed: Iterable[Optional[Dict[str, Any]]] = (),
+) -> Tuple[int, str]:
+    """
+    Update the daily summary incrementally from the analyses that changed
+    
+    Reads only the stored aggregates, applies the deltas and derives the
+    scores in O(1). Must be called after the entry write itself. Falls back
+    to a full recompute when the day has no stored aggregates yet or the
+    deltas would leave them inconsistent.
+    
+    Args:
+        user_id: User ID
+        entry_date: Date of the changed entries
+        added: llm_analysis of inserted entries (and the new side of updates)
+        removed: llm_analysis of deleted entries (and the old side of updates)
+        
+    Returns:
+        Tuple[int, str]: (gut_score, status)
+    """
+    added = [analysis for analysis in added if is_scorable(analysis)]
+    removed = [analysis for analysis in removed if is_scorable(analysis)]
+    for attempt in range(settings.SUMMARY_WRITE_MAX_ATTEMPTS):
+        await write_backoff(attempt)
+        stored = await get_daily_summary_repository().get(user_id, entry_date, columns=STORED_COLUMNS)
+        aggregates = stored.get('aggregates') if stored else None
+        if not aggregates:
+            # First write of the day, or a row from before aggregates existed:
+            # seed the aggregates from scratch (the new entry is already stored)
+            return await update_daily_summary(user_id, entry_date)
+        
+        with span('scoring'):
+            for analysis in removed:
+                apply_analysis(aggregates, analysis, -1)
+            for analysis in added:
+                apply_analysis(aggregates, analysis, 1)
+            valid = aggregates_are_valid(aggregates)
+        
+        if not valid:
+            print(f"Summary aggregates drifted for {user_id} on {entry_date}, recomputing")
+            return await update_daily_summary(user_id, entry_date)
+        
+        result = await _write_summary(user_id, entry_date, aggregates, stored)
+        if result is not None:
+            return result
+        # Another process wrote the day since it was read; apply the deltas to its version
+    raise WriteConflict(f"Daily summary of {user_id} on {entry_date} kept changing")
+
+
+async def verify_daily_summary(user_id: str, entry_date: date, repair: bool = False) -> bool:
+    """
+    Consistency check: compare stored aggregates with a full rebuild
+    
+    Args:
+        user_id: User ID
+        entry_date: Date to check
+        repair: Rewrite the summary from scratch if it is inconsistent
+        
+    Returns:
+        bool: True if the stored summary matched
+    """
+    stored = await get_daily_summary_repository().get(user_id, entry_date, columns=STORED_COLUMNS)
+    expected = await rebuild_aggregates(user_id, entry_date)
+    
+    consistent = bool(stored) and stored.get('aggregates') == expected and \
+        stored.get('gut_score') == scores_from_aggregates(expected)['gut_score']
+    if not stored and expected['entry_count'] == 0:
+        consistent = True
+    
+    if not consistent and repair:
+        await update_daily_summary(user_id, entry_date)
+    return consistent
+
+
 async def get_daily_summary(user_id: str, entry_date: date) -> dict:
     """
     Get daily summary for a specific date
@@ -77,16 +222,10 @@ async def get_daily_summary(user_id: str, entry_date: date) -> dict:
     Returns:
         dict: Daily summary data or empty default
     """
-    supabase = get_supabase_client()
-    
     # Query summary
-    result = supabase.table('daily_gut_summary')\
-        .select('*')\
-        .eq('user_id', user_id)\
-        .eq('date', str(entry_date))\
-        .execute()
+    summary = await get_daily_summary_repository().get(user_id, entry_date, columns=DAY_SCORE_COLUMNS)
     
-    if not result.data:
+    if not summary:
         return {
             'date': str(entry_date),
             'gut_score': 0,
@@ -98,7 +237,7 @@ async def get_daily_summary(user_id: str, entry_date: date) -> dict:
             'digestive_score': 0
         }
     
-    return result.data[0]
+    return summary
 
 
 async def get_entry_count(user_id: str, entry_date: date) -> int:
@@ -112,12 +251,4 @@ async def get_entry_count(user_id: str, entry_date: date) -> int:
     Returns:
         int: Number of entries
     """
-    supabase = get_supabase_client()
-    
-    result = supabase.table('food_entries')\
-        .select('id', count='exact')\
-        .eq('user_id', user_id)\
-        .eq('date', str(entry_date))\
-        .execute()
-    
-    return result.count or 0
\ No newline at end of file
+    return await get_food_entry_repository().count_for_day(user_id, entry_date)
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+Cache of generated tips keyed by a quantized score vector
+
+The five sub-scores are bucketed (TIPS_CACHE_BUCKET_SIZE points per
+dimension) and tips are generated for the bucket's midpoint scores, so a
+cached set fits every user-day in the bucket. Each bucket keeps up to
+TIPS_CACHE_VARIANTS tip sets: requests generate new sets until the bucket
+is full, then get one picked stably per user and date, so users with
+similar days do not all read identical text.
+
+Tiers mirror the analysis cache: an in-process LRU with TTL, plus an
+optional SQLite file that the warm_tips job fills offline.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.llm_cache import MemoryTier
+
+SCORE_DIMENSIONS = ('fiber_score', 'diversity_score', 'processed_score', 'probiotic_score', 'digestive_score')
+
+
+def quantize_scores(scores: Dict[str, Any], bucket_size: int) -> Tuple[int, ...]:
+    """Bucket index per dimension; 100 shares the top bucket"""
+    top = (100 - 1) // bucket_size
+    return tuple(min(max(int(scores.get(name) or 0), 0) // bucket_size, top) for name in SCORE_DIMENSIONS)
+
+
+def bucket_scores(bucket: Tuple[int, ...], bucket_size: int) -> Dict[str, int]:
+    """Representative (midpoint) scores of a bucket, used in the prompt"""
+    return {
+        name: min(index * bucket_size + bucket_size // 2, 100)
+        for name, index in zip(SCORE_DIMENSIONS, bucket)
+    }
+
+
+def score_fingerprint(scores: Dict[str, Any], prompt_version: str) -> str:
+    """Exact scores a stored tips_log row was generated for"""
+    return prompt_version + ':' + ','.join(str(int(scores.get(name) or 0)) for name in SCORE_DIMENSIONS)
+
+
+class TipsSQLiteTier:
+    """Persistent bucket -> variants store; rows of older prompt versions are purged on open"""
+
+    def __init__(self, path: str, ttl: float, prompt_version: str):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tips_cache (
+                    key TEXT PRIMARY KEY,
+                    prompt_version TEXT NOT NULL,
+                    variants TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("DELETE FROM tips_cache WHERE prompt_version != ?", (prompt_version,))
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT variants, expires_at FROM tips_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key: str, prompt_version: str, variants: List[List[str]]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tips_cache VALUES (?, ?, ?, ?)",
+                (key, prompt_version, json.dumps(variants), time.time() + self.ttl),
+            )
+            self._conn.execute("DELETE FROM tips_cache WHERE expires_at <= ?", (time.time(),))
+
+    def append(self, key: str, prompt_version: str, tips: List[str], limit: int) -> Tuple[List[List[str]], float]:
+        """Add a tip set unless `limit` are stored; returns the stored variants and their expiry"""
+        with self._lock, self._conn:
+            # Take the write lock before reading, so a worker sharing the
+            # file cannot append between this read and the write
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute(
+                "SELECT variants, expires_at FROM tips_cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+            variants, expires_at = (json.loads(row[0]), row[1]) if row else ([], 0.0)
+            if len(variants) < limit:
+                variants.append(tips)
+                expires_at = time.time() + self.ttl
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO tips_cache VALUES (?, ?, ?, ?)",
+                    (key, prompt_version, json.dumps(variants), expires_at),
+                )
+                self._conn.execute("DELETE FROM tips_cache WHERE expires_at <= ?", (time.time(),))
+        return variants, expires_at
+
+
+class TipsCache:
+    def __init__(
+        self,
+        prompt_version: str,
+        bucket_size: int,
+        variants: int,
+        max_entries: int,
+        ttl: float,
+        sqlite_path: Optional[str] = None,
+        enabled: bool = True,
+    ):
+        self.prompt_version = prompt_version
+        self.bucket_size = bucket_size
+        self.variants = max(1, variants)
+        self.enabled = enabled
+        self.memory = MemoryTier(max_entries, ttl)
+        self.persistent = TipsSQLiteTier(sqlite_path, ttl, prompt_version) if sqlite_path else None
+        self.hits = 0
+        self.misses = 0
+        # Serializes add() per bucket, so concurrent generations do not
+        # overwrite each other's variants
+        self._locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+    def bucket(self, scores: Dict[str, Any]) -> Tuple[int, ...]:
+        return quantize_scores(scores, self.bucket_size)
+
+    def key(self, bucket: Tuple[int, ...]) -> str:
+        return f"{self.prompt_version}|{','.join(map(str, bucket))}"
+
+    async def variants_for(self, bucket: Tuple[int, ...]) -> List[List[str]]:
+        key = self.key(bucket)
+        variants = self.memory.get(key)
+        # A bucket still filling may have gained variants from other workers
+        if (variants is None or len(variants) < self.variants) and self.persistent is not None:
+            cached = await asyncio.to_thread(self.persistent.get, key)
+            if cached is not None:
+                variants, expires_at = cached
+                self.memory.set(key, variants, expires_at)
+        return variants or []
+
+    async def get(self, scores: Dict[str, Any], seed: str) -> Optional[List[str]]:
+        """
+        A cached tip set for these scores, or None when the bucket still needs variants
+
+        Args:
+            scores: The five sub-scores
+            seed: Picks the variant (e.g. "user_id|date"), stable across calls
+        """
+        if not self.enabled:
+            return None
+        variants = await self.variants_for(self.bucket(scores))
+        if len(variants) < self.variants:
+            self.misses += 1
+            return None
+        self.hits += 1
+        index = int(hashlib.sha256(seed.encode()).hexdigest()[:8], 16) % len(variants)
+        return list(variants[index])
+
+    async def add(self, bucket: Tuple[int, ...], tips: List[str]) -> None:
+        """
+        Keep a generated set for the bucket unless it is full
+
+        Repeats are kept too: a bucket must fill after TIPS_CACHE_VARIANTS
+        generations even if the model answers the same prompt identically.
+        """
+        if not self.enabled:
+            return
+        key = self.key(bucket)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+
+        async with lock:
+            if self.persistent is not None:
+                # Appended in one transaction: other workers share the file
+                variants, expires_at = await asyncio.to_thread(
+                    self.persistent.append, key, self.prompt_version, list(tips), self.variants
+                )
+                self.memory.set(key, variants, expires_at)
+                return
+            variants = list(self.memory.get(key) or [])
+            if len(variants) >= self.variants:
+                return
+            variants.append(list(tips))
+            self.memory.set(key, variants)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0,
+            'buckets': len(self.memory),
+        }
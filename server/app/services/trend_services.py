@@ -0,0 +1,57 @@
+"""
+Trend calculations shared by the summary endpoints
+"""
+
+from typing import List, Optional, Sequence
+
+
+def get_trend(scores_list: Sequence[float]) -> str:
+    """
+    Compare the mean of the second half of a series with the first half
+    
+    Args:
+        scores_list: Scores in chronological order
+        
+    Returns:
+        str: "improving", "declining" or "stable" (fewer than 3 points)
+    """
+    if len(scores_list) < 3:
+        return "stable"
+    first_half = sum(scores_list[:len(scores_list)//2]) / (len(scores_list)//2)
+    second_half = sum(scores_list[len(scores_list)//2:]) / (len(scores_list) - len(scores_list)//2)
+    diff = second_half - first_half
+    if diff > 5:
+        return "improving"
+    elif diff < -5:
+        return "declining"
+    return "stable"
+
+
+def moving_average(values: Sequence[float], window: int) -> List[float]:
+    """
+    Trailing moving average; the first points average what is available
+    
+    Args:
+        values: Series in chronological order
+        window: Number of points per average
+        
+    Returns:
+        List[float]: One average per input point, rounded to 1 decimal
+    """
+    averages = []
+    total = 0.0
+    for i, value in enumerate(values):
+        total += value
+        if i >= window:
+            total -= values[i - window]
+        averages.append(round(total / min(i + 1, window), 1))
+    return averages
+
+
+def is_better(score: int, day: str, other_score: Optional[int], other_day: Optional[str], sign: int) -> bool:
+    """
+    Rank two days for best (sign=1) or worst (sign=-1); earlier date wins ties
+    """
+    if other_day is None:
+        return True
+    return (score - other_score) * sign > 0 or (score == other_score and day < other_day)
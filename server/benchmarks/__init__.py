@@ -0,0 +1,15 @@
+"""
+Benchmark and load-test suite
+
+Everything runs against local stand-ins, so results are reproducible and
+comparable across commits:
+
+- fake_services: fake PostgREST, Supabase Auth and Gemini on one loopback
+  server, with configurable latency and error rate
+- load_test: meal-time request mix with p50/p95/p99 per endpoint
+- micro: CPU microbenchmarks (scoring, trends, lexicon, token checks)
+- scenarios: before/after comparisons of specific optimizations
+- report: result files and a diff between two of them
+
+Run from the server directory, e.g. `python -m benchmarks.load_test`.
+"""
@@ -0,0 +1,431 @@
+"""
+Local stand-ins for Supabase (PostgREST + Auth) and Gemini
+
+One Starlette app serves:
+- /rest/v1/{table}: in-memory PostgREST subset (filters incl. or/and and
+  ->> paths, order, limit, count=exact, insert/upsert, update, delete)
+- /auth/v1/user: Supabase Auth user lookup for AUTH_MODE=remote
+- /v1beta/models/{model}:generateContent: Gemini with canned, text-derived
+  analyses, configurable latency and error rate. Requests with a response
+  schema get compact, schema-shaped JSON; free-form JSON requests get the
+  verbose shape the model used to return, messy at --llm-noise-rate
+
+The app is served on loopback by FakeServices (in a background thread) or
+standalone with `python -m benchmarks.fake_services --port 54321`, and the
+API points at it through SUPABASE_URL and GEMINI_BASE_URL.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from itertools import count
+from typing import Any, Dict, List, Optional
+
+import jwt
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+@dataclass
+class FakeConfig:
+    db_latency_ms: float = 0.0
+    llm_latency_ms: float = 0.0
+    llm_error_rate: float = 0.0
+    llm_ms_per_token: float = 0.0  # added to llm_latency_ms per output token
+    llm_noise_rate: float = 0.0  # free-form replies with string numbers, extra keys or broken JSON
+    jwt_secret: str = 'benchmark-secret-' + 'x' * 16
+    seed: int = 0
+
+
+CATEGORIES = ['fruits', 'vegetables', 'grains', 'legumes', 'nuts', 'dairy', 'fermented', 'meat', 'fish', 'sweets']
+COMPLEXITY = ['easy', 'moderate', 'heavy']
+
+
+def fake_analysis(food_text: str) -> Dict[str, Any]:
+    """Deterministic analysis derived from a hash of the text, in the stored (schema) shape"""
+    digest = hashlib.sha256(food_text.lower().encode()).digest()
+    return {
+        "food_count": len([part for part in re.split(r',| and | with ', food_text) if part.strip()][:4]) or 1,
+        "fiber_grams": round(digest[0] / 255 * 12, 1),
+        "food_categories": sorted({CATEGORIES[b % len(CATEGORIES)] for b in digest[1:1 + 1 + digest[2] % 3]}),
+        "is_processed": digest[3] < 90,
+        "has_probiotics": digest[4] < 60,
+        "digestive_complexity": COMPLEXITY[digest[5] % 3],
+    }
+
+
+class FakeState:
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.ids = count(1)
+        self.random = random.Random(config.seed)
+        self.db_requests = 0
+        self.llm_requests = 0
+        self.llm_errors = 0
+        self.llm_output_tokens = 0
+        self.auth_requests = 0
+
+    def reset(self) -> None:
+        self.tables.clear()
+        self.ids = count(1)
+        self.db_requests = self.llm_requests = self.llm_errors = self.llm_output_tokens = self.auth_requests = 0
+
+
+# --- PostgREST -----------------------------------------------------------
+
+def _value(row: Dict[str, Any], key: str) -> Any:
+    if '->>' in key:
+        column, _, field = key.partition('->>')
+        value = (row.get(column) or {}).get(field)
+        return None if value is None else str(value)
+    return row.get(key)
+
+
+def _compare(current: Any, raw: str) -> tuple:
+    if isinstance(current, (int, float)) and not isinstance(current, bool):
+        return current, float(raw)
+    return str(current), raw
+
+
+def _match(row: Dict[str, Any], key: str, expression: str) -> bool:
+    op, _, raw = expression.partition('.')
+    if op == 'not':
+        return not _match(row, key, raw)
+    current = _value(row, key)
+    if op == 'is':
+        return current is None if raw == 'null' else current is not None
+    if op == 'in':
+        return current is not None and str(current) in [v.strip('"') for v in raw.strip('()').split(',')]
+    if op == 'isdistinct':
+        return current is None or str(current) != raw
+    if current is None:
+        return False
+    if op == 'eq':
+        return str(current) == raw if not isinstance(current, bool) else str(current).lower() == raw
+    if op == 'neq':
+        return str(current) != raw
+    a, b = _compare(current, raw)
+    return {'gt': a > b, 'gte': a >= b, 'lt': a < b, 'lte': a <= b}.get(op, True)
+
+
+def _split_top(expression: str) -> List[str]:
+    parts, depth, current = [], 0, ''
+    for char in expression:
+        depth += char == '('
+        depth -= char == ')'
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+        else:
+            current += char
+    return parts + [current] if current else parts
+
+
+def _match_logic(row: Dict[str, Any], op: str, body: str) -> bool:
+    results = []
+    for condition in _split_top(body):
+        if condition.startswith(('and(', 'or(')):
+            name, _, inner = condition.partition('(')
+            results.append(_match_logic(row, name, inner[:-1]))
+        else:
+            key, _, rest = condition.partition('.')
+            results.append(_match(row, key, rest))
+    return all(results) if op == 'and' else any(results)
+
+
+def _matches(row: Dict[str, Any], filters: List[tuple]) -> bool:
+    for key, value in filters:
+        if key in ('or', 'and'):
+            if not _match_logic(row, key, value.strip()[1:-1]):
+                return False
+        elif not _match(row, key, value):
+            return False
+    return True
+
+
+def _project(rows: List[Dict[str, Any]], select: str) -> List[Dict[str, Any]]:
+    if select == '*':
+        return rows
+    columns = [c.strip() for c in select.split(',')]
+    return [{c: row.get(c) for c in columns} for row in rows]
+
+
+async def _postgrest(request: Request) -> Response:
+    state: FakeState = request.app.state.fake
+    state.db_requests += 1
+    if state.config.db_latency_ms:
+        await asyncio.sleep(state.config.db_latency_ms / 1000)
+
+    rows = state.tables.setdefault(request.path_params['table'], [])
+    params = list(request.query_params.multi_items())
+    reserved = {'select', 'order', 'limit', 'offset', 'on_conflict', 'columns'}
+    filters = [(k, v) for k, v in params if k not in reserved]
+    query = dict(params)
+    prefer = request.headers.get('prefer', '')
+    # Read the body first: matching and writing must not straddle an await,
+    # or conditional updates would see rows another request has since changed
+    payload = json.loads(await request.body() or b'null')
+    matched = [row for row in rows if _matches(row, filters)]
+
+    if request.method in ('GET', 'HEAD'):
+        for part in reversed(query.get('order', '').split(',') if 'order' in query else []):
+            column, _, direction = part.partition('.')
+            matched.sort(
+                key=lambda r, c=column: (r.get(c) is None, r.get(c) if r.get(c) is not None else 0),
+                reverse=direction.startswith('desc'),
+            )
+        total = len(matched)
+        offset = int(query.get('offset', 0))
+        if 'limit' in query:
+            matched = matched[offset:offset + int(query['limit'])]
+        body = _project(matched, query.get('select', '*'))
+        headers = {'content-range': f"{offset}-{offset + len(body)}/{total}"}
+        return Response(json.dumps(body), headers=headers, media_type='application/json')
+
+    minimal = 'return=minimal' in prefer
+    if request.method == 'POST':
+        items = payload if isinstance(payload, list) else [payload]
+        ignore = 'ignore-duplicates' in prefer
+        conflict = query.get('on_conflict', '').split(',') if ignore or 'merge-duplicates' in prefer else []
+        out = []
+        for item in items:
+            existing = None
+            if conflict:
+                existing = next(
+                    (row for row in rows if all(str(row.get(k)) == str(item.get(k)) for k in conflict)), None
+                )
+            if existing is not None:
+                # ON CONFLICT DO NOTHING returns only the rows it inserted
+                if not ignore:
+                    existing.update(item)
+                    out.append(existing)
+            else:
+                row = {'id': next(state.ids), **item}
+                rows.append(row)
+                out.append(row)
+        body = None if minimal else json.dumps(_project(out, query.get('select', '*')))
+        return Response(body, status_code=201, media_type='application/json')
+    if request.method == 'PATCH':
+        for row in matched:
+            row.update(payload)
+        body = None if minimal else json.dumps(_project(matched, query.get('select', '*')))
+        return Response(body, media_type='application/json')
+    if request.method == 'DELETE':
+        for row in matched:
+            rows.remove(row)
+        body = None if minimal else json.dumps(_project(matched, query.get('select', '*')))
+        return Response(body, media_type='application/json')
+    return Response(status_code=405)
+
+
+# --- Auth ----------------------------------------------------------------
+
+async def _auth_user(request: Request) -> Response:
+    state: FakeState = request.app.state.fake
+    state.auth_requests += 1
+    if state.config.db_latency_ms:
+        await asyncio.sleep(state.config.db_latency_ms / 1000)
+    token = request.headers.get('authorization', '').removeprefix('Bearer ')
+    try:
+        claims = jwt.decode(token, state.config.jwt_secret, algorithms=['HS256'], audience='authenticated')
+    except jwt.PyJWTError:
+        return JSONResponse({'msg': 'invalid JWT'}, status_code=401)
+    return JSONResponse({
+        'id': claims['sub'], 'aud': 'authenticated', 'role': 'authenticated',
+        'email': f"{claims['sub']}@example.com", 'app_metadata': {}, 'user_metadata': {},
+        'created_at': '2024-01-01T00:00:00Z',
+    })
+
+
+# --- Gemini --------------------------------------------------------------
+
+_ITEM_RE = re.compile(r"^\d+\. '(.*)'$", re.M)
+_SINGLE_RE = re.compile(r"Analyze this food: '(.*)'\.", re.S)
+
+FAKE_TIPS = ["Add a serving of legumes.", "Swap one snack for fruit.", "Try a fermented food."]
+
+
+def _free_form_analysis(food_text: str, rng: random.Random, noise: float) -> Dict[str, Any]:
+    """The unconstrained shape: listed foods with portions, notes, sometimes string numbers"""
+    analysis = fake_analysis(food_text)
+    foods = [part.strip() for part in re.split(r',| and | with ', food_text) if part.strip()][:4]
+    verbose = {
+        "foods": [{"name": food, "portion": "1 serving", "fiber_grams": analysis["fiber_grams"] / len(foods)} for food in foods],
+        **{key: value for key, value in analysis.items() if key != "food_count"},
+        "notes": "Estimated values based on typical serving sizes.",
+    }
+    if rng.random() < noise:
+        verbose["fiber_grams"] = f"{analysis['fiber_grams']}g"
+        verbose["is_processed"] = str(analysis["is_processed"]).lower()
+        verbose["confidence"] = "medium"
+    return verbose
+
+
+def _gemini_text(prompt: str, structured: bool, rng: random.Random, noise: float) -> str:
+    if prompt.startswith('Analyze each'):
+        items = _ITEM_RE.findall(prompt)
+        reply: Any = [fake_analysis(item) if structured else _free_form_analysis(item, rng, noise) for item in items]
+    elif _SINGLE_RE.search(prompt):
+        food_text = _SINGLE_RE.search(prompt).group(1)
+        reply = fake_analysis(food_text) if structured else _free_form_analysis(food_text, rng, noise)
+    elif 'tips' in prompt.lower():
+        reply = {"tips": FAKE_TIPS} if structured else FAKE_TIPS
+    else:
+        reply = {}
+    if structured:
+        return json.dumps(reply, separators=(',', ':'))
+    text = json.dumps(reply, indent=2)
+    if rng.random() < noise / 4:
+        # Cut off mid-object, like a reply that ran out of tokens
+        text = text[:len(text) // 2]
+    return text
+
+
+async def _gemini(request: Request) -> Response:
+    state: FakeState = request.app.state.fake
+    state.llm_requests += 1
+    config = state.config
+    body = json.loads(await request.body())
+    prompt = ''.join(part.get('text', '') for content in body.get('contents', []) for part in content.get('parts', []))
+    generation = body.get('generationConfig', {})
+    structured = 'responseSchema' in generation or 'responseJsonSchema' in generation
+    text = _gemini_text(prompt, structured, state.random, config.llm_noise_rate)
+    output_tokens = len(text) // 4
+    if config.llm_latency_ms or config.llm_ms_per_token:
+        # Jittered around the configured mean, like a real model
+        latency = state.random.uniform(0.5, 1.5) * config.llm_latency_ms + output_tokens * config.llm_ms_per_token
+        await asyncio.sleep(latency / 1000)
+    if state.random.random() < config.llm_error_rate:
+        state.llm_errors += 1
+        return JSONResponse(
+            {'error': {'code': 503, 'message': 'The model is overloaded.', 'status': 'UNAVAILABLE'}},
+            status_code=503,
+        )
+    state.llm_output_tokens += output_tokens
+    return JSONResponse({
+        'candidates': [{
+            'content': {'role': 'model', 'parts': [{'text': text}]},
+            'finishReason': 'STOP',
+        }],
+        'usageMetadata': {'promptTokenCount': len(prompt) // 4, 'candidatesTokenCount': output_tokens},
+    })
+
+
+async def _stats(request: Request) -> Response:
+    state: FakeState = request.app.state.fake
+    return JSONResponse({
+        'db_requests': state.db_requests,
+        'auth_requests': state.auth_requests,
+        'llm_requests': state.llm_requests,
+        'llm_errors': state.llm_errors,
+        'llm_output_tokens': state.llm_output_tokens,
+        'rows': {table: len(rows) for table, rows in state.tables.items()},
+    })
+
+
+def create_app(config: Optional[FakeConfig] = None) -> Starlette:
+    app = Starlette(routes=[
+        Route('/rest/v1/{table}', _postgrest, methods=['GET', 'HEAD', 'POST', 'PATCH', 'DELETE']),
+        Route('/auth/v1/user', _auth_user, methods=['GET']),
+        Route('/v1beta/models/{model}:generateContent', _gemini, methods=['POST']),
+        Route('/_fake/stats', _stats, methods=['GET']),
+    ])
+    app.state.fake = FakeState(config or FakeConfig())
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class FakeServices:
+    """Serve the fakes on a loopback port from a background thread"""
+
+    def __init__(self, config: Optional[FakeConfig] = None, port: Optional[int] = None):
+        self.app = create_app(config)
+        self.port = port or _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(
+            self.app, host='127.0.0.1', port=self.port, log_level='warning', access_log=False, lifespan='off'
+        ))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def state(self) -> FakeState:
+        return self.app.state.fake
+
+    def env(self) -> Dict[str, str]:
+        """Settings that point the API at these fakes"""
+        return {
+            'SUPABASE_URL': self.url,
+            'SUPABASE_KEY': 'benchmark-service-key',
+            'SUPABASE_JWT_SECRET': self.state.config.jwt_secret,
+            'GEMINI_API_KEY': 'benchmark-gemini-key',
+            'GEMINI_BASE_URL': self.url,
+        }
+
+    def token(self, user_id: str, ttl: int = 3600) -> str:
+        return make_token(user_id, self.state.config.jwt_secret, f"{self.url}/auth/v1", ttl)
+
+    def start(self) -> 'FakeServices':
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake services did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> 'FakeServices':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def make_token(user_id: str, secret: str, issuer: str, ttl: int = 3600) -> str:
+    now = int(time.time())
+    return jwt.encode(
+        {'sub': user_id, 'aud': 'authenticated', 'iss': issuer, 'role': 'authenticated', 'iat': now, 'exp': now + ttl},
+        secret,
+        algorithm='HS256',
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=54321)
+    parser.add_argument('--db-latency-ms', type=float, default=0.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=0.0)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--llm-ms-per-token', type=float, default=0.0)
+    parser.add_argument('--llm-noise-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    config = FakeConfig(
+        args.db_latency_ms, args.llm_latency_ms, args.llm_error_rate,
+        llm_ms_per_token=args.llm_ms_per_token, llm_noise_rate=args.llm_noise_rate, seed=args.seed,
+    )
+    print(f"Fake Supabase/Gemini on http://127.0.0.1:{args.port} (JWT secret: {config.jwt_secret})")
+    uvicorn.run(create_app(config), host='127.0.0.1', port=args.port, log_level='warning', lifespan='off')
+
+
+if __name__ == '__main__':
+    main()
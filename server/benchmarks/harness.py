@@ -0,0 +1,49 @@
+"""
+Run the API in-process against the fake services
+
+Settings are read from the environment when app.core.config is first
+imported, so configure() must run before anything under `app` is imported.
+"""
+
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+from benchmarks.fake_services import FakeServices
+
+
+def configure(fakes: FakeServices, overrides: Optional[Dict[str, Any]] = None) -> None:
+    """Point the settings at the fakes; must run before importing `app`"""
+    os.environ.update(fakes.env())
+    os.environ.setdefault('AUTH_MODE', 'local')
+    os.environ.setdefault('SERVER_WORKERS', '1')  # the app runs in this one process
+    for key, value in (overrides or {}).items():
+        os.environ[key] = str(value).lower() if isinstance(value, bool) else str(value)
+
+
+@asynccontextmanager
+async def app_client(timeout: float = 60.0) -> AsyncIterator[httpx.AsyncClient]:
+    """The FastAPI app with its lifespan running, behind an in-process transport"""
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url='http://app', timeout=timeout
+        ) as client:
+            yield client
+
+
+def app_stats() -> Dict[str, Any]:
+    """Counters the app keeps in-process, for the result file"""
+    from app.services.food_lexicon import get_food_lexicon
+    from app.services.llm_services import analysis_cache, llm_gateway
+    from app.services.summary_cache import summary_cache
+
+    return {
+        'llm_gateway': llm_gateway.stats(),
+        'analysis_cache': analysis_cache.stats(),
+        'summary_cache': summary_cache.stats(),
+        'lexicon': get_food_lexicon().stats(),
+    }
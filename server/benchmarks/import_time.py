@@ -0,0 +1,103 @@
+"""
+Import-time budget for the API
+
+Imports app.main in fresh interpreters under `python -X importtime` and
+reports the median total plus its slowest direct imports. Worker boot,
+autoscaling and test collection all pay this on every process start.
+
+The run fails (exit status 1) when the median exceeds --budget-ms, or when
+a module that is meant to load on first use (google.genai, supabase,
+numpy) is imported eagerly again.
+
+Usage:
+    python -m benchmarks.import_time [--runs 5] [--budget-ms 1000] [--top 12]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.report import print_table, save_results
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded by get_gemini_client, get_supabase_client and the rescore CLI
+DEFERRED_MODULES = ('google.genai', 'supabase', 'numpy')
+
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def _import_once(module: str) -> List[Tuple[int, str, int]]:
+    """(cumulative_us, module, depth) for every module the import loaded"""
+    env = dict(os.environ)
+    # Settings need these to load; nothing connects during import
+    env.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+    env.setdefault('SUPABASE_KEY', 'benchmark-service-key')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            rows.append((int(match.group(2)), match.group(4), len(match.group(3)) // 2))
+    return rows
+
+
+def measure(module: str, runs: int) -> Dict[str, Any]:
+    totals: List[float] = []
+    imports: Dict[str, List[float]] = {}
+    loaded = set()
+    for _ in range(runs):
+        rows = _import_once(module)
+        loaded.update(name for _, name, _ in rows)
+        # Direct imports of the module only (listed just before it, one level
+        # deeper), so nested time is not counted twice
+        per_run: Dict[str, float] = {}
+        end = next(i for i, (_, name, _) in enumerate(rows) if name == module)
+        totals.append(rows[end][0] / 1000)
+        for us, name, depth in reversed(rows[:end]):
+            if depth == 0:
+                break
+            if depth == 1:
+                per_run[name] = us / 1000
+        for name, ms in per_run.items():
+            imports.setdefault(name, []).append(ms)
+    return {
+        'total_ms': round(statistics.median(totals), 1),
+        'imports': {name: round(statistics.median(values), 1) for name, values in imports.items()},
+        'eager_deferred': [name for name in DEFERRED_MODULES if name in loaded],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app.main')
+    parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters; the median is reported")
+    parser.add_argument('--budget-ms', type=float, default=1000.0, help="Fail above this median import time")
+    parser.add_argument('--top', type=int, default=12, help="Slowest direct imports to list")
+    parser.add_argument('--output', help="Result file (default benchmarks/results/...)")
+    args = parser.parse_args()
+
+    result = measure(args.module, args.runs)
+    top = sorted(result['imports'].items(), key=lambda item: item[1], reverse=True)[:args.top]
+    print_table({name: {'cumulative_ms': ms} for name, ms in top}, ['cumulative_ms'])
+    print(f"{args.module}: {result['total_ms']} ms (median of {args.runs}, budget {args.budget_ms} ms)")
+    print(f"Saved {save_results('import_time', result, vars(args), args.output)}")
+
+    if result['eager_deferred']:
+        sys.exit(f"Imported at startup but meant to load on first use: {', '.join(result['eager_deferred'])}")
+    if result['total_ms'] > args.budget_ms:
+        sys.exit(f"Import time {result['total_ms']} ms is over the {args.budget_ms} ms budget")
+
+
+if __name__ == '__main__':
+    main()
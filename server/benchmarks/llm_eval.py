@@ -0,0 +1,174 @@
+"""
+Offline evaluation of the Gemini calls: free-form JSON vs structured output
+
+The same food texts and score vectors go through two pipelines, and each
+reports output tokens, latency and fallback rate:
+
+    free-form   the analysis-v1/tips-v1 prompts in plain JSON mode, parsed
+                with json.loads as before
+    structured  the current prompts with a response schema and output-token
+                cap, validated into app.models.llm_output
+
+Calls go straight to the client (no gateway, no caches), a few at a time.
+By default they hit the fake Gemini: free-form replies come back verbose
+and, at --noise-rate, with string-typed fields or cut-off JSON, and latency
+grows with output tokens. That checks both pipelines end to end and shows
+the size of the effect. With --live the real API is used (GEMINI_API_KEY
+and the other settings come from the environment).
+
+Usage:
+    python -m benchmarks.llm_eval [--foods 100] [--tips 20] [--noise-rate 0.1] [--ms-per-token 5] [--live]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.fake_services import FakeConfig, FakeServices
+from benchmarks.harness import configure
+from benchmarks.load_test import KNOWN_FOODS, _DISHES, _STYLES
+from benchmarks.report import print_table, save_results, summarize
+
+SCORE_NAMES = ('fiber_score', 'diversity_score', 'processed_score', 'probiotic_score', 'digestive_score')
+BOOLEAN_FIELDS = ('is_processed', 'has_probiotics')
+
+
+def _food_texts(count: int, rng: random.Random) -> List[str]:
+    texts = []
+    for i in range(count):
+        if i % 2:
+            texts.append(rng.choice(KNOWN_FOODS))
+        else:
+            texts.append(f"{rng.choice(_STYLES)} {rng.choice(_DISHES)} with {rng.choice(KNOWN_FOODS)}")
+    return texts
+
+
+def _score_sets(count: int, rng: random.Random) -> List[Dict[str, int]]:
+    return [{name: rng.randint(0, 100) for name in SCORE_NAMES} for _ in range(count)]
+
+
+def _legacy_analysis_prompt(food_text: str) -> str:
+    return f"Analyze this food: '{food_text}'. Return JSON with: foods, fiber_grams, food_categories, is_processed, has_probiotics, digestive_complexity."
+
+
+def _legacy_tips_prompt(scores: Dict[str, int]) -> str:
+    return f"As a gut health coach, give 3 short, actionable tips for these scores (0-100): Fiber: {scores['fiber_score']}, Diversity: {scores['diversity_score']}, Processed: {scores['processed_score']}, Probiotics: {scores['probiotic_score']}, Digestion: {scores['digestive_score']}. Return a JSON array of 3 strings."
+
+
+def _legacy_analysis(text: str) -> str:
+    """Outcome of the old parse: fallback on non-objects, wrong_type when scoring would misread a field"""
+    analysis = json.loads(text)
+    if not isinstance(analysis, dict):
+        return 'fallback'
+    if not isinstance(analysis.get('fiber_grams'), (int, float)) \
+            or not all(isinstance(analysis.get(field), bool) for field in BOOLEAN_FIELDS):
+        return 'wrong_type'
+    return 'ok'
+
+
+def _legacy_tips(text: str) -> str:
+    return 'ok' if isinstance(json.loads(text), list) else 'fallback'
+
+
+async def _evaluate(
+    calls: List[Tuple[str, Any]], parse: Callable[[str], str], concurrency: int
+) -> Dict[str, Any]:
+    """Run (prompt, config) pairs and tally latency, output tokens and parse outcomes"""
+    from app.services.llm_services import MODEL, get_gemini_client
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    tokens: List[int] = []
+    outcomes: Dict[str, int] = {'ok': 0, 'fallback': 0, 'wrong_type': 0}
+
+    async def _one(prompt: str, config: Any) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await asyncio.to_thread(
+                    get_gemini_client().models.generate_content, model=MODEL, contents=prompt, config=config
+                )
+            except Exception as e:
+                print(f"Call failed: {e}")
+                outcomes['fallback'] += 1
+                return
+            latencies.append(time.perf_counter() - started)
+        usage = response.usage_metadata
+        tokens.append((usage.candidates_token_count or 0) if usage else 0)
+        try:
+            outcomes[parse(response.text or '')] += 1
+        except Exception:
+            outcomes['fallback'] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one(prompt, config) for prompt, config in calls))
+    row = summarize(latencies, time.perf_counter() - started)
+    row['output_tokens'] = round(sum(tokens) / len(tokens), 1) if tokens else 0.0
+    row['fallback_rate'] = round(outcomes['fallback'] / len(calls), 3)
+    row['wrong_type_rate'] = round(outcomes['wrong_type'] / len(calls), 3)
+    return row
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    from google.genai import types
+    from app.core.config import settings
+    from app.models.llm_output import DailyTips, FoodAnalysis
+    from app.services.llm_services import analysis_prompt, structured_config, tips_prompt
+
+    rng = random.Random(args.seed)
+    foods = _food_texts(args.foods, rng)
+    scores = _score_sets(args.tips, rng)
+    json_mode = types.GenerateContentConfig(response_mime_type='application/json')
+    analysis_config = structured_config(FoodAnalysis, settings.LLM_ANALYSIS_MAX_OUTPUT_TOKENS)
+    tips_config = structured_config(DailyTips, settings.LLM_TIPS_MAX_OUTPUT_TOKENS)
+
+    def _structured(model: Any) -> Callable[[str], str]:
+        def _parse(text: str) -> str:
+            model.model_validate_json(text)
+            return 'ok'
+        return _parse
+
+    pipelines: Dict[str, Tuple[List[Tuple[str, Any]], Callable[[str], str]]] = {
+        'analysis free-form': ([(_legacy_analysis_prompt(f), json_mode) for f in foods], _legacy_analysis),
+        'analysis structured': ([(analysis_prompt(f), analysis_config) for f in foods], _structured(FoodAnalysis)),
+        'tips free-form': ([(_legacy_tips_prompt(s), json_mode) for s in scores], _legacy_tips),
+        'tips structured': ([(tips_prompt(s), tips_config) for s in scores], _structured(DailyTips)),
+    }
+    results = {}
+    for label, (calls, parse) in pipelines.items():
+        results[label] = await _evaluate(calls, parse, args.concurrency)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--foods', type=int, default=100, help="Food texts to analyze per pipeline")
+    parser.add_argument('--tips', type=int, default=20, help="Score vectors to get tips for per pipeline")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--live', action='store_true', help="Call the real Gemini API instead of the fake")
+    parser.add_argument('--noise-rate', type=float, default=0.1, help="Messy free-form replies (fake only)")
+    parser.add_argument('--llm-latency-ms', type=float, default=150.0, help="Base latency (fake only)")
+    parser.add_argument('--ms-per-token', type=float, default=5.0, help="Latency per output token (fake only)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Result file (default benchmarks/results/...)")
+    args = parser.parse_args()
+
+    fakes = None if args.live else FakeServices(FakeConfig(
+        llm_latency_ms=args.llm_latency_ms, llm_ms_per_token=args.ms_per_token,
+        llm_noise_rate=args.noise_rate, seed=args.seed,
+    ))
+    with fakes or nullcontext():
+        if fakes is not None:
+            configure(fakes)
+        results = asyncio.run(run(args))
+
+    print_table(results, ['count', 'output_tokens', 'p50_ms', 'p95_ms', 'fallback_rate', 'wrong_type_rate'])
+    print(f"Saved {save_results('llm_eval', results, vars(args), args.output)}")
+
+
+if __name__ == '__main__':
+    main()
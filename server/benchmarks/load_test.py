@@ -0,0 +1,224 @@
+"""
+Meal-time load test against fake Supabase and Gemini
+
+Each virtual user logs meals for the last few days and browses its
+summaries with a weighted request mix (MIX). Latencies are reported per
+endpoint as throughput and p50/p95/p99, printed and saved as JSON.
+
+By default the API runs in-process with the fakes on a loopback port.
+With --base-url the requests go to a running server instead; start the
+fakes with `python -m benchmarks.fake_services` and run the API with
+SUPABASE_URL / GEMINI_BASE_URL / SUPABASE_JWT_SECRET pointing at them.
+
+Usage:
+    python -m benchmarks.load_test [--users 20] [--duration 30] [--llm-latency-ms 400]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+import httpx
+
+from benchmarks.fake_services import FakeConfig, FakeServices, make_token
+from benchmarks.harness import app_client, app_stats, configure
+from benchmarks.report import print_table, save_results, summarize
+
+# Relative weights of each action in the mix
+MIX = {
+    'create': 25,
+    'list': 14,
+    'daily': 14,
+    'weekly': 8,
+    'dashboard': 12,
+    'update': 8,
+    'delete': 4,
+    'tips_get': 8,
+    'tips_generate': 3,
+    'range': 4,
+}
+
+# Recognized by the lexicon
+KNOWN_FOODS = [
+    'oatmeal with banana', 'greek yogurt with blueberries', 'burger and fries', 'salmon with brown rice',
+    'lentil soup', '2 eggs and toast', 'apple', 'chicken salad', 'pizza', 'kimchi fried rice',
+    'peanut butter sandwich', 'black bean burrito', 'coffee', 'mixed nuts', 'spinach and chickpeas',
+]
+
+# Combined into many distinct dishes that need Gemini (and miss the cache at first)
+_STYLES = ['spicy', 'creamy', 'thai', 'korean', 'mexican', 'mediterranean', 'cajun', 'teriyaki', 'smoky', 'herbed']
+_DISHES = ['noodle bowl', 'curry', 'stir fry', 'casserole', 'stew', 'wrap', 'poke bowl', 'frittata', 'risotto', 'tagine']
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, token: str, rng: random.Random, days: int, unknown_ratio: float):
+        self.client = client
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.rng = rng
+        self.days = days
+        self.unknown_ratio = unknown_ratio
+        self.entries: List[tuple] = []
+
+    def _day(self) -> date:
+        return date.today() - timedelta(days=self.rng.randrange(self.days))
+
+    def _food(self) -> str:
+        if self.rng.random() < self.unknown_ratio:
+            return f"{self.rng.choice(_STYLES)} {self.rng.choice(_DISHES)}"
+        return self.rng.choice(KNOWN_FOODS)
+
+    async def run(self, action: str) -> tuple:
+        """Perform one action; returns (endpoint label, response)"""
+        if action in ('update', 'delete') and not self.entries:
+            action = 'create'
+        day = self._day()
+        if action == 'create':
+            response = await self.client.post('/food-entry', headers=self.headers, json={
+                'date': str(day), 'meal_type': self.rng.choice(['breakfast', 'lunch', 'dinner', 'snack']),
+                'food_text': self._food(),
+            })
+            if response.status_code in (200, 202):
+                self.entries.append((response.json()['entry_id'], day))
+            return 'POST /food-entry', response
+        if action == 'update':
+            entry_id, _ = self.rng.choice(self.entries)
+            response = await self.client.put(f'/food-entry/{entry_id}', headers=self.headers, json={'food_text': self._food()})
+            return 'PUT /food-entry/{id}', response
+        if action == 'delete':
+            entry = self.entries.pop(self.rng.randrange(len(self.entries)))
+            response = await self.client.delete(f'/food-entry/{entry[0]}', headers=self.headers)
+            return 'DELETE /food-entry/{id}', response
+        if action == 'list':
+            return 'GET /food-entry', await self.client.get('/food-entry', headers=self.headers, params={'date': str(day)})
+        if action == 'daily':
+            return 'GET /daily-summary', await self.client.get('/daily-summary', headers=self.headers, params={'date': str(day)})
+        if action == 'weekly':
+            monday = day - timedelta(days=day.weekday())
+            return 'GET /weekly-summary', await self.client.get('/weekly-summary', headers=self.headers, params={'start': str(monday)})
+        if action == 'dashboard':
+            return 'GET /dashboard', await self.client.get('/dashboard', headers=self.headers, params={'date': str(day)})
+        if action == 'range':
+            params = {'from': str(day - timedelta(days=90)), 'to': str(day), 'granularity': 'week'}
+            return 'GET /summary/range', await self.client.get('/summary/range', headers=self.headers, params=params)
+        if action == 'tips_get':
+            return 'GET /tips', await self.client.get('/tips', headers=self.headers, params={'date': str(day)})
+        if action == 'tips_generate':
+            return 'POST /tips/generate', await self.client.post('/tips/generate', headers=self.headers, params={'date': str(day)})
+        raise ValueError(action)
+
+
+def _is_error(label: str, response: httpx.Response) -> bool:
+    # A 404 from /tips or a 400 from tips/generate before any entry is normal traffic
+    if label == 'GET /tips' and response.status_code == 404:
+        return False
+    if label == 'POST /tips/generate' and response.status_code == 400:
+        return False
+    return response.status_code >= 400
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    token_for: Callable[[str], str],
+    users: int,
+    duration: float,
+    think_ms: float,
+    days: int,
+    unknown_ratio: float,
+    seed: int,
+) -> Dict[str, Any]:
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    actions, weights = zip(*MIX.items())
+    deadline = time.perf_counter() + duration
+
+    async def _user(index: int) -> None:
+        rng = random.Random(seed * 1000 + index)
+        user = VirtualUser(client, token_for(str(uuid.UUID(int=rng.getrandbits(128)))), rng, days, unknown_ratio)
+        while time.perf_counter() < deadline:
+            action = rng.choices(actions, weights)[0]
+            started = time.perf_counter()
+            try:
+                label, response = await user.run(action)
+                failed = _is_error(label, response)
+            except httpx.HTTPError:
+                label, failed = action, True
+            latencies[label].append(time.perf_counter() - started)
+            errors[label] += failed
+            if think_ms:
+                await asyncio.sleep(rng.expovariate(1000 / think_ms))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_user(i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+
+    endpoints = {label: summarize(values, elapsed, errors[label]) for label, values in sorted(latencies.items())}
+    everything = [value for values in latencies.values() for value in values]
+    return {
+        'elapsed_seconds': round(elapsed, 3),
+        'total': summarize(everything, elapsed, sum(errors.values())),
+        'endpoints': endpoints,
+    }
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    common = dict(
+        users=args.users, duration=args.duration, think_ms=args.think_ms,
+        days=args.days, unknown_ratio=args.unknown_ratio, seed=args.seed,
+    )
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+            issuer = args.issuer or f"{args.supabase_url}/auth/v1"
+            return await run_load(client, lambda sub: make_token(sub, args.jwt_secret, issuer), **common)
+
+    config = FakeConfig(
+        db_latency_ms=args.db_latency_ms, llm_latency_ms=args.llm_latency_ms,
+        llm_error_rate=args.llm_error_rate, seed=args.seed,
+    )
+    with FakeServices(config) as fakes:
+        configure(fakes, {'ASYNC_ANALYSIS_ENABLED': args.async_analysis, 'LEXICON_ENABLED': not args.no_lexicon})
+        async with app_client() as client:
+            results = await run_load(client, fakes.token, **common)
+        results['fake_services'] = {
+            'db_requests': fakes.state.db_requests,
+            'llm_requests': fakes.state.llm_requests,
+            'llm_errors': fakes.state.llm_errors,
+        }
+        results['app'] = app_stats()
+        return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20, help="Concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to run")
+    parser.add_argument('--think-ms', type=float, default=50.0, help="Mean pause between a user's requests")
+    parser.add_argument('--days', type=int, default=7, help="Days of history users write to")
+    parser.add_argument('--unknown-ratio', type=float, default=0.3, help="Share of meals the lexicon cannot answer")
+    parser.add_argument('--db-latency-ms', type=float, default=2.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=400.0)
+    parser.add_argument('--llm-error-rate', type=float, default=0.0)
+    parser.add_argument('--async-analysis', action='store_true', help="Run with ASYNC_ANALYSIS_ENABLED")
+    parser.add_argument('--no-lexicon', action='store_true', help="Run with LEXICON_ENABLED=false")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--base-url', help="Load an already running API instead of an in-process one")
+    parser.add_argument('--supabase-url', default='http://127.0.0.1:54321', help="With --base-url: the fakes' URL")
+    parser.add_argument('--jwt-secret', default=FakeConfig.jwt_secret, help="With --base-url: token signing secret")
+    parser.add_argument('--issuer', help="With --base-url: token issuer (default {supabase-url}/auth/v1)")
+    parser.add_argument('--output', help="Result file (default benchmarks/results/...)")
+    args = parser.parse_args()
+
+    results = asyncio.run(_main(args))
+    print_table(
+        {**results['endpoints'], 'TOTAL': results['total']},
+        ['count', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'],
+    )
+    print(f"Saved {save_results('load_test', results, vars(args), args.output)}")
+
+
+if __name__ == '__main__':
+    main()
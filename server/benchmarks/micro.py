@@ -0,0 +1,204 @@
+"""
+CPU microbenchmarks for the scoring, trend, serialization and analysis hot paths,
+plus the size and parse time of stored entry payloads
+
+Each benchmark reports the best per-call time over several repeats, so
+runs on the same machine are comparable across commits.
+
+Usage:
+    python -m benchmarks.micro [--quick] [--output results.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List
+
+# Settings need these to import; nothing here talks to the network
+os.environ.setdefault('SUPABASE_URL', 'http://127.0.0.1:9')
+os.environ.setdefault('SUPABASE_KEY', 'benchmark-service-key')
+os.environ.setdefault('GEMINI_API_KEY', 'benchmark-gemini-key')
+os.environ.setdefault('SUPABASE_JWT_SECRET', 'benchmark-secret-' + 'x' * 16)
+
+from benchmarks.fake_services import fake_analysis, make_token  # noqa: E402
+from benchmarks.report import print_table, save_results  # noqa: E402
+
+
+def bench(fn: Callable[[], Any], number: int, repeat: int = 5) -> Dict[str, float]:
+    """Best and median per-call time in microseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - started) / number)
+    timings.sort()
+    return {'best_us': round(timings[0] * 1e6, 3), 'median_us': round(timings[len(timings) // 2] * 1e6, 3), 'calls': number}
+
+
+def _entries(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    return [{'llm_analysis': fake_analysis(f"meal {rng.random()}")} for _ in range(count)]
+
+
+def _days(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    start = date(2025, 1, 1)
+    return [
+        {
+            'id': i, 'user_id': 'u', 'date': str(start + timedelta(days=i)),
+            'gut_score': rng.randint(20, 95), 'fiber_grams': round(rng.uniform(2, 35), 1),
+            'fiber_score': rng.randint(0, 100), 'diversity_score': rng.randint(0, 100),
+            'processed_score': rng.randint(0, 100), 'probiotic_score': rng.randint(0, 100),
+            'digestive_score': rng.randint(40, 95), 'updated_at': '2025-01-01T00:00:00',
+        }
+        for i in range(count)
+    ]
+
+
+def _legacy_entry_row(i: int, food_text: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """A food_entries row as select('*') returned it before projection and the compact format"""
+    return {
+        'id': i, 'user_id': '6f1c2b1e-8d4a-4f0e-9a57-3c2d1b0a9e87', 'date': '2025-01-01',
+        'time': '12:30:00', 'meal_type': 'lunch', 'food_text': food_text,
+        'llm_analysis': {**analysis, 'analysis_version': 'gemini-2.5-flash/analysis-v2'},
+    }
+
+
+class _WeekRepository:
+    """In-process DailySummaryRepository double for the weekly loader"""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+
+    async def list_range(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return self.rows
+
+
+def run(scale: float = 1.0) -> Dict[str, Dict[str, float]]:
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from app.api.routes.summaries import _load_weekly_summary
+    from app.models.summary import WeeklySummaryResponse
+    from app.services.summary_cache import encode_payload
+    from app.core.metrics import REQUEST_SECONDS, span
+    from app.models.stored_analysis import decode_rows, encode_analysis
+    from app.core.security import token_cache, verify_access_token
+    from app.services.batch_scoring import score_groups
+    from app.services.food_lexicon import get_food_lexicon
+    from app.services.llm_cache import normalize_food_text
+    from app.services.rollup_services import rollup_from_days
+    from app.services.scoring_services import calculate_gut_health_scores
+    from app.services.trend_services import get_trend, moving_average
+
+    rng = random.Random(7)
+    n = lambda base: max(1, int(base * scale))  # noqa: E731
+    results: Dict[str, Dict[str, float]] = {}
+
+    # Scoring
+    day5, day30 = _entries(rng, 5), _entries(rng, 30)
+    results['scoring.day_5_entries'] = bench(lambda: calculate_gut_health_scores(day5), n(20000))
+    results['scoring.day_30_entries'] = bench(lambda: calculate_gut_health_scores(day30), n(5000))
+
+    # Batch vs scalar over 2,000 days of 5 entries (per day)
+    grouped = [((day, 'u'), entry['llm_analysis']) for day in range(2000) for entry in _entries(rng, 5)]
+    by_day: Dict[Any, List[Dict[str, Any]]] = {}
+    for key, analysis in grouped:
+        by_day.setdefault(key, []).append({'llm_analysis': analysis})
+    scalar = bench(lambda: [calculate_gut_health_scores(e) for e in by_day.values()], n(5), repeat=3)
+    batch = bench(lambda: score_groups(grouped), n(5), repeat=3)
+    results['scoring.scalar_2000_days'] = scalar
+    results['scoring.batch_2000_days'] = batch
+    results['scoring.batch_speedup'] = {'x': round(scalar['best_us'] / batch['best_us'], 2)}
+
+    # Trends
+    week, year = _days(rng, 7), _days(rng, 365)
+    week_scores, year_scores = [d['gut_score'] for d in week], [d['gut_score'] for d in year]
+    results['trend.get_trend_7'] = bench(lambda: get_trend(week_scores), n(100000))
+    results['trend.get_trend_365'] = bench(lambda: get_trend(year_scores), n(20000))
+    results['trend.moving_average_365'] = bench(lambda: moving_average(year_scores, 4), n(5000))
+    results['trend.rollup_year_from_days'] = bench(lambda: rollup_from_days('u', 'year', date(2025, 1, 1), year), n(500))
+
+    loop = asyncio.new_event_loop()
+    repository = _WeekRepository(week)
+    start = date(2025, 1, 1)
+    results['trend.weekly_summary_payload'] = bench(
+        lambda: loop.run_until_complete(_load_weekly_summary('u', start, start + timedelta(days=7), repository)),
+        n(5000),
+    )
+
+    # Response serialization of a weekly payload stretched to a year of daily
+    # scores: the default dict path, the response-model path FastAPI takes
+    # (validate, then dump straight to JSON bytes) and the summary cache's orjson
+    payload = loop.run_until_complete(_load_weekly_summary('u', start, start + timedelta(days=365), _WeekRepository(year)))
+    weekly_model = TypeAdapter(WeeklySummaryResponse)
+    results['serialize.year_jsonable_encoder'] = bench(
+        lambda: json.dumps(jsonable_encoder(payload)).encode(), n(200)
+    )
+    results['serialize.year_response_model'] = bench(
+        lambda: weekly_model.dump_json(weekly_model.validate_python(payload)), n(200)
+    )
+    results['serialize.year_orjson'] = bench(lambda: encode_payload(payload), n(200))
+
+    # Food text analysis
+    lexicon = get_food_lexicon()
+    meal = 'Salmon, brown rice and steamed broccoli'
+    results['analysis.normalize_food_text'] = bench(lambda: normalize_food_text(meal), n(20000))
+    results['analysis.lexicon_analyze'] = bench(lambda: lexicon.analyze(meal), n(20000))
+
+    # Entries read to recompute a heavy day (60 entries) and a week of them:
+    # whole rows with the legacy analysis (foods list, strings) against the
+    # projected compact column. Bytes are the JSON body as PostgREST sends it;
+    # time is json.loads plus decoding back to the analysis shape
+    from benchmarks.load_test import KNOWN_FOODS
+    texts = [rng.choice(KNOWN_FOODS) for _ in range(420)]
+    stored = [_legacy_entry_row(i, text, lexicon.analyze(text, 0.0) or fake_analysis(text)) for i, text in enumerate(texts)]
+    for label, count in (('day_60_entries', 60), ('week_420_entries', 420)):
+        legacy_body = json.dumps(stored[:count], separators=(',', ':'))
+        compact_body = json.dumps(
+            [{'llm_analysis': encode_analysis(row['llm_analysis'])} for row in stored[:count]], separators=(',', ':')
+        )
+        legacy = bench(lambda body=legacy_body: json.loads(body), n(20000 // count * 10))
+        compact = bench(lambda body=compact_body: decode_rows(json.loads(body)), n(20000 // count * 10))
+        results[f'payload.{label}_select_all'] = {**legacy, 'bytes': len(legacy_body)}
+        results[f'payload.{label}_compact'] = {**compact, 'bytes': len(compact_body)}
+        results[f'payload.{label}_reduction'] = {
+            'x': round(len(legacy_body) / len(compact_body), 2), 'time_x': round(legacy['best_us'] / compact['best_us'], 2)
+        }
+
+    # Local JWT verification, cold (signature check) and warm (token cache)
+    token = make_token('u', os.environ['SUPABASE_JWT_SECRET'], f"{os.environ['SUPABASE_URL']}/auth/v1")
+
+    def _cold():
+        token_cache._entries.clear()
+        loop.run_until_complete(verify_access_token(token))
+
+    results['auth.verify_local_cold'] = bench(_cold, n(5000))
+    results['auth.verify_local_cached'] = bench(lambda: loop.run_until_complete(verify_access_token(token)), n(20000))
+    loop.close()
+
+    # Instrumentation overhead per span / per request observation
+    def _span():
+        with span('bench'):
+            pass
+
+    results['metrics.span'] = bench(_span, n(100000))
+    results['metrics.request_observe'] = bench(lambda: REQUEST_SECONDS.observe(0.02, 'GET', 'bench', '200'), n(100000))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help="Run a tenth of the iterations")
+    parser.add_argument('--output', help="Result file (default benchmarks/results/...)")
+    args = parser.parse_args()
+
+    results = run(0.1 if args.quick else 1.0)
+    print_table(results, ['best_us', 'median_us', 'calls', 'bytes', 'x', 'time_x'])
+    print(f"Saved {save_results('micro', results, vars(args), args.output)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,772 @@
+"""
+Before/after comparisons for individual optimizations
+
+    auth        Supabase Auth round trip per request vs local JWT verification
+    repository  sync supabase-py client vs async repositories, sequential and gathered
+    bulk        one POST /food-entry per meal vs POST /food-entry/bulk
+    export      peak memory of /export over a month vs a multi-year history
+    burst       concurrent writes to one day: independent summary updates vs the coordinator
+    workers     requests per second of serve.py at each --worker-counts
+    reanalyze   re-analysis of a stale history: one PUT per entry vs app.cli.reanalyze
+    compact     stored analysis bytes before and after app.cli.compact_analyses
+    cohort      sketch percentiles from two workers, and after a rebuild, vs exact ones
+
+Everything runs against the fake services with a configurable latency, so
+the numbers isolate the cost of round trips rather than the real backends.
+The workers scenario starts the production server as a subprocess and loads
+it from --generators processes; it only scales on a multi-core machine.
+
+Usage:
+    python -m benchmarks.scenarios auth|repository|bulk|export|burst|workers|reanalyze|compact|cohort|all [--db-latency-ms 20] [--llm-latency-ms 400]
+
+The export scenario only reports; tests/test_export.py asserts its memory
+bound. The burst scenario exits non-zero when either summary does not
+match a full rebuild, the reanalyze scenario when the interrupted and
+resumed job leaves a stale entry or an inconsistent summary behind, the
+compact scenario when a legacy entry is left or a summary read back
+differently, the cohort scenario when a percentile is off by more than
+--cohort-max-error, a population miscounted or a stopped worker's shard
+left behind.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import tracemalloc
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+import httpx
+
+from benchmarks.fake_services import FakeConfig, FakeServices, _free_port, fake_analysis
+from benchmarks.harness import app_client, configure
+from benchmarks.load_test import KNOWN_FOODS, _DISHES, _STYLES
+from benchmarks.report import print_table, save_results, summarize
+
+SCENARIOS = ('auth', 'repository', 'bulk', 'export', 'burst', 'workers', 'reanalyze', 'compact', 'cohort')
+
+SERVER_DIR = Path(__file__).resolve().parent.parent
+
+
+async def _timed(calls: int, call: Callable[[int], Awaitable[Any]], concurrency: int = 1) -> Dict[str, Any]:
+    """Run `call(i)` for i in range(calls), `concurrency` at a time"""
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await call(i)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_one(i) for i in range(calls)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def auth_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    from app.api.deps import _verify_remote
+    from app.core.security import token_cache, verify_access_token
+
+    tokens = [fakes.token(str(uuid.uuid4())) for _ in range(args.requests)]
+
+    async def _cold(i: int) -> str:
+        token_cache._entries.clear()
+        return await verify_access_token(tokens[i])
+
+    results = {}
+    for concurrency in (1, args.concurrency):
+        results[f'remote (c={concurrency})'] = await _timed(
+            args.requests, lambda i: _verify_remote(tokens[i]), concurrency
+        )
+        results[f'local cold (c={concurrency})'] = await _timed(args.requests, _cold, concurrency)
+        results[f'local cached (c={concurrency})'] = await _timed(
+            args.requests, lambda i: verify_access_token(tokens[i]), concurrency
+        )
+    results['auth_server_requests'] = {'count': fakes.state.auth_requests}
+    return results
+
+
+async def _seed_user(user_id: str, day: date) -> None:
+    from app.repositories.daily_summaries import get_daily_summary_repository
+    from app.repositories.food_entries import get_food_entry_repository
+    from app.repositories.tips import get_tips_repository
+
+    await get_food_entry_repository().insert_many([
+        {'user_id': user_id, 'date': str(day), 'meal_type': 'lunch', 'food_text': food, 'llm_analysis': {}}
+        for food in KNOWN_FOODS[:4]
+    ])
+    await get_daily_summary_repository().upsert_many([
+        {'user_id': user_id, 'date': str(day - timedelta(days=offset)), 'gut_score': 60 + offset, 'entry_count': 4}
+        for offset in range(7)
+    ])
+    await get_tips_repository().upsert({'user_id': user_id, 'date': str(day), 'tips': ['Eat more fiber']})
+
+
+async def repository_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    """The four reads behind a dashboard: entries, day summary, week and tips"""
+    from app.db.supabase import get_supabase_client
+    from app.repositories.daily_summaries import get_daily_summary_repository
+    from app.repositories.food_entries import get_food_entry_repository
+    from app.repositories.tips import get_tips_repository
+
+    user_id, day = str(uuid.uuid4()), date.today()
+    week_start = day - timedelta(days=6)
+    await _seed_user(user_id, day)
+
+    entries = get_food_entry_repository()
+    summaries = get_daily_summary_repository()
+    tips = get_tips_repository()
+    supabase = get_supabase_client()
+
+    def _sync_reads() -> None:
+        supabase.table('food_entries').select('id, time, meal_type, food_text') \
+            .eq('user_id', user_id).eq('date', str(day)).order('time').execute()
+        supabase.table('daily_gut_summary').select('*').eq('user_id', user_id).eq('date', str(day)).execute()
+        supabase.table('daily_gut_summary').select('*').eq('user_id', user_id) \
+            .gte('date', str(week_start)).lte('date', str(day)).execute()
+        supabase.table('tips_log').select('date, tips').eq('user_id', user_id).eq('date', str(day)).execute()
+
+    def _async_reads() -> List[Awaitable[Any]]:
+        return [
+            entries.list_for_day(user_id, day),
+            summaries.get(user_id, day),
+            summaries.list_range(user_id, week_start, day + timedelta(days=1)),
+            tips.get(user_id, str(day)),
+        ]
+
+    async def _sync(i: int) -> None:
+        # The original routes called the blocking client directly on the event loop
+        _sync_reads()
+
+    async def _sequential(i: int) -> None:
+        for read in _async_reads():
+            await read
+
+    async def _gathered(i: int) -> None:
+        await asyncio.gather(*_async_reads())
+
+    results = {}
+    for concurrency in (1, args.concurrency):
+        results[f'sync client (c={concurrency})'] = await _timed(args.requests, _sync, concurrency)
+        results[f'async sequential (c={concurrency})'] = await _timed(args.requests, _sequential, concurrency)
+        results[f'async gather (c={concurrency})'] = await _timed(args.requests, _gathered, concurrency)
+    return results
+
+
+def _meals(count: int, unknown_ratio: float, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    meals = []
+    for i in range(count):
+        if rng.random() < unknown_ratio:
+            # Distinct per run so neither strategy gets the other's cache hits
+            food = f"{rng.choice(_STYLES)} {rng.choice(_DISHES)} no {seed}-{i}"
+        else:
+            food = rng.choice(KNOWN_FOODS)
+        meals.append({
+            'date': str(date.today() - timedelta(days=i % 7)),
+            'meal_type': rng.choice(['breakfast', 'lunch', 'dinner', 'snack']),
+            'food_text': food,
+        })
+    return meals
+
+
+async def bulk_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    results = {}
+    async with app_client() as client:
+        for label, seed in (('per-entry POST', 1), ('bulk POST', 2)):
+            meals = _meals(args.entries, args.unknown_ratio, seed)
+            headers = {'Authorization': f'Bearer {fakes.token(str(uuid.uuid4()))}'}
+            llm_before, db_before = fakes.state.llm_requests, fakes.state.db_requests
+
+            started = time.perf_counter()
+            if label == 'bulk POST':
+                response = await client.post('/food-entry/bulk', headers=headers, json={'entries': meals})
+                if response.status_code >= 400:
+                    failed = len(meals)
+                else:
+                    failed = sum(item['status'] != 'created' for item in response.json()['results'])
+            else:
+                failed = 0
+                for meal in meals:
+                    response = await client.post('/food-entry', headers=headers, json=meal)
+                    failed += response.status_code >= 400
+            elapsed = time.perf_counter() - started
+
+            results[label] = {
+                'entries': args.entries,
+                'errors': int(failed),
+                'seconds': round(elapsed, 3),
+                'entries_per_s': round(args.entries / elapsed, 2),
+                'llm_requests': fakes.state.llm_requests - llm_before,
+                'db_requests': fakes.state.db_requests - db_before,
+            }
+    return results
+
+
+def seed_history(fakes: FakeServices, user_id: str, start: date, days: int, per_day: int) -> int:
+    """Write a synthetic history straight into the fake tables"""
+    rng = random.Random(user_id)
+    entries = fakes.state.tables.setdefault('food_entries', [])
+    summaries = fakes.state.tables.setdefault('daily_gut_summary', [])
+    for offset in range(days):
+        day = str(start + timedelta(days=offset))
+        for meal in range(per_day):
+            food = rng.choice(KNOWN_FOODS)
+            entries.append({
+                'id': next(fakes.state.ids), 'user_id': user_id, 'date': day, 'time': f'{8 + meal * 4:02d}:00:00',
+                'meal_type': ['breakfast', 'lunch', 'dinner', 'snack'][meal % 4], 'food_text': food,
+                'llm_analysis': fake_analysis(food),
+            })
+        summaries.append({
+            'id': next(fakes.state.ids), 'user_id': user_id, 'date': day, 'gut_score': rng.randint(30, 90),
+            'fiber_grams': round(rng.uniform(5, 35), 1), 'fiber_score': rng.randint(0, 100),
+            'diversity_score': rng.randint(0, 100), 'processed_score': rng.randint(0, 100),
+            'probiotic_score': rng.randint(0, 100), 'digestive_score': rng.randint(40, 100), 'entry_count': per_day,
+        })
+    return days * (per_day + 1)
+
+
+async def export_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    """Server-side export generator over a short and a long range, output discarded"""
+    from app.services.export_services import DATASETS, export_chunks, gzip_chunks
+
+    user_id, end = str(uuid.uuid4()), date.today()
+    days = 365 * args.years
+    rows = seed_history(fakes, user_id, end - timedelta(days=days), days, args.entries_per_day)
+    variants = {
+        'ndjson': ('ndjson', DATASETS, False),
+        'ndjson+gzip': ('ndjson', DATASETS, True),
+        'csv entries': ('csv', ('entries',), False),
+    }
+
+    # Warm up the HTTP pool and imports so the first variant is not charged for them
+    async for _ in export_chunks(user_id, end - timedelta(days=1), end, 'ndjson'):
+        pass
+
+    results: Dict[str, Any] = {'history': {'rows': rows}}
+    for range_label, since in (('30 days', end - timedelta(days=30)), (f'{args.years} years', end - timedelta(days=days))):
+        for label, (format, datasets, compress) in variants.items():
+            chunks = export_chunks(user_id, since, end, format, datasets)
+            if compress:
+                chunks = gzip_chunks(chunks)
+            size = 0
+            tracemalloc.start()
+            started = time.perf_counter()
+            async for chunk in chunks:
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            results[f'{range_label} {label}'] = {
+                'out_mib': round(size / 2 ** 20, 2),
+                'seconds': round(elapsed, 3),
+                'peak_mib': round(peak / 2 ** 20, 2),
+            }
+    return results
+
+
+async def burst_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    """--burst entries stored at once for one day, then each one's summary update run concurrently"""
+    from app.repositories.food_entries import get_food_entry_repository
+    from app.services.event_hub import event_hub
+    from app.services.summary_coordinator import summary_coordinator
+    from app.services.summary_services import apply_summary_delta, verify_daily_summary
+
+    updaters = {
+        'independent updates': lambda user_id, day, analysis: apply_summary_delta(user_id, day, added=[analysis]),
+        'coordinator': lambda user_id, day, analysis: summary_coordinator.submit(user_id, day, added=[analysis]),
+    }
+    results = {}
+    for label, update in updaters.items():
+        user_id, day = str(uuid.uuid4()), date.today()
+        foods = [KNOWN_FOODS[i % len(KNOWN_FOODS)] for i in range(args.burst + 1)]
+        rows = [
+            {'user_id': user_id, 'date': str(day), 'meal_type': 'snack', 'food_text': food, 'llm_analysis': fake_analysis(food)}
+            for food in foods
+        ]
+        # The first entry seeds the stored aggregates, so the burst takes the delta path
+        await get_food_entry_repository().insert_many(rows[:1])
+        await apply_summary_delta(user_id, day, added=[rows[0]['llm_analysis']])
+        await get_food_entry_repository().insert_many(rows[1:])
+
+        writes_before, db_before = event_hub.published, fakes.state.db_requests
+        started = time.perf_counter()
+        await asyncio.gather(*(update(user_id, day, row['llm_analysis']) for row in rows[1:]))
+        elapsed = time.perf_counter() - started
+        results[label] = {
+            'writes': args.burst,
+            'seconds': round(elapsed, 3),
+            'summary_upserts': event_hub.published - writes_before,
+            'db_requests': fakes.state.db_requests - db_before,
+            'consistent': await verify_daily_summary(user_id, day),
+        }
+    return results
+
+
+def _hammer(url: str, token: str, seconds: float, concurrency: int) -> Tuple[List[float], int]:
+    """One load-generator process: `concurrency` keep-alive clients for `seconds`"""
+    async def _run() -> Tuple[List[float], int]:
+        latencies: List[float] = []
+        errors = 0
+        deadline = time.perf_counter() + seconds
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(headers={'Authorization': f'Bearer {token}'}, limits=limits) as client:
+            async def _client() -> None:
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.get(url)
+                        ok = response.status_code == 200
+                    except httpx.HTTPError:
+                        ok = False
+                    if ok:
+                        latencies.append(time.perf_counter() - started)
+                    else:
+                        errors += 1
+
+            await asyncio.gather(*(_client() for _ in range(concurrency)))
+        return latencies, errors
+
+    return asyncio.run(_run())
+
+
+async def workers_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    """GET /daily-summary, a cache hit after the first call, so the server's own CPU is the limit"""
+    user_id, day = str(uuid.uuid4()), date.today()
+    await _seed_user(user_id, day)
+    token = fakes.token(user_id)
+    results = {}
+    for workers in (int(count) for count in args.worker_counts.split(',')):
+        port = _free_port()
+        base = f'http://127.0.0.1:{port}'
+        env = {**os.environ, 'SERVER_WORKERS': str(workers), 'HOST': '127.0.0.1', 'PORT': str(port)}
+        server = subprocess.Popen([sys.executable, 'serve.py'], cwd=SERVER_DIR, env=env)
+        try:
+            async with httpx.AsyncClient() as client:
+                for _ in range(300):
+                    try:
+                        if (await client.get(f'{base}/metrics')).status_code == 200:
+                            break
+                    except httpx.HTTPError:
+                        pass
+                    await asyncio.sleep(0.1)
+                else:
+                    raise RuntimeError(f"serve.py with {workers} workers did not come up")
+
+            url = f'{base}/daily-summary?date={day}'
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(args.generators) as pool:
+                # Short warm-up so every worker has the summary cached
+                await asyncio.gather(*(
+                    loop.run_in_executor(pool, _hammer, url, token, 1.0, args.concurrency)
+                    for _ in range(args.generators)
+                ))
+                runs = await asyncio.gather(*(
+                    loop.run_in_executor(pool, _hammer, url, token, args.duration, args.concurrency)
+                    for _ in range(args.generators)
+                ))
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+        latencies = [latency for run_latencies, _ in runs for latency in run_latencies]
+        results[f'{workers} workers'] = summarize(latencies, args.duration, sum(errors for _, errors in runs))
+    single = next(iter(results.values()))['throughput_rps']
+    for row in results.values():
+        row['scaling'] = round(row['throughput_rps'] / single, 2) if single else 0.0
+    return results
+
+
+def _seed_stale_history(fakes: FakeServices, users: int, days: int, per_day: int, unknown_ratio: float) -> List[Tuple[str, str]]:
+    """Entries analyzed before versioning, drawn from a shared pool of dishes; about 2% still pending"""
+    rng = random.Random(users)
+    dishes = [f"{style} {dish}" for style in _STYLES for dish in _DISHES]
+    entries = fakes.state.tables.setdefault('food_entries', [])
+    user_days = []
+    for u in range(users):
+        user_id = f"00000000-0000-0000-0000-{u:012d}"
+        for offset in range(days):
+            day = str(date.today() - timedelta(days=offset))
+            user_days.append((user_id, day))
+            for meal in range(per_day):
+                food = rng.choice(dishes) if rng.random() < unknown_ratio else rng.choice(KNOWN_FOODS)
+                pending = rng.random() < 0.02
+                entries.append({
+                    'id': next(fakes.state.ids), 'user_id': user_id, 'date': day, 'time': f'{8 + meal * 4:02d}:00:00',
+                    'meal_type': ['breakfast', 'lunch', 'dinner', 'snack'][meal % 4], 'food_text': food,
+                    'llm_analysis': {'analysis_status': 'pending'} if pending else fake_analysis(food),
+                })
+    return user_days
+
+
+class _Interrupted(Exception):
+    pass
+
+
+async def reanalyze_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    The same stale history re-analyzed entry by entry through PUT, and by the
+    job, which is stopped after its first page and resumed from the checkpoint
+    """
+    import tempfile
+    from app.cli import reanalyze
+    from app.repositories.food_entries import get_food_entry_repository
+    from app.services.event_hub import event_hub
+    from app.services.llm_services import analysis_cache, current_analysis_versions
+    from app.services.summary_coordinator import summary_coordinator
+    from app.services.summary_services import update_daily_summary, verify_daily_summary
+
+    repository = get_food_entry_repository()
+    results = {}
+    async with app_client() as client:
+        for label in ('per-entry PUT', 'reanalyze job'):
+            fakes.state.reset()
+            analysis_cache.memory.clear()
+            user_days = _seed_stale_history(
+                fakes, args.reanalyze_users, args.reanalyze_days, args.entries_per_day, args.unknown_ratio
+            )
+            # Summaries as they stood before the re-analysis
+            for user_id, day in user_days:
+                await update_daily_summary(user_id, date.fromisoformat(day))
+            stale = [
+                row for row in fakes.state.tables['food_entries']
+                if row['llm_analysis'].get('analysis_status') != 'pending'
+            ]
+            llm_before, db_before, upserts_before = fakes.state.llm_requests, fakes.state.db_requests, event_hub.published
+
+            started = time.perf_counter()
+            if label == 'per-entry PUT':
+                async def _put(i: int) -> None:
+                    row = stale[i]
+                    response = await client.put(
+                        f"/food-entry/{row['id']}", json={'food_text': row['food_text']},
+                        headers={'Authorization': f"Bearer {fakes.token(row['user_id'])}"},
+                    )
+                    response.raise_for_status()
+
+                timed = await _timed(len(stale), _put, args.reanalyze_concurrency)
+                await summary_coordinator.drain()
+                errors, resumed = timed['errors'], False
+            else:
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = f"{tmp}/reanalyze.sqlite3"
+
+                    class _StopAfterFirstPage(reanalyze.Checkpoint):
+                        def advance(self, after_id: int) -> None:
+                            super().advance(after_id)
+                            raise _Interrupted
+
+                    checkpoint = _StopAfterFirstPage(path, reanalyze.checkpoint_scope())
+                    try:
+                        await reanalyze.reanalyze_entries(
+                            checkpoint, args.reanalyze_page_size, args.reanalyze_concurrency
+                        )
+                        resumed = False
+                    except _Interrupted:
+                        resumed = True
+                    finally:
+                        checkpoint.close()
+                    await reanalyze.run(path, args.reanalyze_page_size, args.reanalyze_concurrency)
+                errors = 0
+            elapsed = time.perf_counter() - started
+
+            left = await repository.count_stale_analyses(current_analysis_versions())
+            pending = len(fakes.state.tables['food_entries']) - len(stale)
+            sample = random.Random(0).sample(user_days, min(20, len(user_days)))
+            consistent = all([await verify_daily_summary(user_id, date.fromisoformat(day)) for user_id, day in sample])
+            results[label] = {
+                'entries': len(stale),
+                'days': len(user_days),
+                'errors': errors,
+                'seconds': round(elapsed, 3),
+                'entries_per_s': round(len(stale) / elapsed, 1),
+                'llm_requests': fakes.state.llm_requests - llm_before,
+                'db_requests': fakes.state.db_requests - db_before,
+                'summary_upserts': event_hub.published - upserts_before,
+                'resumed': resumed,
+                'ok': left == pending and consistent,
+            }
+    return results
+
+
+async def compact_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    A legacy history read through the dual-read path, rewritten by the
+    backfill, then checked: every day must score the same from compact rows
+    """
+    import json
+    from app.cli import compact_analyses
+    from app.repositories.food_entries import get_food_entry_repository
+    from app.services.summary_services import update_daily_summary, verify_daily_summary
+
+    user_days = _seed_stale_history(
+        fakes, args.reanalyze_users, args.reanalyze_days, args.entries_per_day, args.unknown_ratio
+    )
+    entries = fakes.state.tables['food_entries']
+    # Legacy rows as the pre-schema analyses stored them, foods list included
+    for row in entries:
+        if 'analysis_status' not in row['llm_analysis']:
+            row['llm_analysis']['foods'] = [part.strip() for part in row['food_text'].split(' with ')]
+
+    def _column_bytes() -> int:
+        return sum(len(json.dumps(row['llm_analysis'], separators=(',', ':'))) for row in entries)
+
+    for user_id, day in user_days:
+        await update_daily_summary(user_id, date.fromisoformat(day))
+    before = {(row['user_id'], row['date']): row['gut_score'] for row in fakes.state.tables['daily_gut_summary']}
+    bytes_before, db_before = _column_bytes(), fakes.state.db_requests
+
+    started = time.perf_counter()
+    counts = await compact_analyses.run(args.reanalyze_page_size)
+    elapsed = time.perf_counter() - started
+    db_requests = fakes.state.db_requests - db_before
+
+    left = await get_food_entry_repository().count_legacy_analyses()
+    consistent = all([await verify_daily_summary(user_id, date.fromisoformat(day)) for user_id, day in user_days])
+    for user_id, day in user_days:
+        await update_daily_summary(user_id, date.fromisoformat(day))
+    after = {(row['user_id'], row['date']): row['gut_score'] for row in fakes.state.tables['daily_gut_summary']}
+    return {
+        'backfill': {
+            'entries': len(entries),
+            'rewritten': counts['written'],
+            'seconds': round(elapsed, 3),
+            'db_requests': db_requests,
+            'bytes_before': bytes_before,
+            'bytes_after': _column_bytes(),
+            'ok': left == 0 and consistent and before == after,
+        }
+    }
+
+
+def _exact_percentile(values: List[int], value: int) -> float:
+    """Mid-rank percentile, as ScoreSketch.percentile computes it"""
+    below = sum(1 for v in values if v < value)
+    equal = sum(1 for v in values if v == value)
+    return round(100 * (below + equal / 2) / len(values), 1)
+
+
+def _exact_cohorts(fakes: FakeServices) -> Dict[Tuple[str, str], Dict[str, Dict[str, int]]]:
+    """Every user's day scores and floored per-day week averages, keyed by (granularity, period start)"""
+    from app.services.rollup_services import SCORE_METRICS, period_start
+
+    cohorts: Dict[Tuple[str, str], Dict[str, Dict[str, int]]] = {}
+    weeks: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for row in fakes.state.tables.get('daily_gut_summary', []):
+        cohorts.setdefault(('day', row['date']), {})[row['user_id']] = {metric: row[metric] for metric in SCORE_METRICS}
+        week = str(period_start(date.fromisoformat(row['date']), 'week'))
+        weeks.setdefault((week, row['user_id']), []).append(row)
+    for (week, user_id), rows in weeks.items():
+        cohorts.setdefault(('week', week), {})[user_id] = {
+            metric: sum(row[metric] for row in rows) // len(rows) for metric in SCORE_METRICS
+        }
+    return cohorts
+
+
+async def _cohort_error(fakes: FakeServices, stats: Any) -> Dict[str, Any]:
+    """Largest gap between `stats` and the exact percentiles of every user in every period"""
+    from app.services.rollup_services import SCORE_METRICS
+
+    max_error, lookups, wrong_population, seconds = 0.0, 0, 0, 0.0
+    for (granularity, start), users in _exact_cohorts(fakes).items():
+        columns = {metric: [scores[metric] for scores in users.values()] for metric in SCORE_METRICS}
+        for scores in users.values():
+            started = time.perf_counter()
+            population, percentiles = await stats.percentiles(granularity, date.fromisoformat(start), scores)
+            seconds += time.perf_counter() - started
+            lookups += 1
+            wrong_population += population != len(users)
+            for metric in SCORE_METRICS:
+                expected = _exact_percentile(columns[metric], scores[metric])
+                max_error = max(max_error, abs((percentiles[metric] or 0.0) - expected))
+    return {
+        'lookups': lookups,
+        'lookup_us': round(1e6 * seconds / max(lookups, 1), 1),
+        'wrong_population': wrong_population,
+        'max_error': round(max_error, 2),
+    }
+
+
+async def cohort_scenario(fakes: FakeServices, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Daily summaries written and rewritten through two simulated API workers,
+    each with its own sketch shard and room for only a few periods in memory;
+    percentiles checked against exact ones from daily_gut_summary, live,
+    reloaded, rebuilt by app.cli.cohort_stats, after further writes on top of
+    the rebuild, and once both workers stopped and folded their shards
+    """
+    from app.cli import cohort_stats as rebuild
+    from app.services import summary_services
+    from app.services.cohort_stats import BASE_SHARD, CohortStats
+
+    user_days = _seed_stale_history(
+        fakes, args.cohort_users, args.reanalyze_days, args.entries_per_day, args.unknown_ratio
+    )
+    entries = fakes.state.tables['food_entries']
+    rng = random.Random(args.seed)
+    # Few periods in memory, so persisting evicts and rewrites reload them
+    workers = [CohortStats(persist_interval=3600, max_periods=4, min_population=1) for _ in range(2)]
+
+    async def _write(i: int, user_id: str, day: str) -> None:
+        summary_services.cohort_stats = workers[i % 2]
+        await summary_services.update_daily_summary(user_id, date.fromisoformat(day))
+
+    async def _rewrite(count: int) -> None:
+        """Add or drop one entry of a random day, then rewrite its summary"""
+        for i in range(count):
+            user_id, day = rng.choice(user_days)
+            same_day = [row for row in entries if row['user_id'] == user_id and row['date'] == day]
+            if len(same_day) > 1 and rng.random() < 0.4:
+                entries.remove(rng.choice(same_day))
+            else:
+                food = rng.choice(KNOWN_FOODS)
+                entries.append({
+                    'id': next(fakes.state.ids), 'user_id': user_id, 'date': day, 'time': '20:00:00',
+                    'meal_type': 'snack', 'food_text': food, 'llm_analysis': fake_analysis(food),
+                })
+            await _write(i, user_id, day)
+
+    async def _persist_all() -> int:
+        db_before = fakes.state.db_requests
+        for worker in workers:
+            await worker.persist()
+        return fakes.state.db_requests - db_before
+
+    original = summary_services.cohort_stats
+    try:
+        started = time.perf_counter()
+        for i, (user_id, day) in enumerate(user_days):
+            await _write(i, user_id, day)
+        await _rewrite(args.cohort_rewrites)
+        write_seconds = time.perf_counter() - started
+        persist_requests = await _persist_all()
+
+        results = {}
+        # Worker 1 reloaded after worker 0 persisted, and holds its own changes
+        results['live'] = await _cohort_error(fakes, workers[1])
+        results['reloaded'] = await _cohort_error(fakes, CohortStats(3600, 1000, 1))
+
+        db_before = fakes.state.db_requests
+        await rebuild.run(chunk_size=args.reanalyze_page_size)
+        rebuild_requests = fakes.state.db_requests - db_before
+        results['rebuilt'] = await _cohort_error(fakes, CohortStats(3600, 1000, 1))
+
+        # The workers still hold periods from the old epoch
+        await _rewrite(args.cohort_rewrites)
+        await _persist_all()
+        results['after rebuild'] = await _cohort_error(fakes, CohortStats(3600, 1000, 1))
+
+        for worker in workers:
+            await worker.stop()
+        results['folded'] = await _cohort_error(fakes, CohortStats(3600, 1000, 1))
+        results['folded']['shards'] = sum(
+            row['shard'] != BASE_SHARD for row in fakes.state.tables['cohort_sketches']
+        )
+    finally:
+        summary_services.cohort_stats = original
+
+    results['live'].update({'writes': len(user_days) + args.cohort_rewrites, 'seconds': round(write_seconds, 3), 'db_requests': persist_requests})
+    results['rebuilt']['db_requests'] = rebuild_requests
+    for row in results.values():
+        row['ok'] = row['max_error'] <= args.cohort_max_error and row['wrong_population'] == 0 and not row.get('shards')
+    return results
+
+
+RUNNERS = {
+    'auth': auth_scenario,
+    'repository': repository_scenario,
+    'bulk': bulk_scenario,
+    'export': export_scenario,
+    'burst': burst_scenario,
+    'workers': workers_scenario,
+    'reanalyze': reanalyze_scenario,
+    'compact': compact_scenario,
+    'cohort': cohort_scenario,
+}
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    config = FakeConfig(db_latency_ms=args.db_latency_ms, llm_latency_ms=args.llm_latency_ms, seed=args.seed)
+    names = SCENARIOS if args.scenario == 'all' else (args.scenario,)
+    results = {}
+    with FakeServices(config) as fakes:
+        configure(fakes, {'LEXICON_ENABLED': not args.no_lexicon})
+        for name in names:
+            fakes.state.reset()
+            results[name] = await RUNNERS[name](fakes, args)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenario', choices=SCENARIOS + ('all',))
+    parser.add_argument('--requests', type=int, default=200, help="Calls per variant (auth, repository)")
+    parser.add_argument('--concurrency', type=int, default=20, help="Second, concurrent pass (auth, repository); clients per generator (workers)")
+    parser.add_argument('--entries', type=int, default=100, help="Meals to log (bulk)")
+    parser.add_argument('--unknown-ratio', type=float, default=0.5, help="Share of meals the lexicon cannot answer (bulk, reanalyze)")
+    parser.add_argument('--years', type=int, default=3, help="History length (export)")
+    parser.add_argument('--entries-per-day', type=int, default=4, help="History density (export, reanalyze)")
+    parser.add_argument('--burst', type=int, default=20, help="Concurrent writes to one day (burst)")
+    parser.add_argument('--worker-counts', default='1,2,4', help="Server worker counts to compare (workers)")
+    parser.add_argument('--generators', type=int, default=os.cpu_count() or 1, help="Load-generator processes (workers)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds of load per worker count (workers)")
+    parser.add_argument('--reanalyze-users', type=int, default=20, help="Users with a stale history (reanalyze)")
+    parser.add_argument('--reanalyze-days', type=int, default=14, help="Days of history per user (reanalyze, cohort)")
+    parser.add_argument('--reanalyze-page-size', type=int, default=100, help="Job page size (reanalyze, cohort rebuild)")
+    parser.add_argument('--reanalyze-concurrency', type=int, default=4, help="PUTs or analysis batches in flight (reanalyze)")
+    parser.add_argument('--cohort-users', type=int, default=40, help="Users with a history (cohort)")
+    parser.add_argument('--cohort-rewrites', type=int, default=300, help="Summary rewrites per phase (cohort)")
+    parser.add_argument('--cohort-max-error', type=float, default=0.05, help="Allowed percentile points off (cohort)")
+    parser.add_argument('--no-lexicon', action='store_true', help="Run with LEXICON_ENABLED=false")
+    parser.add_argument('--db-latency-ms', type=float, default=20.0)
+    parser.add_argument('--llm-latency-ms', type=float, default=400.0)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help="Result file (default benchmarks/results/...)")
+    args = parser.parse_args()
+
+    results = asyncio.run(_main(args))
+    for name, rows in results.items():
+        print(f"\n== {name}")
+        if name == 'bulk':
+            print_table(rows, ['entries', 'errors', 'seconds', 'entries_per_s', 'llm_requests', 'db_requests'])
+        elif name == 'export':
+            print_table(rows, ['rows', 'out_mib', 'seconds', 'peak_mib'])
+        elif name == 'workers':
+            print_table(rows, ['count', 'errors', 'throughput_rps', 'p50_ms', 'p99_ms', 'scaling'])
+        elif name == 'burst':
+            print_table(rows, ['writes', 'seconds', 'summary_upserts', 'db_requests', 'consistent'])
+        elif name == 'reanalyze':
+            print_table(rows, ['entries', 'days', 'errors', 'seconds', 'entries_per_s', 'llm_requests', 'db_requests', 'summary_upserts', 'ok'])
+        elif name == 'compact':
+            print_table(rows, ['entries', 'rewritten', 'seconds', 'db_requests', 'bytes_before', 'bytes_after', 'ok'])
+        elif name == 'cohort':
+            print_table(rows, ['writes', 'seconds', 'db_requests', 'lookups', 'lookup_us', 'wrong_population', 'max_error', 'shards', 'ok'])
+        else:
+            print_table(rows, ['count', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'])
+    print(f"Saved {save_results('scenarios_' + args.scenario, results, vars(args), args.output)}")
+    if 'burst' in results and not all(row['consistent'] for row in results['burst'].values()):
+        sys.exit("Summary updates lost a write")
+    if 'reanalyze' in results and not results['reanalyze']['reanalyze job']['ok']:
+        sys.exit("Re-analysis left stale entries or inconsistent summaries")
+    if 'compact' in results and not results['compact']['backfill']['ok']:
+        sys.exit("Compact backfill left legacy entries or changed a summary")
+    if 'cohort' in results and not all(row['ok'] for row in results['cohort'].values()):
+        sys.exit("Cohort percentiles drifted from the exact ones")
+
+
+if __name__ == '__main__':
+    main()
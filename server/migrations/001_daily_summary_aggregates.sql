@@ -0,0 +1,19 @@
+-- Running per-day aggregates for incremental summary maintenance.
+-- Rows without aggregates are rebuilt from food_entries on their next write.
+ALTER TABLE daily_gut_summary
+    ADD COLUMN IF NOT EXISTS aggregates jsonb,
+    ADD COLUMN IF NOT EXISTS entry_count integer NOT NULL DEFAULT 0;
+
+-- Status is read from entry_count, so count the existing days once. Safe to
+-- re-run: only rows still without aggregates are touched.
+UPDATE daily_gut_summary AS s
+SET entry_count = e.entry_count
+FROM (
+    SELECT user_id, date, count(*)::integer AS entry_count
+    FROM food_entries
+    GROUP BY user_id, date
+) AS e
+WHERE s.aggregates IS NULL
+    AND s.user_id = e.user_id
+    AND s.date = e.date
+    AND s.entry_count IS DISTINCT FROM e.entry_count;
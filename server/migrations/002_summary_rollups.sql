@@ -0,0 +1,22 @@
+-- Week / month / year rollups of daily_gut_summary, maintained incrementally
+-- on every daily summary write. Periods without a row are rebuilt from the
+-- daily rows on their next write; backfill with `python -m app.cli.rollups`.
+CREATE TABLE IF NOT EXISTS summary_rollups (
+    user_id uuid NOT NULL,
+    granularity text NOT NULL CHECK (granularity IN ('week', 'month', 'year')),
+    period_start date NOT NULL,
+    day_count integer NOT NULL DEFAULT 0,
+    gut_score_sum integer NOT NULL DEFAULT 0,
+    fiber_grams_sum double precision NOT NULL DEFAULT 0,
+    fiber_score_sum integer NOT NULL DEFAULT 0,
+    diversity_score_sum integer NOT NULL DEFAULT 0,
+    processed_score_sum integer NOT NULL DEFAULT 0,
+    probiotic_score_sum integer NOT NULL DEFAULT 0,
+    digestive_score_sum integer NOT NULL DEFAULT 0,
+    best_date date,
+    best_score integer,
+    worst_date date,
+    worst_score integer,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, granularity, period_start)
+);
@@ -0,0 +1,4 @@
+-- Scores (and tips prompt version) a tips_log row was generated for. While
+-- the day's scores are unchanged, /tips/generate returns the stored tips
+-- without calling the LLM. NULL (older rows, fallback tips) always regenerates.
+ALTER TABLE tips_log ADD COLUMN IF NOT EXISTS score_key text;
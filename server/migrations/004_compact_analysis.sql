@@ -0,0 +1,8 @@
+-- Compact food_entries.llm_analysis (app/models/stored_analysis.py). Reads
+-- accept both formats; once every worker does, set ANALYSIS_COMPACT_WRITES
+-- so new writes use it, then rewrite older rows with
+-- `python -m app.cli.compact_analyses`. The partial index covers that scan
+-- and can be dropped once it finds nothing left.
+CREATE INDEX IF NOT EXISTS food_entries_legacy_analysis_idx ON food_entries (id)
+    WHERE llm_analysis->>'v' IS NULL AND llm_analysis->>'analysis_status' IS NULL;
+
@@ -0,0 +1,16 @@
+-- Population score distributions behind GET /cohort/percentiles, one row
+-- per (granularity, period, shard). Each API process writes only its own
+-- shard (its changes since the current epoch) and folds it into the 'base'
+-- shard on shutdown; `python -m app.cli.cohort_stats` rewrites 'base' from
+-- daily_gut_summary, starts a new epoch and deletes the shards of older
+-- epochs. counts maps each score to its
+-- 101 per-value counts (0-100).
+CREATE TABLE IF NOT EXISTS cohort_sketches (
+    granularity text NOT NULL CHECK (granularity IN ('day', 'week')),
+    period_start date NOT NULL,
+    shard text NOT NULL,
+    epoch text NOT NULL DEFAULT '',
+    counts jsonb NOT NULL,
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (granularity, period_start, shard)
+);
@@ -0,0 +1,16 @@
+-- Idempotency-Key claims and stored responses of food-entry writes, shared
+-- by every API process. A request claims (user_id, key) by inserting its
+-- row; status_code and body stay NULL until the handler finishes, and the
+-- row is deleted again if it fails. Rows older than IDEMPOTENCY_TTL_SECONDS
+-- are ignored and pruned by the API processes.
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id uuid NOT NULL,
+    key text NOT NULL,
+    fingerprint text NOT NULL,
+    status_code integer,
+    body jsonb,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, key)
+);
+
+CREATE INDEX IF NOT EXISTS idempotency_keys_created_at ON idempotency_keys (created_at);
@@ -0,0 +1,47 @@
+"""
+Production entry point
+
+Runs SERVER_WORKERS uvicorn worker processes (one per core by default)
+with uvloop and httptools, tuned from the SERVER_* settings. On SIGTERM
+each worker stops accepting connections, lets in-flight requests finish
+and then drains queued background analyses, all within
+SERVER_GRACEFUL_SHUTDOWN_SECONDS. Open /events streams never finish on
+their own, so they are cut when the grace period ends and clients
+reconnect. /events and the summary cache keep per-process state, so they
+only run with SERVER_WORKERS=1 (or shared backends). Use run.py for
+development.
+
+Usage:
+    python serve.py
+"""
+
+import importlib.util
+
+import uvicorn
+
+from app.core.config import server_workers, settings
+
+
+def _implementation(name: str, module: str) -> str:
+    """The configured loop/protocol, or uvicorn's default when it is not installed"""
+    if name == module and importlib.util.find_spec(module) is None:
+        print(f"{module} is not installed, using uvicorn's default")
+        return "auto"
+    return name
+
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=server_workers(),
+        loop=_implementation(settings.SERVER_LOOP, "uvloop"),
+        http=_implementation(settings.SERVER_HTTP, "httptools"),
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_SECONDS,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        access_log=settings.SERVER_ACCESS_LOG,
+        proxy_headers=True,
+    )
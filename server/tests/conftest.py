@@ -0,0 +1,25 @@
+"""
+The API runs in-process against benchmarks/fake_services.py
+
+The fakes start when this module is imported, so the settings pick up
+their URL before any test imports `app`.
+"""
+
+import pytest
+
+from benchmarks.fake_services import FakeConfig, FakeServices
+from benchmarks.harness import configure
+
+_fakes = FakeServices(FakeConfig()).start()
+configure(_fakes)
+
+
+def pytest_unconfigure(config):
+    _fakes.stop()
+
+
+@pytest.fixture
+def fakes() -> FakeServices:
+    """The fake services with empty tables"""
+    _fakes.state.reset()
+    return _fakes
@@ -0,0 +1,46 @@
+import uuid
+from datetime import date
+
+from benchmarks.harness import app_client
+
+
+async def test_bulk_import_reports_every_entry(fakes):
+    headers = {'Authorization': f"Bearer {fakes.token(str(uuid.uuid4()))}"}
+    today = str(date.today())
+    async with app_client() as client:
+        response = await client.post('/food-entry/bulk', headers=headers, json={'entries': [
+            {'date': today, 'meal_type': 'breakfast', 'food_text': 'oatmeal with berries'},
+            {'date': today, 'meal_type': 'dinner'},
+            {'date': today, 'meal_type': 'lunch', 'food_text': 'kimchi'},
+        ]})
+    body = response.json()
+    assert response.status_code == 200
+    assert [result['status'] for result in body['results']] == ['created', 'failed', 'created']
+    assert [summary['date'] for summary in body['summaries']] == [today]
+
+
+async def test_short_insert_result_leaves_the_batch_unconfirmed(fakes, monkeypatch):
+    from app.repositories.food_entries import FoodEntryRepository
+
+    insert_many = FoodEntryRepository.insert_many
+
+    async def _drop_last_row(self, rows, columns='id'):
+        return (await insert_many(self, rows, columns))[:-1]
+
+    monkeypatch.setattr(FoodEntryRepository, 'insert_many', _drop_last_row)
+    headers = {'Authorization': f"Bearer {fakes.token(str(uuid.uuid4()))}"}
+    today = str(date.today())
+    async with app_client() as client:
+        response = await client.post('/food-entry/bulk', headers=headers, json={'entries': [
+            {'date': today, 'meal_type': 'breakfast', 'food_text': 'oatmeal with berries'},
+            {'date': today, 'meal_type': 'lunch', 'food_text': 'kimchi'},
+        ]})
+    body = response.json()
+    assert response.status_code == 200
+    # Both rows were stored, so neither may be reported as safe to retry
+    assert len(fakes.state.tables['food_entries']) == 2
+    assert all(result is not None and result['status'] == 'unconfirmed' for result in body['results'])
+    assert (body['created'], body['unconfirmed'], body['failed']) == (0, 2, 0)
+    # The day is recounted from what was actually stored
+    stored = [row for row in fakes.state.tables['daily_gut_summary'] if row['date'] == today]
+    assert stored[0]['entry_count'] == 2
@@ -0,0 +1,112 @@
+import random
+from datetime import date
+
+import pytest
+
+from app.services.cohort_stats import BASE_SHARD, CohortStats, ScoreSketch
+from app.services.rollup_services import SCORE_METRICS
+
+DAY = date(2026, 3, 2)
+OTHER_DAYS = [date(2026, 3, 3), date(2026, 3, 4)]
+
+
+def _exact_percentile(values, value) -> float:
+    """Mid-rank percentile straight from the population"""
+    below = sum(1 for v in values if v < value)
+    equal = sum(1 for v in values if v == value)
+    return round(100 * (below + equal / 2) / len(values), 1)
+
+
+def _sketch(values):
+    sketch = ScoreSketch()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def _scores(rng: random.Random) -> dict:
+    return {metric: rng.randint(0, 100) for metric in SCORE_METRICS}
+
+
+def _stats(max_periods: int = 1000) -> CohortStats:
+    return CohortStats(persist_interval=3600, max_periods=max_periods, min_population=1)
+
+
+async def _assert_exact(stats: CohortStats, population: dict) -> None:
+    for scores in population.values():
+        total, percentiles = await stats.percentiles('day', DAY, scores)
+        assert total == len(population)
+        for metric in SCORE_METRICS:
+            values = [user[metric] for user in population.values()]
+            assert percentiles[metric] == _exact_percentile(values, scores[metric])
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_sketch_percentiles_are_exact_through_merge_and_removal(seed):
+    rng = random.Random(seed)
+    values = [rng.choice([rng.randint(0, 100), rng.randint(40, 60)]) for _ in range(rng.randint(1, 300))]
+    half = len(values) // 2
+    removed = rng.sample(values, len(values) // 3)
+    kept = list(values)
+    for value in removed:
+        kept.remove(value)
+
+    merged = _sketch(values[:half]).merge(_sketch(values[half:]))
+    shrunk = _sketch(values)
+    for value in removed:
+        shrunk.add(value, -1)
+
+    for score in range(101):
+        assert merged.percentile(score) == _exact_percentile(values, score)
+        if kept:
+            assert shrunk.percentile(score) == _exact_percentile(kept, score)
+    assert merged.counts == _sketch(values).counts
+    assert shrunk.counts == _sketch(kept).counts
+
+
+async def test_evicted_period_keeps_its_counts(fakes):
+    rng = random.Random(0)
+    worker = _stats(max_periods=1)
+    population = {user: _scores(rng) for user in range(30)}
+    for scores in population.values():
+        worker.observe('day', DAY, None, scores)
+    await worker.persist()
+    # Other days push DAY out of memory
+    for day in OTHER_DAYS:
+        worker.observe('day', day, None, _scores(rng))
+        await worker.persist()
+    assert ('day', str(DAY)) not in worker._periods
+
+    # Edits after the reload move users out of the counts persisted before
+    for user in range(10):
+        current = _scores(rng)
+        worker.observe('day', DAY, population[user], current)
+        population[user] = current
+    await worker.persist()
+
+    stored = [row for row in fakes.state.tables['cohort_sketches'] if row['period_start'] == str(DAY)]
+    assert all(count >= 0 for row in stored for counts in row['counts'].values() for count in counts)
+    await _assert_exact(worker, population)
+    await _assert_exact(_stats(), population)
+
+
+async def test_stopped_workers_fold_their_shards_into_the_base(fakes):
+    rng = random.Random(1)
+    workers = [_stats(), _stats()]
+    population = {}
+    for user in range(40):
+        population[user] = _scores(rng)
+        workers[user % 2].observe('day', DAY, None, population[user])
+    for worker in workers:
+        await worker.persist()
+
+    await workers[0].stop()
+    shards = {row['shard'] for row in fakes.state.tables['cohort_sketches']}
+    assert shards == {BASE_SHARD, workers[1].shard}
+    # The running worker still counts everyone once after reloading
+    await workers[1]._ensure_loaded(('day', str(DAY)), 0)
+    await _assert_exact(workers[1], population)
+
+    await workers[1].stop()
+    assert {row['shard'] for row in fakes.state.tables['cohort_sketches']} == {BASE_SHARD}
+    await _assert_exact(_stats(), population)
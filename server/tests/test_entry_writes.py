@@ -0,0 +1,57 @@
+import asyncio
+import uuid
+from datetime import date
+
+import pytest
+
+from benchmarks.harness import app_client
+
+# kimchi twice: removing one of them twice leaves no negative counter, so
+# aggregates_are_valid cannot catch a double-applied delta
+FOODS = ['kimchi', 'kimchi', 'oatmeal with berries', 'lentil soup']
+
+
+async def _day_with_entries(client, headers: dict) -> list:
+    today = str(date.today())
+    ids = []
+    for food in FOODS:
+        response = await client.post(
+            '/food-entry', headers=headers, json={'date': today, 'meal_type': 'lunch', 'food_text': food}
+        )
+        ids.append(int(response.json()['entry_id']))
+    return ids
+
+
+def _entry_count(fakes, user_id: str) -> int:
+    return next(row for row in fakes.state.tables['daily_gut_summary'] if row['user_id'] == user_id)['entry_count']
+
+
+async def test_concurrent_duplicate_deletes_remove_the_entry_once(fakes):
+    from app.services.summary_services import verify_daily_summary
+
+    user_id = str(uuid.uuid4())
+    headers = {'Authorization': f"Bearer {fakes.token(user_id)}"}
+    async with app_client() as client:
+        ids = await _day_with_entries(client, headers)
+        responses = await asyncio.gather(*(client.delete(f'/food-entry/{ids[0]}', headers=headers) for _ in range(2)))
+
+    assert sorted(response.status_code for response in responses) == [200, 404]
+    assert _entry_count(fakes, user_id) == len(FOODS) - 1
+    assert await verify_daily_summary(user_id, date.today())
+
+
+@pytest.mark.parametrize('texts', [['kefir', 'kefir'], ['kefir', 'white bread']])
+async def test_concurrent_updates_of_one_entry_keep_the_summary_exact(fakes, texts):
+    from app.services.summary_services import verify_daily_summary
+
+    user_id = str(uuid.uuid4())
+    headers = {'Authorization': f"Bearer {fakes.token(user_id)}"}
+    async with app_client() as client:
+        ids = await _day_with_entries(client, headers)
+        responses = await asyncio.gather(*(
+            client.put(f'/food-entry/{ids[0]}', headers=headers, json={'food_text': text}) for text in texts
+        ))
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert _entry_count(fakes, user_id) == len(FOODS)
+    assert await verify_daily_summary(user_id, date.today())
@@ -0,0 +1,70 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+
+async def test_streams_hold_a_slot_only_once_their_body_starts():
+    from app.api.routes.events import stream_events
+    from app.core.config import settings
+    from app.services.event_hub import event_hub
+
+    user_id = str(uuid.uuid4())
+    # Clients that disconnect before the body starts never run the generator
+    for _ in range(settings.EVENTS_MAX_STREAMS_PER_USER + 1):
+        await stream_events(user_id)
+    assert user_id not in event_hub._subscribers
+
+    streams = [(await stream_events(user_id)).body_iterator for _ in range(settings.EVENTS_MAX_STREAMS_PER_USER)]
+    for stream in streams:
+        assert 'connected' in await stream.__anext__()
+    with pytest.raises(HTTPException) as rejected:
+        await stream_events(user_id)
+    assert rejected.value.status_code == 429
+
+    for stream in streams:
+        await stream.aclose()
+    assert user_id not in event_hub._subscribers
+
+
+async def test_stream_that_loses_the_last_slot_ends():
+    from app.api.routes.events import stream_events
+    from app.core.config import settings
+    from app.services.event_hub import event_hub
+
+    user_id = str(uuid.uuid4())
+    late = (await stream_events(user_id)).body_iterator
+    subscriptions = [event_hub.subscribe(user_id) for _ in range(settings.EVENTS_MAX_STREAMS_PER_USER)]
+    assert 'too many streams' in await late.__anext__()
+    with pytest.raises(StopAsyncIteration):
+        await late.__anext__()
+
+    for subscription in subscriptions:
+        event_hub.unsubscribe(subscription)
+
+
+async def test_events_are_unavailable_without_a_shared_backend(monkeypatch):
+    from app.api.routes.events import stream_events
+    from app.services.event_hub import event_hub
+
+    monkeypatch.setattr(event_hub, 'enabled', False)
+    with pytest.raises(HTTPException) as unavailable:
+        await stream_events(str(uuid.uuid4()))
+    assert unavailable.value.status_code == 503
+
+
+class _SharedBackend:
+    shared = True
+
+
+@pytest.mark.parametrize('workers, shared, enabled', [
+    (1, False, True),
+    (4, False, False),
+    (4, True, True),
+])
+def test_events_need_one_worker_or_a_shared_backend(monkeypatch, workers, shared, enabled):
+    from app.core.config import settings
+    from app.services.event_hub import LocalBackend, events_enabled
+
+    monkeypatch.setattr(settings, 'SERVER_WORKERS', workers)
+    assert events_enabled(_SharedBackend() if shared else LocalBackend()) == enabled
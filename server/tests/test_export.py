@@ -0,0 +1,76 @@
+import gc
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.harness import app_client
+from benchmarks.scenarios import seed_history
+
+
+@pytest.mark.parametrize('accept_encoding, gzipped', [
+    ('gzip', True),
+    ('deflate, gzip;q=0.5', True),
+    ('*', True),
+    ('gzip;q=0', False),
+    ('gzip;q=0.0, identity', False),
+    ('identity', False),
+    ('*;q=0', False),
+    ('gzip;q=0, *', False),
+    ('', False),
+])
+async def test_gzip_follows_accept_encoding_q_values(fakes, accept_encoding, gzipped):
+    today = date.today()
+    headers = {'Authorization': f"Bearer {fakes.token(str(uuid.uuid4()))}", 'Accept-Encoding': accept_encoding}
+    async with app_client() as client:
+        response = await client.get(
+            '/export', params={'from': str(today - timedelta(days=1)), 'to': str(today)}, headers=headers
+        )
+    assert response.status_code == 200
+    assert (response.headers.get('content-encoding') == 'gzip') is gzipped
+
+
+# Rows per page, small enough that both exports below span many pages
+EXPORT_TEST_PAGE_SIZE = 250
+# A three-year export may peak this much above a one-year one. Streaming
+# levels off once a few pages of garbage await collection; holding the
+# whole export would add two more years of rows and land far above it
+EXPORT_PEAK_MARGIN = 1.25
+
+
+async def _export_peak(user_id, start, end, format, datasets, compress):
+    """Bytes exported and the traced peak while streaming them"""
+    from app.services.export_services import export_chunks, gzip_chunks
+
+    chunks = export_chunks(user_id, start, end, format, datasets, page_size=EXPORT_TEST_PAGE_SIZE)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    size = 0
+    gc.collect()
+    tracemalloc.start()
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return size, peak
+
+
+@pytest.mark.parametrize('format, datasets, compress', [
+    ('ndjson', ('entries', 'summaries'), False),
+    ('ndjson', ('entries', 'summaries'), True),
+    ('csv', ('entries',), False),
+])
+async def test_export_memory_does_not_grow_with_the_range(fakes, format, datasets, compress):
+    user_id, end = str(uuid.uuid4()), date.today()
+    days = 3 * 365
+    seed_history(fakes, user_id, end - timedelta(days=days), days, per_day=4)
+    # Warm the HTTP pool and imports so they are not charged to either export
+    await _export_peak(user_id, end - timedelta(days=1), end, format, datasets, compress)
+
+    short_size, short_peak = await _export_peak(user_id, end - timedelta(days=365), end, format, datasets, compress)
+    long_size, long_peak = await _export_peak(user_id, end - timedelta(days=days), end, format, datasets, compress)
+    assert long_size > 2.5 * short_size
+    assert long_peak <= short_peak * EXPORT_PEAK_MARGIN, (short_peak, long_peak)
@@ -0,0 +1,137 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi import Response
+
+from benchmarks.harness import app_client
+
+
+def _store():
+    """A store as one API process has it; several share the fake database"""
+    from app.services.idempotency import IdempotencyStore
+
+    return IdempotencyStore(ttl=3600, lease=60, poll_interval=0.01)
+
+
+def _handler(calls: list, delay: float = 0):
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return {'id': len(calls)}
+    return handler
+
+
+async def test_retry_on_another_process_replays(fakes):
+    user_id, calls = str(uuid.uuid4()), []
+    first, retry = Response(), Response()
+
+    assert await _store().run(user_id, 'k', 'fp', first, _handler(calls)) == {'id': 1}
+    assert await _store().run(user_id, 'k', 'fp', retry, _handler(calls)) == {'id': 1}
+    assert len(calls) == 1
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+
+
+async def _until(condition, timeout: float = 10.0) -> None:
+    """Wait for the requests under test to reach a state, however slow the machine"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.005)
+
+
+async def test_concurrent_duplicates_across_processes_run_once(fakes):
+    user_id, calls = str(uuid.uuid4()), []
+    stores = [_store() for _ in range(3)]
+    # The original finishes only once every duplicate is waiting on it
+    release = asyncio.Event()
+
+    async def handler():
+        calls.append(1)
+        await release.wait()
+        return {'id': len(calls)}
+
+    async def release_when_all_wait():
+        await _until(lambda: sum(store.waited for store in stores) == 5)
+        release.set()
+
+    bodies, _ = await asyncio.gather(
+        asyncio.gather(*(store.run(user_id, 'k', 'fp', Response(), handler) for store in stores for _ in range(2))),
+        release_when_all_wait(),
+    )
+    assert len(calls) == 1
+    assert bodies == [{'id': 1}] * 6
+    assert sum(store.waited for store in stores) == 5
+
+
+async def test_key_reused_for_another_request_is_rejected(fakes):
+    from app.services.idempotency import IdempotencyKeyReused
+
+    user_id = str(uuid.uuid4())
+    await _store().run(user_id, 'k', 'fp', Response(), _handler([]))
+    with pytest.raises(IdempotencyKeyReused):
+        await _store().run(user_id, 'k', 'other', Response(), _handler([]))
+
+
+async def test_failed_handler_releases_the_key(fakes):
+    user_id, calls = str(uuid.uuid4()), []
+
+    async def fail():
+        raise RuntimeError("Gemini unavailable")
+
+    with pytest.raises(RuntimeError):
+        await _store().run(user_id, 'k', 'fp', Response(), fail)
+    assert await _store().run(user_id, 'k', 'fp', Response(), _handler(calls)) == {'id': 1}
+    assert fakes.state.tables['idempotency_keys'][0]['status_code'] == 200
+
+
+def _stored_key(user_id: str, age: float, status_code=None) -> dict:
+    return {
+        'user_id': user_id, 'key': 'k', 'fingerprint': 'fp', 'status_code': status_code, 'body': {'id': 'old'},
+        'created_at': (datetime.utcnow() - timedelta(seconds=age)).isoformat(),
+    }
+
+
+@pytest.mark.parametrize('stored', [
+    pytest.param({'age': 120}, id='abandoned claim'),
+    pytest.param({'age': 7200, 'status_code': 200}, id='expired response'),
+])
+async def test_abandoned_and_expired_keys_are_taken_over(fakes, stored):
+    user_id, calls = str(uuid.uuid4()), []
+    fakes.state.tables['idempotency_keys'] = [_stored_key(user_id, **stored)]
+
+    assert await _store().run(user_id, 'k', 'fp', Response(), _handler(calls)) == {'id': 1}
+    assert len(fakes.state.tables['idempotency_keys']) == 1
+
+
+async def test_live_claim_on_another_process_is_waited_for(fakes):
+    user_id, calls = str(uuid.uuid4()), []
+    fakes.state.tables['idempotency_keys'] = [_stored_key(user_id, age=30)]
+    store = _store()
+
+    response = Response()
+    duplicate = asyncio.create_task(store.run(user_id, 'k', 'fp', response, _handler(calls)))
+    await _until(lambda: store.waited == 1)
+    await asyncio.sleep(0.05)
+    assert not duplicate.done()
+
+    # The other process completes the original
+    fakes.state.tables['idempotency_keys'][0].update(status_code=201, body={'id': 'original'})
+    assert await duplicate == {'id': 'original'}
+    assert response.status_code == 201
+    assert not calls
+
+
+async def test_retried_create_inserts_one_entry(fakes):
+    user_id = str(uuid.uuid4())
+    headers = {'Authorization': f"Bearer {fakes.token(user_id)}", 'Idempotency-Key': 'retry-1'}
+    entry = {'date': str(date.today()), 'meal_type': 'lunch', 'food_text': 'kimchi'}
+    async with app_client() as client:
+        first = await client.post('/food-entry', headers=headers, json=entry)
+        retry = await client.post('/food-entry', headers=headers, json=entry)
+        reused = await client.post('/food-entry', headers=headers, json={**entry, 'food_text': 'oatmeal'})
+    assert retry.json() == first.json()
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert reused.status_code == 422
+    assert len([row for row in fakes.state.tables['food_entries'] if row['user_id'] == user_id]) == 1
@@ -0,0 +1,11 @@
+from benchmarks.import_time import DEFERRED_MODULES, measure
+
+# Same budget as `python -m benchmarks.import_time`
+IMPORT_BUDGET_MS = 1000.0
+
+
+def test_app_imports_within_budget_without_deferred_sdks():
+    result = measure('app.main', runs=3)
+
+    assert result['eager_deferred'] == [], f"meant to load on first use: {DEFERRED_MODULES}"
+    assert result['total_ms'] <= IMPORT_BUDGET_MS
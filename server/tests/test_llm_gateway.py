@@ -0,0 +1,42 @@
+import asyncio
+import time
+
+import pytest
+
+
+async def test_queued_callers_never_wait_past_their_timeout():
+    from app.services.llm_gateway import RateLimitTimeout, TokenBucket
+
+    bucket, timeout = TokenBucket(rate=2, capacity=1), 1.2
+
+    async def _acquire():
+        started = time.monotonic()
+        try:
+            await bucket.acquire(timeout)
+            admitted = True
+        except RateLimitTimeout:
+            admitted = False
+        return admitted, time.monotonic() - started
+
+    results = await asyncio.gather(*(_acquire() for _ in range(10)))
+    # One token now, then one every 500 ms: the 0, 500 and 1000 ms slots
+    assert [admitted for admitted, _ in results] == [True] * 3 + [False] * 7
+    assert max(elapsed for _, elapsed in results) <= timeout + 0.25
+    assert max(elapsed for admitted, elapsed in results if not admitted) < 0.25
+
+
+async def test_cancelled_caller_returns_its_token():
+    from app.services.llm_gateway import TokenBucket
+
+    bucket = TokenBucket(rate=2, capacity=1)
+    await bucket.acquire(1.0)
+    waiting = asyncio.create_task(bucket.acquire(1.0))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    started = time.monotonic()
+    await bucket.acquire(1.0)
+    # Next in line for the first refilled token, not the second
+    assert time.monotonic() - started < 0.75
@@ -0,0 +1,53 @@
+import uuid
+from datetime import date
+
+from benchmarks.fake_services import fake_analysis
+
+
+def test_lexicon_version_follows_the_csv(tmp_path):
+    from app.services.food_lexicon import DEFAULT_LEXICON_PATH, load_lexicon
+
+    edited = tmp_path / 'food_lexicon.csv'
+    edited.write_text(DEFAULT_LEXICON_PATH.read_text(encoding='utf-8') + 'tempeh,5.0,protein|fermented,0,1,moderate\n')
+
+    assert load_lexicon().version == load_lexicon(str(DEFAULT_LEXICON_PATH)).version
+    assert load_lexicon(str(edited)).version != load_lexicon().version
+
+
+def test_lexicon_results_carry_the_lexicon_version():
+    from app.services.food_lexicon import get_food_lexicon
+    from app.services.llm_services import ANALYSIS_VERSION, lexicon_analysis
+
+    analysis = lexicon_analysis('kimchi')
+    assert analysis['analysis_version'] == get_food_lexicon().version != ANALYSIS_VERSION
+
+
+async def test_analyses_from_an_older_lexicon_are_reanalyzed(fakes, tmp_path):
+    from app.cli import reanalyze
+    from app.repositories.food_entries import get_food_entry_repository
+    from app.services.food_lexicon import get_food_lexicon
+    from app.services.llm_services import ANALYSIS_VERSION, current_analysis_versions
+
+    repository = get_food_entry_repository()
+    user_id, today = str(uuid.uuid4()), str(date.today())
+    versions = {
+        'kimchi': 'lexicon-v1/000000000000',
+        'sauerkraut': get_food_lexicon().version,
+        'oatmeal with berries': ANALYSIS_VERSION,
+        'banana bread': None,
+    }
+    await repository.insert_many([
+        {
+            'user_id': user_id, 'date': today, 'meal_type': 'snack', 'food_text': text,
+            'llm_analysis': {**fake_analysis(text), 'analysis_version': version} if version else fake_analysis(text),
+        }
+        for text, version in versions.items()
+    ])
+    assert await repository.count_stale_analyses(current_analysis_versions()) == 2
+
+    await reanalyze.run(str(tmp_path / 'reanalyze.sqlite3'))
+
+    assert await repository.count_stale_analyses(current_analysis_versions()) == 0
+    rows = await repository.list_for_day(user_id, date.today(), columns='food_text, llm_analysis')
+    stored = {row['food_text']: row['llm_analysis'] for row in rows}
+    assert stored['kimchi']['analysis_version'] == get_food_lexicon().version
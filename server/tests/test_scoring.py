@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+from app.services.scoring_services import (
+    aggregates_are_valid, apply_analysis, calculate_gut_health_scores, empty_aggregates, scores_from_aggregates
+)
+
+CATEGORIES = ['fruits', 'vegetables', 'grains', 'legumes', 'nuts', 'dairy', 'fermented', 'meat', 'fish', 'unknown']
+
+
+def _analysis(rng: random.Random) -> dict:
+    return {
+        'fiber_grams': rng.choice([0, 0.1, 0.2, 0.3, 0.7, 1.1, 2.5, 3.3333, 12.45, None]),
+        'food_categories': rng.sample(CATEGORIES, rng.randint(0, 3)) + rng.choice([[], ['unknown'], ['fruits']]),
+        'is_processed': rng.random() < 0.4,
+        'has_probiotics': rng.random() < 0.3,
+        'digestive_complexity': rng.choice(['easy', 'moderate', 'heavy', 'unrated']),
+    }
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_incremental_scores_match_full_rescore(seed):
+    rng = random.Random(seed)
+    entries, aggregates = [], empty_aggregates()
+    for _ in range(200):
+        action = rng.random()
+        if entries and action < 0.25:
+            removed = entries.pop(rng.randrange(len(entries)))
+            apply_analysis(aggregates, removed['llm_analysis'], -1)
+        elif entries and action < 0.5:
+            # An edit reverts the old analysis and applies the new one
+            entry = rng.choice(entries)
+            apply_analysis(aggregates, entry['llm_analysis'], -1)
+            entry['llm_analysis'] = _analysis(rng)
+            apply_analysis(aggregates, entry['llm_analysis'])
+        else:
+            entries.append({'llm_analysis': _analysis(rng)})
+            apply_analysis(aggregates, entries[-1]['llm_analysis'])
+        assert aggregates_are_valid(aggregates)
+        assert scores_from_aggregates(aggregates) == calculate_gut_health_scores(entries)
+
+
+def test_fiber_is_summed_in_integer_milligrams():
+    aggregates = empty_aggregates()
+    for _ in range(3):
+        apply_analysis(aggregates, {'fiber_grams': 0.1})
+    # 0.1 + 0.1 + 0.1 is 0.30000000000000004 in floats
+    assert scores_from_aggregates(aggregates)['fiber_grams'] == 0.3
+    for _ in range(3):
+        apply_analysis(aggregates, {'fiber_grams': 0.1}, -1)
+    assert aggregates['fiber_mg'] == 0
+    assert aggregates['entry_count'] == 0
+
+
+def test_fiber_rounds_to_the_nearest_milligram():
+    aggregates = apply_analysis(empty_aggregates(), {'fiber_grams': 3.3336})
+    apply_analysis(aggregates, {'fiber_grams': '1.0004'})
+    apply_analysis(aggregates, {'fiber_grams': 'n/a'})
+    assert aggregates['fiber_mg'] == 3334 + 1000
+    assert scores_from_aggregates(aggregates)['fiber_grams'] == 4.334
+
+
+def test_unknown_category_does_not_count_towards_diversity():
+    entries = [
+        {'llm_analysis': {'food_categories': ['unknown']}},
+        {'llm_analysis': {'food_categories': ['unknown', 'fruits', 'fruits']}},
+    ]
+    aggregates = empty_aggregates()
+    for entry in entries:
+        apply_analysis(aggregates, entry['llm_analysis'])
+    assert aggregates['categories'] == {'unknown': 2, 'fruits': 1}
+    assert scores_from_aggregates(aggregates)['diversity_score'] == 15
+    assert calculate_gut_health_scores(entries)['diversity_score'] == 15
+
+    apply_analysis(aggregates, entries[1]['llm_analysis'], -1)
+    assert aggregates['categories'] == {'unknown': 1}
+    assert scores_from_aggregates(aggregates)['diversity_score'] == 0
+
+
+def test_removing_every_entry_gives_empty_scores():
+    aggregates = empty_aggregates()
+    analysis = {'fiber_grams': 5, 'food_categories': ['legumes'], 'has_probiotics': True}
+    apply_analysis(aggregates, analysis)
+    apply_analysis(aggregates, analysis, -1)
+    assert aggregates == empty_aggregates()
+    assert scores_from_aggregates(aggregates) == calculate_gut_health_scores([])
@@ -0,0 +1,31 @@
+import uuid
+from datetime import date
+
+import pytest
+
+from benchmarks.fake_services import fake_analysis
+
+
+@pytest.mark.parametrize('compact_writes', [False, True])
+async def test_entries_read_back_the_same_in_either_format(fakes, monkeypatch, compact_writes):
+    from app.core.config import settings
+    from app.models.stored_analysis import is_compact
+    from app.repositories.food_entries import get_food_entry_repository
+
+    monkeypatch.setattr(settings, 'ANALYSIS_COMPACT_WRITES', compact_writes)
+    repository = get_food_entry_repository()
+    user_id, analysis = str(uuid.uuid4()), fake_analysis('kimchi')
+    await repository.insert({
+        'user_id': user_id, 'date': str(date.today()), 'meal_type': 'snack', 'food_text': 'kimchi',
+        'llm_analysis': analysis,
+    })
+
+    assert is_compact(fakes.state.tables['food_entries'][0]['llm_analysis']) == compact_writes
+    rows = await repository.list_for_day(user_id, date.today(), columns='llm_analysis')
+    assert rows[0]['llm_analysis'] == analysis
+
+
+def test_compact_writes_are_off_until_every_worker_reads_them():
+    from app.core.config import Settings
+
+    assert Settings.model_fields['ANALYSIS_COMPACT_WRITES'].default is False
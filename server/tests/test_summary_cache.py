@@ -0,0 +1,37 @@
+import pytest
+
+
+class _SharedBackend:
+    shared = True
+
+
+@pytest.mark.parametrize('workers, shared, enabled', [
+    (1, False, True),
+    (4, False, False),
+    (4, True, True),
+])
+def test_cache_needs_one_worker_or_a_shared_backend(monkeypatch, workers, shared, enabled):
+    from app.core.config import settings
+    from app.services.summary_cache import InMemoryBackend, cache_enabled
+
+    monkeypatch.setattr(settings, 'SERVER_WORKERS', workers)
+    backend = _SharedBackend() if shared else InMemoryBackend(10)
+    assert cache_enabled(backend) == enabled
+
+
+def test_one_worker_per_core_turns_the_in_memory_cache_off(monkeypatch):
+    from app.core import config
+    from app.services.summary_cache import InMemoryBackend, cache_enabled
+
+    monkeypatch.setattr(config.settings, 'SERVER_WORKERS', 0)
+    monkeypatch.setattr(config.os, 'cpu_count', lambda: 2)
+    assert cache_enabled(InMemoryBackend(10)) is False
+
+
+def test_disabled_switch_wins(monkeypatch):
+    from app.core.config import settings
+    from app.services.summary_cache import cache_enabled
+
+    monkeypatch.setattr(settings, 'SUMMARY_CACHE_ENABLED', False)
+    monkeypatch.setattr(settings, 'SERVER_WORKERS', 1)
+    assert cache_enabled(_SharedBackend()) is False
@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.fake_services import fake_analysis
+from benchmarks.load_test import KNOWN_FOODS
+
+
+class _NoLocks(dict):
+    """Stands in for rollup_services._user_locks so every call runs as if in its own process"""
+
+    def get(self, key, default=None):
+        return None
+
+    def __setitem__(self, key, value):
+        pass
+
+
+async def _store_entries(user_id: str, day: date, count: int):
+    from app.repositories.food_entries import get_food_entry_repository
+
+    rows = [
+        {
+            'user_id': user_id, 'date': str(day), 'meal_type': 'snack', 'food_text': food,
+            'llm_analysis': fake_analysis(food),
+        }
+        for food in (KNOWN_FOODS[i % len(KNOWN_FOODS)] for i in range(count))
+    ]
+    await get_food_entry_repository().insert_many(rows)
+    return [row['llm_analysis'] for row in rows]
+
+
+async def test_concurrent_deltas_from_separate_workers_are_all_applied(fakes, monkeypatch):
+    from app.services import rollup_services
+    from app.services.summary_services import apply_summary_delta, verify_daily_summary
+
+    monkeypatch.setattr(rollup_services, '_user_locks', _NoLocks())
+    user_id, day = str(uuid.uuid4()), date.today()
+    first = await _store_entries(user_id, day, 1)
+    await apply_summary_delta(user_id, day, added=first)
+    burst = await _store_entries(user_id, day, 12)
+
+    # No coordinator: each update reads, modifies and writes on its own
+    await asyncio.gather(*(apply_summary_delta(user_id, day, added=[analysis]) for analysis in burst))
+
+    stored = next(row for row in fakes.state.tables['daily_gut_summary'] if row['user_id'] == user_id)
+    assert stored['entry_count'] == 13
+    assert await verify_daily_summary(user_id, day)
+
+
+async def test_concurrent_days_keep_rollups_exact(fakes, monkeypatch):
+    from app.services import rollup_services
+    from app.services.rollup_services import DAY_SCORE_COLUMNS, apply_rollup_delta, build_rollups
+    from app.services.summary_services import apply_summary_delta
+
+    monkeypatch.setattr(rollup_services, '_user_locks', _NoLocks())
+    user_id = str(uuid.uuid4())
+    monday = date.today() - timedelta(days=date.today().weekday() + 7)
+    days = [monday + timedelta(days=offset) for offset in range(7)]
+    for day in days:
+        await apply_summary_delta(user_id, day, added=await _store_entries(user_id, day, 1))
+
+    # Same gut_score, so best/worst stay put and no period is rebuilt from
+    # the days: every delta has to land in the shared week rollup itself
+    summaries = sorted(
+        (row for row in fakes.state.tables['daily_gut_summary'] if row['user_id'] == user_id),
+        key=lambda row: row['date'],
+    )
+    changes = []
+    for row in summaries:
+        previous = {column: row[column] for column in DAY_SCORE_COLUMNS.split(', ')}
+        row['fiber_grams'] += 1.5
+        row['fiber_score'] += 1
+        current = {**previous, 'fiber_grams': row['fiber_grams'], 'fiber_score': row['fiber_score']}
+        changes.append((date.fromisoformat(row['date']), previous, current))
+    await asyncio.gather(*(apply_rollup_delta(user_id, day, previous, current) for day, previous, current in changes))
+
+    expected = {
+        (rollup['granularity'], rollup['period_start']): rollup for rollup in build_rollups(user_id, summaries)
+    }
+    stored = {
+        (row['granularity'], row['period_start']): row
+        for row in fakes.state.tables['summary_rollups'] if row['user_id'] == user_id
+    }
+    assert stored.keys() == expected.keys()
+    for key, rollup in expected.items():
+        assert {column: stored[key][column] for column in rollup} == rollup
+
+
+@pytest.mark.parametrize('burst', [5, 20])
+async def test_coordinator_writes_a_burst_once(fakes, burst):
+    from app.services.event_hub import event_hub
+    from app.services.summary_coordinator import summary_coordinator
+    from app.services.summary_services import apply_summary_delta, verify_daily_summary
+
+    user_id, day = str(uuid.uuid4()), date.today()
+    first = await _store_entries(user_id, day, 1)
+    await apply_summary_delta(user_id, day, added=first)
+    analyses = await _store_entries(user_id, day, burst)
+
+    published = event_hub.published
+    results = await asyncio.gather(*(summary_coordinator.submit(user_id, day, added=[a]) for a in analyses))
+
+    assert event_hub.published - published == 1
+    assert len(set(results)) == 1
+    assert await verify_daily_summary(user_id, day)
@@ -0,0 +1,29 @@
+import asyncio
+
+BUCKET = (1, 2, 3, 4, 5)
+
+
+def _tips_cache(path, variants=3):
+    from app.services.tips_cache import TipsCache
+
+    return TipsCache('test-v1', bucket_size=20, variants=variants, max_entries=100, ttl=3600, sqlite_path=str(path))
+
+
+async def test_concurrent_generations_keep_every_variant(tmp_path):
+    cache = _tips_cache(tmp_path / 'tips.sqlite')
+    await asyncio.gather(*(cache.add(BUCKET, [f"tip {n}"]) for n in range(3)))
+
+    assert sorted(await cache.variants_for(BUCKET)) == [['tip 0'], ['tip 1'], ['tip 2']]
+    variants, _ = cache.persistent.get(cache.key(BUCKET))
+    assert len(variants) == 3
+
+
+async def test_workers_sharing_the_file_fill_a_bucket_without_overfilling(tmp_path):
+    path = tmp_path / 'tips.sqlite'
+    workers = [_tips_cache(path), _tips_cache(path)]
+    await asyncio.gather(*(workers[n % 2].add(BUCKET, [f"tip {n}"]) for n in range(6)))
+
+    variants, _ = _tips_cache(path).persistent.get(workers[0].key(BUCKET))
+    assert len(variants) == 3
+    for worker in workers:
+        assert len(await worker.variants_for(BUCKET)) == 3